@@ -29,6 +29,12 @@ target_metadata = SQLModel.metadata
 # ... etc.
 
 
+def include_name(name, type_, parent_names):
+    # The partitions of buttonuse are created and dropped by
+    # app.core.use_partitions, not by migrations
+    return not (type_ == "table" and name.startswith("buttonuse_"))
+
+
 def get_url():
     return str(settings.SQLALCHEMY_DATABASE_URI)
 
@@ -47,7 +53,11 @@ def run_migrations_offline():
     """
     url = get_url()
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True, compare_type=True
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        compare_type=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -71,7 +81,10 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata, compare_type=True
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,102 @@
+"""Index Button filters
+
+Revision ID: 3d8c6a2f5e19
+Revises: f2b7d4e91c06
+Create Date: 2026-10-17 19:47:05.118374
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "3d8c6a2f5e19"
+down_revision = "f2b7d4e91c06"
+branch_labels = None
+depends_on = None
+
+
+# Indexes for the filters and sorts of GET /buttons/, built concurrently
+# like the other indexes on live tables. The trigram index on titles is
+# only built where the pg_trgm extension is available, as in
+# app.models.has_pg_trgm.
+
+
+def has_pg_trgm():
+    return (
+        op.get_bind()
+        .exec_driver_sql("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        .first()
+        is not None
+    )
+
+
+def upgrade():
+    trigrams = has_pg_trgm()
+    if trigrams:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_button_type_created_at_id",
+            "button",
+            ["type", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_button_title_id",
+            "button",
+            ["title", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_button_retired_created_at_id",
+            "button",
+            ["created_at", "id"],
+            unique=False,
+            postgresql_where=sa.text("retired_at IS NOT NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        if trigrams:
+            op.create_index(
+                "ix_button_title_trgm",
+                "button",
+                ["title"],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={"title": "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    # The extension is left installed, as other objects may use it
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_button_title_trgm",
+            table_name="button",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_button_retired_created_at_id",
+            table_name="button",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_button_title_id",
+            table_name="button",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_button_type_created_at_id",
+            table_name="button",
+            postgresql_concurrently=True,
+        )
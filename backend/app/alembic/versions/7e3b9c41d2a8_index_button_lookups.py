@@ -0,0 +1,83 @@
+"""Index Button lookups
+
+Revision ID: 7e3b9c41d2a8
+Revises: 5c1f0d2e9a7b
+Create Date: 2026-10-17 10:04:17.552190
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "7e3b9c41d2a8"
+down_revision = "5c1f0d2e9a7b"
+branch_labels = None
+depends_on = None
+
+
+# Built concurrently so that presses keep flowing while the indexes are
+# built on a live table. CREATE INDEX CONCURRENTLY can't run inside a
+# transaction, hence the autocommit block.
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_buttonuse_button_id_timestamp",
+            "buttonuse",
+            ["button_id", sa.text("timestamp DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            op.f("ix_buttonretirement_button_id"),
+            "buttonretirement",
+            ["button_id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            op.f("ix_buttonretirement_created_by"),
+            "buttonretirement",
+            ["created_by"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            op.f("ix_button_created_by"),
+            "button",
+            ["created_by"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f("ix_button_created_by"),
+            table_name="button",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            op.f("ix_buttonretirement_created_by"),
+            table_name="buttonretirement",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            op.f("ix_buttonretirement_button_id"),
+            table_name="buttonretirement",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_buttonuse_button_id_timestamp",
+            table_name="buttonuse",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,112 @@
+"""Partition buttonuse by month
+
+Revision ID: 8c4f1a6e2d95
+Revises: 5b9e2d7c4a13
+Create Date: 2026-10-17 22:36:14.207561
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "8c4f1a6e2d95"
+down_revision = "5b9e2d7c4a13"
+branch_labels = None
+depends_on = None
+
+
+# buttonuse is rebuilt as a table partitioned by month, with a partition
+# for every month from that of its oldest use to three months ahead (as
+# BUTTON_USE_PARTITION_MONTHS_AHEAD defaults to), and a default one for
+# the rest, as in app.models. Later months are created by
+# app.core.use_partitions. The uses are copied over, which takes a while
+# on a large table.
+
+MONTHS = """
+    SELECT
+        month,
+        month + INTERVAL '1 month',
+        'buttonuse_p' || to_char(month, 'YYYYMM')
+    FROM generate_series(
+        date_trunc('month', coalesce(
+            (SELECT min(timestamp) FROM buttonuse_unpartitioned),
+            now() AT TIME ZONE 'UTC'
+        )),
+        date_trunc('month', now() AT TIME ZONE 'UTC') + INTERVAL '3 months',
+        INTERVAL '1 month'
+    ) AS month
+"""
+
+
+def rename_table(old, new):
+    op.rename_table(old, new)
+    op.execute(f"ALTER TABLE {new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey")
+    op.execute(
+        f"ALTER TABLE {new} RENAME CONSTRAINT {old}_button_id_fkey "
+        f"TO {new}_button_id_fkey"
+    )
+    op.execute(
+        f"ALTER INDEX ix_{old}_button_id_timestamp "
+        f"RENAME TO ix_{new}_button_id_timestamp"
+    )
+
+
+def create_table(name, primary_key, **kw):
+    op.create_table(
+        name,
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("button_id", sa.Uuid(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column(
+            "origin", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+        sa.ForeignKeyConstraint(["button_id"], ["button.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint(*primary_key),
+        **kw,
+    )
+    op.create_index(
+        f"ix_{name}_button_id_timestamp",
+        name,
+        ["button_id", sa.text("timestamp DESC")],
+        unique=False,
+    )
+
+
+def upgrade():
+    rename_table("buttonuse", "buttonuse_unpartitioned")
+    create_table(
+        "buttonuse",
+        ["id", "timestamp"],
+        postgresql_partition_by="RANGE (timestamp)",
+    )
+    op.execute("CREATE TABLE buttonuse_default PARTITION OF buttonuse DEFAULT")
+    for start, end, name in op.get_bind().exec_driver_sql(MONTHS).all():
+        op.execute(
+            f"CREATE TABLE {name} PARTITION OF buttonuse "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    op.execute(
+        """
+        INSERT INTO buttonuse (id, button_id, timestamp, origin)
+        SELECT id, button_id, timestamp, origin
+        FROM buttonuse_unpartitioned
+        """
+    )
+    op.drop_table("buttonuse_unpartitioned")
+
+
+def downgrade():
+    create_table("buttonuse_unpartitioned", ["id"])
+    op.execute(
+        """
+        INSERT INTO buttonuse_unpartitioned (id, button_id, timestamp, origin)
+        SELECT id, button_id, timestamp, origin
+        FROM buttonuse
+        """
+    )
+    # Drops the partitions along with it
+    op.drop_table("buttonuse")
+    rename_table("buttonuse_unpartitioned", "buttonuse")
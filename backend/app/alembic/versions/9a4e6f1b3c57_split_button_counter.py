@@ -0,0 +1,52 @@
+"""Split usage counter out of button
+
+Revision ID: 9a4e6f1b3c57
+Revises: 7e3b9c41d2a8
+Create Date: 2026-10-17 11:26:03.914870
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "9a4e6f1b3c57"
+down_revision = "7e3b9c41d2a8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "buttoncounter",
+        sa.Column("button_id", sa.Uuid(), nullable=False),
+        sa.Column("usage_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["button_id"], ["button.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("button_id"),
+    )
+    # See BUTTON_COUNTER_FILLFACTOR in app/models.py
+    op.execute("ALTER TABLE buttoncounter SET (fillfactor = 50)")
+    op.execute(
+        """
+        INSERT INTO buttoncounter (button_id, usage_count)
+        SELECT id, usage_count FROM button WHERE usage_count <> 0
+        """
+    )
+    op.drop_column("button", "usage_count")
+
+
+def downgrade():
+    op.add_column(
+        "button",
+        sa.Column("usage_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE button SET usage_count = buttoncounter.usage_count
+        FROM buttoncounter WHERE buttoncounter.button_id = button.id
+        """
+    )
+    op.alter_column("button", "usage_count", server_default=None)
+    op.drop_table("buttoncounter")
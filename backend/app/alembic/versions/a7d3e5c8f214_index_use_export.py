@@ -0,0 +1,54 @@
+"""Index use exports
+
+Revision ID: a7d3e5c8f214
+Revises: 8c4f1a6e2d95
+Create Date: 2026-10-17 23:41:52.880316
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "a7d3e5c8f214"
+down_revision = "8c4f1a6e2d95"
+branch_labels = None
+depends_on = None
+
+
+# A BRIN index on buttonuse.timestamp, for GET /buttons/uses/export. An
+# index can't be built concurrently on a partitioned table, so, like the
+# other indexes on live tables, it is created on the partitioned table
+# alone, then built concurrently on each partition and attached to it.
+# Partitions created later get theirs when they are attached.
+
+PARTITIONS = """
+    SELECT inhrelid::regclass::text
+    FROM pg_inherits
+    WHERE inhparent = 'buttonuse'::regclass
+    ORDER BY 1
+"""
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_buttonuse_timestamp "
+        "ON ONLY buttonuse USING brin (timestamp)"
+    )
+    partitions = op.get_bind().exec_driver_sql(PARTITIONS).scalars().all()
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_timestamp_idx "
+                f"ON {partition} USING brin (timestamp)"
+            )
+            op.execute(
+                f"ALTER INDEX ix_buttonuse_timestamp "
+                f"ATTACH PARTITION {partition}_timestamp_idx"
+            )
+
+
+def downgrade():
+    op.drop_index("ix_buttonuse_timestamp", table_name="buttonuse")
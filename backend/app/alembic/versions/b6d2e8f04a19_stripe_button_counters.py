@@ -0,0 +1,52 @@
+"""Stripe Button counters
+
+Revision ID: b6d2e8f04a19
+Revises: 9a4e6f1b3c57
+Create Date: 2026-10-17 12:41:55.207316
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "b6d2e8f04a19"
+down_revision = "9a4e6f1b3c57"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("button", sa.Column("counter_slots", sa.Integer(), nullable=True))
+    op.add_column(
+        "buttoncounter",
+        sa.Column("slot", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.alter_column("buttoncounter", "slot", server_default=None)
+    op.drop_constraint("buttoncounter_pkey", "buttoncounter", type_="primary")
+    op.create_primary_key("buttoncounter_pkey", "buttoncounter", ["button_id", "slot"])
+
+
+def downgrade():
+    # Fold every Button back into a single row first
+    op.execute(
+        """
+        WITH folded AS (
+            DELETE FROM buttoncounter
+            WHERE slot > 0
+            RETURNING button_id, usage_count
+        )
+        INSERT INTO buttoncounter (button_id, slot, usage_count)
+        SELECT button_id, 0, sum(usage_count)
+        FROM folded
+        GROUP BY button_id
+        ON CONFLICT (button_id, slot) DO UPDATE
+        SET usage_count = buttoncounter.usage_count + excluded.usage_count
+        """
+    )
+    op.drop_constraint("buttoncounter_pkey", "buttoncounter", type_="primary")
+    op.create_primary_key("buttoncounter_pkey", "buttoncounter", ["button_id"])
+    op.drop_column("buttoncounter", "slot")
+    op.drop_column("button", "counter_slots")
@@ -0,0 +1,55 @@
+"""Index list pages
+
+Revision ID: f2b7d4e91c06
+Revises: e8a1c5d27b40
+Create Date: 2026-10-17 18:21:43.902716
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "f2b7d4e91c06"
+down_revision = "e8a1c5d27b40"
+branch_labels = None
+depends_on = None
+
+
+# Keys of the keyset pagination of Buttons and retirements, built
+# concurrently like the other indexes on live tables.
+INDEXES = [
+    ("ix_button_created_at_id", "button", ["created_at", "id"]),
+    (
+        "ix_button_created_by_created_at_id",
+        "button",
+        ["created_by", "created_at", "id"],
+    ),
+    ("ix_buttonretirement_retired_at_id", "buttonretirement", ["retired_at", "id"]),
+    (
+        "ix_buttonretirement_created_by_retired_at_id",
+        "buttonretirement",
+        ["created_by", "retired_at", "id"],
+    ),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
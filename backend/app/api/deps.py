@@ -2,18 +2,21 @@
 Dependencies for FastAPI routes.
 """
 
-from collections.abc import Generator
-from typing import Annotated
+import uuid
+from ipaddress import ip_address
+from collections.abc import AsyncGenerator, Generator
+from typing import Annotated, cast
 
 import jwt
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import AsyncSession, ThreadedSession, async_engine, engine
+from app.core.user_cache import user_cache
 from app.models import TokenPayload, User
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from pydantic import ValidationError
+from pydantic import IPvAnyNetwork, ValidationError
 from sqlmodel import Session
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -30,27 +33,93 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Get an async database session for the current request, backed by
+    the async or the sync engine depending on `DATABASE_MODE`, and
+    close it after the request is completed.
+
+    Objects aren't expired on commit, since expired attributes can't be
+    loaded lazily on the event loop.
+    """
+    if settings.DATABASE_MODE == "async":
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        threaded = ThreadedSession(Session(engine, expire_on_commit=False))
+        try:
+            # Provides the subset of the AsyncSession API routes use
+            yield cast(AsyncSession, threaded)
+        finally:
+            await threaded.close()
+
+
+def is_trusted_proxy(host: str) -> bool:
+    """
+    Return whether `host` is the address of a trusted proxy (see
+    `TRUSTED_PROXIES`).
+    """
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return False
+    # Always a list, once parsed
+    networks = cast(list[IPvAnyNetwork], settings.TRUSTED_PROXIES)
+    return any(address in network for network in networks)
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    Extract the client's IP address from the request: the peer's, or if
+    it is a trusted proxy, the right-most address of `X-Forwarded-For`
+    that isn't one, since those before it are whatever the client sent.
+    """
+    client_ip = request.client.host if request.client else ""
+    forwarded = request.headers.get("X-Forwarded-For")
+    if not forwarded or not is_trusted_proxy(client_ip):
+        return client_ip
+    for hop in reversed(forwarded.split(",")):
+        client_ip = hop.strip()
+        if not is_trusted_proxy(client_ip):
+            break
+    return client_ip
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+async def get_current_user(session: AsyncSessionDep, token: TokenDep) -> User:
     """
     Get the current user from the token.
     This function decodes the JWT token and retrieves the user from
-    the database.
+    the database, or from the user cache (see app.core.user_cache).
     """
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError) as exc:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        ) from exc
-    user = session.get(User, token_data.sub)
+    user_id = user_cache.get_token(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+            )
+            token_data = TokenPayload(**payload)
+            user_id = uuid.UUID(token_data.sub or "")
+        except (InvalidTokenError, ValidationError, TypeError, ValueError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            ) from exc
+        # Tokens without an expiry aren't cached
+        user_cache.set_token(token, user_id, payload.get("exp", 0))
+    user = user_cache.get_user(user_id)
+    if user is not None:
+        # Attached to the session without a query, as if just loaded
+        user = await session.merge(user, load=False)
+    else:
+        generation = user_cache.generation()
+        user = await session.get(User, user_id)
+        if user:
+            user_cache.set_user(user, generation)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -2,7 +2,7 @@
 Main API router for the application.
 """
 
-from app.api.routes import buttons, login, private, users, utils
+from app.api.routes import buttons, login, private, reports, users, utils
 from app.core.config import settings
 from fastapi import APIRouter
 
@@ -11,6 +11,7 @@ api_router.include_router(login.router)
 api_router.include_router(users.router)
 api_router.include_router(utils.router)
 api_router.include_router(buttons.router)
+api_router.include_router(reports.router)
 
 
 if settings.ENVIRONMENT == "local":
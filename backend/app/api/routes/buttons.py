@@ -2,86 +2,486 @@
 Routes for Button CRUD operations.
 """
 
+import asyncio
+import re
 import uuid
-from datetime import datetime, timezone
-from typing import Any
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Any, Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from app.api.deps import CurrentUser, SessionDep
+from app import crud
+from app.api.deps import AsyncSessionDep, CurrentUser, get_client_ip
+from app.core.button_cache import button_states, notify_button_changed
+from app.core.button_events import (
+    button_events,
+    notify_button_event,
+    stream_button_events,
+)
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.db import AsyncSession
+from app.core.db_pool import checkout_timeout
+from app.core.pagination import CountMode, InvalidCursor, after_cursor, encode_cursor
+from app.core.press_buffer import get_press_buffer
+from app.core.press_journal import (
+    UNAVAILABLE,
+    PressJournal,
+    PressJournaled,
+    get_press_journal,
+)
+from app.core.press_keys import seen_press_keys
+from app.core.security import create_press_token, read_press_token
+from app.core.use_export import MEDIA_TYPES, ExportFormat, stream_export
 from app.models import (
     Button,
     ButtonCreate,
+    ButtonEvent,
+    ButtonEventType,
+    ButtonPress,
+    ButtonPressBatch,
+    ButtonPressBatchResults,
+    ButtonPressResult,
+    ButtonPressUrl,
     ButtonPublic,
     ButtonRetirement,
     ButtonRetirementsPublic,
     ButtonsPublic,
     ButtonUpdate,
+    ButtonUsageSeries,
+    ButtonUsageSeriesList,
     ButtonUse,
     Message,
     RetireButtonRequest,
+    UsageBucketSize,
+    User,
 )
-from fastapi import APIRouter, HTTPException, Request, status
-from sqlalchemy import desc
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import ColumnElement, desc
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import delete, func, select
+from sqlmodel import SQLModel, col, delete, func, select
+from sqlmodel.sql.expression import SelectOfScalar
 
 router = APIRouter(prefix="/buttons", tags=["buttons"])
 
+# How far in the future a replayed press may be, to allow for clock skew
+# between the Stream Deck and the server
+MAX_PRESS_CLOCK_SKEW = timedelta(minutes=1)
+
+# Last recorded press per (Button, origin) while it is within the Button's
+# de-duplication window, so that repeats are answered without touching
+# the database. The database keeps its own record of the window for
+# presses that land on another worker. Each is kept with the generation
+# of `button_states` it was recorded in, and ignored once a Button has
+# changed since (e.g. was retired or had its press URL rotated).
+recent_presses: TTLCache[tuple[uuid.UUID, str], tuple[int, ButtonPublic]] = (
+    TTLCache(settings.PRESS_DEDUP_MAX_ENTRIES)
+)
+
+
+ButtonSort = Literal[
+    "created_at", "-created_at", "title", "-title", "usage_count", "-usage_count"
+]
+
+# Columns the Buttons can be sorted on, with their Python type. Each has
+# an index on (column, id), except usage_count, which is summed over the
+# counter slots of each Button: every page sums and sorts all the
+# matching Buttons, so that sort is refused past MAX_USAGE_SORT_BUTTONS
+# of them.
+BUTTON_SORT_KEYS: dict[str, tuple[Any, Any]] = {
+    "created_at": (col(Button.created_at), datetime),
+    "title": (col(Button.title), str),
+    "usage_count": (Button.usage_count, int),
+}
+MAX_USAGE_SORT_BUTTONS = 10_000
+
 
-def get_client_ip(request: Request) -> str:
+async def _count(
+    session: AsyncSession,
+    table: type[SQLModel],
+    criteria: list[ColumnElement[bool]],
+    count: CountMode,
+) -> int | None:
     """
-    Extract the client's IP address from the request.
+    Count the rows of a table matching `criteria`, as requested by the
+    `count` parameter of a listing.
     """
-    client_ip = request.headers.get("X-Forwarded-For")
-    return client_ip.split(",")[0].strip() if client_ip else request.client.host
+    if count == "exact":
+        statement = (
+            select(func.count())  # pylint: disable=E1102
+            .select_from(table)
+            .where(*criteria)
+        )
+        return (await session.exec(statement)).one()
+    if count == "estimated":
+        estimated = select(table).where(*criteria)
+        return await session.run_sync(
+            lambda sync_session: crud.estimate_count(
+                session=sync_session, statement=estimated
+            )
+        )
+    return None
+
+
+def escape_like(value: str) -> str:
+    """
+    Escape the wildcards of a LIKE pattern, with backslash as the escape
+    character.
+    """
+    return re.sub(r"([\\%_])", r"\\\1", value)
+
+
+def _button_event(event: ButtonEventType, button: Button) -> ButtonEvent:
+    """
+    Return an event of the live feed about a Button, as of now.
+    """
+    return ButtonEvent(
+        event=event,
+        button_id=button.id,
+        type=button.type,
+        created_by=button.created_by,
+        at=datetime.now(timezone.utc),
+    )
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def button_filters(
+    *,
+    current_user: User,
+    type: str | None = None,  # pylint: disable=redefined-builtin
+    retired: bool | None = None,
+    created_by: uuid.UUID | None = None,
+    title: str | None = None,
+) -> list[ColumnElement[bool]]:
+    """
+    Conditions selecting the Buttons listed by `GET /buttons/`.
+    """
+    criteria: list[ColumnElement[bool]] = []
+    if not current_user.is_superuser:
+        # If not a superuser, filter Buttons by the current user's ID
+        criteria.append(col(Button.created_by) == current_user.id)
+    if type is not None:
+        criteria.append(col(Button.type) == type)
+    if retired is not None:
+        retired_at = col(Button.retired_at)
+        criteria.append(retired_at.is_not(None) if retired else retired_at.is_(None))
+    if created_by is not None:
+        criteria.append(col(Button.created_by) == created_by)
+    if title is not None:
+        criteria.append(col(Button.title).ilike(f"%{escape_like(title)}%", escape="\\"))
+    return criteria
+
+
+def button_page(
+    criteria: list[ColumnElement[bool]], *, sort: ButtonSort, cursor: str | None
+) -> SelectOfScalar[Button]:
+    """
+    Select the Buttons matching `criteria` in `sort` order, after
+    `cursor` if given. Raises `InvalidCursor` for a cursor that wasn't
+    issued for `sort`.
+    """
+    key, key_type = BUTTON_SORT_KEYS[sort.lstrip("-")]
+    id_key = col(Button.id)
+    descending = sort.startswith("-")
+    order = (key.desc(), id_key.desc()) if descending else (key, id_key)
+    page = select(Button).where(*criteria).order_by(*order)
+    if cursor is not None:
+        page = page.where(
+            after_cursor(sort, key, id_key, cursor, key_type, descending=descending)
+        )
+    return page
 
 
 @router.get("/", response_model=ButtonsPublic)
-def list_all_buttons(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+async def list_all_buttons(
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    type: str | None = None,  # pylint: disable=redefined-builtin
+    retired: bool | None = None,
+    created_by: uuid.UUID | None = None,
+    title: Annotated[str | None, Query(min_length=1, max_length=255)] = None,
+    sort: ButtonSort = "created_at",
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1)] = 100,
+    count: CountMode = "exact",
+    summary: bool = False,
+    skip: Annotated[int, Query(ge=0, deprecated=True)] = 0,
 ) -> Any:
     """
     Retrieve all Buttons in the database. Depending on the role of the
     user making the request, the response may include all Buttons or
     only those created by the requesting user.
-    """
-    # TODO: add filtering, sorting, calculate usage count across all Buttons returned
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(  # pylint: disable=E1102
-            Button
+    Buttons can be filtered by `type`, by whether they are `retired`, by
+    `created_by`, and by a case-insensitive substring of their `title`,
+    and sorted by `created_at` (the default), `title` or `usage_count`,
+    in descending order with a leading `-`. Ties are broken by id.
+    Sorting by `usage_count` is refused for more than
+    `MAX_USAGE_SORT_BUTTONS` matching Buttons (as estimated, unless
+    `count` is exact), and its pages aren't stable: a Button pressed
+    while paging moves, and may be skipped or returned twice.
+
+    Pass the `next_cursor` of a page as `cursor`, with the same filters
+    and `sort`, to get the next one; it is null on the last page.
+    `count` selects whether the total is counted exactly, estimated, or
+    left out. `skip` is still accepted, but gets slower the deeper the
+    page.
+
+    With `summary`, the response also totals the presses and airtime of
+    all the Buttons matching the filters, overall, per type, and for
+    active and retired Buttons.
+    """
+    criteria = button_filters(
+        current_user=current_user,
+        type=type,
+        retired=retired,
+        created_by=created_by,
+        title=title,
+    )
+    usage = None
+    if summary:
+        usage = await session.run_sync(
+            lambda sync_session: crud.summarize_button_usage(
+                session=sync_session, criteria=criteria
+            )
         )
-        count = session.exec(count_statement).one()
-        statement = select(Button).offset(skip).limit(limit)
-        buttons = session.exec(statement).all()
+    if usage is not None and count == "exact":
+        # Already counted by the summary
+        total: int | None = usage.total.buttons
     else:
-        # If not a superuser, filter Buttons by the current user's ID
-        count_statement = (
-            select(func.count())  # pylint: disable=E1102
-            .select_from(Button)
-            .where(Button.created_by == current_user.id)
+        total = await _count(session, Button, criteria, count)
+    if sort.lstrip("-") == "usage_count":
+        matching = total
+        if matching is None:
+            matching = await _count(session, Button, criteria, "estimated")
+        if matching is not None and matching > MAX_USAGE_SORT_BUTTONS:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    "Too many Buttons to sort by usage_count "
+                    f"(more than {MAX_USAGE_SORT_BUTTONS}), narrow the filters"
+                ),
+            )
+    try:
+        page = button_page(criteria, sort=sort, cursor=cursor)
+    except InvalidCursor:
+        raise _invalid_cursor() from None
+    # One more row than asked for tells whether there is a next page
+    buttons = (await session.exec(page.offset(skip).limit(limit + 1))).all()
+    next_cursor = None
+    if len(buttons) > limit:
+        buttons = buttons[:limit]
+        last = buttons[-1]
+        next_cursor = encode_cursor(sort, getattr(last, sort.lstrip("-")), last.id)
+
+    return ButtonsPublic(
+        data=buttons, count=total, next_cursor=next_cursor, summary=usage
+    )
+
+
+# Bounds of a usage series request
+MAX_SERIES_BUTTONS = 100
+MAX_SERIES_BUCKETS = 10_000
+BUCKET_SIZES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+async def _usage_series(
+    session: AsyncSession,
+    current_user: User,
+    ids: list[uuid.UUID],
+    start: datetime,
+    end: datetime | None,
+    bucket: UsageBucketSize,
+    tz: str,
+) -> list[ButtonUsageSeries]:
+    """
+    Check a usage series request, and count the presses of its Buttons.
+    """
+    try:
+        zone = ZoneInfo(tz)
+    except (ValueError, ZoneInfoNotFoundError):
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="Unknown time zone"
+        ) from None
+    # Times without an offset are taken to be in the series' time zone
+    start = start if start.tzinfo else start.replace(tzinfo=zone)
+    end = datetime.now(timezone.utc) if end is None else end
+    end = end if end.tzinfo else end.replace(tzinfo=zone)
+    if end <= start:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'"
         )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Button)
-            .where(Button.created_by == current_user.id)
-            .offset(skip)
-            .limit(limit)
+    if (end - start) / BUCKET_SIZES[bucket] > MAX_SERIES_BUCKETS:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"A series can't have more than {MAX_SERIES_BUCKETS} buckets",
         )
-        buttons = session.exec(statement).all()
 
-    return ButtonsPublic(data=buttons, count=count)
+    ids = list(dict.fromkeys(ids))
+    buttons = (await session.exec(select(Button).where(col(Button.id).in_(ids)))).all()
+    if len(buttons) < len(ids):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
+    if not current_user.is_superuser and any(
+        button.created_by != current_user.id for button in buttons
+    ):
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
+        )
+
+    series = await session.run_sync(
+        lambda sync_session: crud.get_usage_series(
+            session=sync_session,
+            button_ids=ids,
+            start=start,
+            end=end,
+            bucket=bucket,
+            tz=tz,
+        )
+    )
+    return [
+        ButtonUsageSeries(button_id=button_id, bucket=bucket, tz=tz, data=data)
+        for button_id, data in series.items()
+    ]
+
+
+@router.get("/usage/series", response_model=ButtonUsageSeriesList)
+async def get_buttons_usage_series(
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    ids: Annotated[list[uuid.UUID], Query(min_length=1, max_length=MAX_SERIES_BUTTONS)],
+    start: Annotated[datetime, Query(alias="from")],
+    end: Annotated[datetime | None, Query(alias="to")] = None,
+    bucket: UsageBucketSize = "day",
+    tz: str = "UTC",
+) -> Any:
+    """
+    Get the presses of several Buttons per hour, day or week, like
+    `GET /buttons/{id}/usage/series`, in a single query. Series are
+    returned in the order of `ids`.
+    """
+    series = await _usage_series(session, current_user, ids, start, end, bucket, tz)
+    return ButtonUsageSeriesList(data=series)
+
+
+@router.get(
+    "/uses/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}
+    },
+)
+async def export_button_uses(
+    current_user: CurrentUser,
+    start: Annotated[datetime, Query(alias="from")],
+    end: Annotated[datetime | None, Query(alias="to")] = None,
+    type: str | None = None,  # pylint: disable=redefined-builtin
+    export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+) -> StreamingResponse:
+    """
+    Export every use of the Buttons of the current user (of all Buttons
+    for a superuser), optionally of one `type`, from `from` up to `to`
+    (now by default), as CSV or as newline-delimited JSON. Times without
+    an offset are taken to be in UTC.
+
+    Rows are streamed as they are read, month by month in the order they
+    were recorded, rather than sorted; an export of any size is
+    returned in constant memory.
+    """
+    # buttonuse.timestamp is stored without a time zone, in UTC
+    start = start.astimezone(timezone.utc) if start.tzinfo else start
+    end = datetime.now(timezone.utc) if end is None else end
+    end = end.astimezone(timezone.utc) if end.tzinfo else end
+    start, end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+    if end <= start:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'"
+        )
+    statement = (
+        select(  # type: ignore[call-overload]
+            ButtonUse.id,
+            ButtonUse.button_id,
+            Button.title,
+            Button.type,
+            ButtonUse.timestamp,
+            ButtonUse.origin,
+        )
+        .join(Button, col(Button.id) == col(ButtonUse.button_id))
+        .where(
+            *button_filters(current_user=current_user, type=type),
+            col(ButtonUse.timestamp) >= start,
+            col(ButtonUse.timestamp) < end,
+        )
+    )
+    filename = f"button-uses-{start:%Y%m%dT%H%M%S}Z-{end:%Y%m%dT%H%M%S}Z"
+    return StreamingResponse(
+        stream_export(statement, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}.{export_format}"'
+            )
+        },
+    )
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_events(
+    current_user: CurrentUser,
+    button_id: Annotated[list[uuid.UUID] | None, Query()] = None,
+    type: str | None = None,  # pylint: disable=redefined-builtin
+    last_event_id: Annotated[str | None, Header()] = None,
+    resume_after: Annotated[str | None, Query(alias="last_event_id")] = None,
+) -> StreamingResponse:
+    """
+    Stream the presses, updates, retirements and deletions of the
+    Buttons of the current user (of all Buttons for a superuser), or
+    only of those in `button_id` or of a `type`, as Server-Sent Events.
+
+    Each event carries its ID. A client reconnecting with the last of
+    them, in the `Last-Event-ID` header or the `last_event_id` query
+    parameter, is sent the events after it; when those are no longer
+    known, or the client falls too far behind, it is sent a `resync`
+    event instead, after which it should reload the Buttons it shows.
+    """
+    if not button_events.listening:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, detail="Button events unavailable"
+        )
+    return StreamingResponse(
+        stream_button_events(
+            last_event_id=last_event_id or resume_after,
+            button_ids=(
+                None if button_id is None else {str(selected) for selected in button_id}
+            ),
+            type=type,
+            created_by=None if current_user.is_superuser else str(current_user.id),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{id}", response_model=ButtonPublic)
-def read_button(
-    session: SessionDep,
+async def read_button(
+    session: AsyncSessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,  # pylint: disable=redefined-builtin
 ) -> Any:
     """
     Get a Button by its ID.
     """
-    button = session.get(Button, id)
+    button = await session.get(Button, id)
     if not current_user.is_superuser and (button.created_by != current_user.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
@@ -95,23 +495,85 @@ def read_button(
 
 
 @router.post("/", response_model=ButtonPublic)
-def create_button(
-    *, session: SessionDep, current_user: CurrentUser, button_in: ButtonCreate
+async def create_button(
+    *, session: AsyncSessionDep, current_user: CurrentUser, button_in: ButtonCreate
 ) -> Any:
     """
     Create a new Button.
     """
     button = Button.model_validate(button_in, update={"created_by": current_user.id})
     session.add(button)
-    session.commit()
-    session.refresh(button)
+    await session.run_sync(notify_button_changed, button.id)
+    await session.commit()
+    await session.refresh(button)
     return button
 
 
+def _press_url(request: Request, button: Button) -> ButtonPressUrl:
+    """
+    Build the signed press URL of a Button.
+    """
+    token = create_press_token(button.id, button.press_key_version)
+    url = request.url_for("increment_button_usage", id=button.id)
+    return ButtonPressUrl(
+        url=str(url.include_query_params(token=token)),
+        token=token,
+        version=button.press_key_version,
+    )
+
+
+@router.get("/{id}/press-url", response_model=ButtonPressUrl)
+async def read_press_url(
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,  # pylint: disable=redefined-builtin
+) -> Any:
+    """
+    Get the signed press URL of a Button, e.g. for a Stream Deck
+    multi-action. Presses carrying a forged token are refused without
+    touching the database.
+    """
+    button = await session.get(Button, id)
+    if not button:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
+    if not current_user.is_superuser and button.created_by != current_user.id:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
+        )
+    return _press_url(request, button)
+
+
+@router.post("/{id}/press-url:rotate", response_model=ButtonPressUrl)
+async def rotate_press_url(
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,  # pylint: disable=redefined-builtin
+) -> Any:
+    """
+    Replace the signed press URL of a Button. Presses through the
+    previous one are refused from then on.
+    """
+    button = await session.get(Button, id)
+    if not button:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
+    if not current_user.is_superuser and button.created_by != current_user.id:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
+        )
+    button.press_key_version += 1
+    session.add(button)
+    await session.run_sync(notify_button_changed, button.id)
+    await session.commit()
+    await session.refresh(button)
+    return _press_url(request, button)
+
+
 @router.put("/{id}", response_model=ButtonPublic)
-def update_button(
+async def update_button(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,  # pylint: disable=redefined-builtin
     button_in: ButtonUpdate,
@@ -119,7 +581,7 @@ def update_button(
     """
     Update an existing Button, if the user has permission.
     """
-    button = session.get(Button, id)
+    button = await session.get(Button, id)
     if not current_user.is_superuser and (button.created_by != current_user.id):
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
@@ -131,14 +593,16 @@ def update_button(
     update_dict = button_in.model_dump(exclude_unset=True)
     button.sqlmodel_update(update_dict)
     session.add(button)
-    session.commit()
-    session.refresh(button)
+    await session.run_sync(notify_button_changed, button.id)
+    await session.run_sync(notify_button_event, _button_event("update", button))
+    await session.commit()
+    await session.refresh(button)
     return button
 
 
 @router.delete("/{id}")
-def delete_button(
-    session: SessionDep,
+async def delete_button(
+    session: AsyncSessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,  # pylint: disable=redefined-builtin
     force: bool = False,
@@ -148,7 +612,7 @@ def delete_button(
     optional query parameter `force=true` will delete the Button
     even if it has usage history or is not retired.
     """
-    button = session.get(Button, id)
+    button = await session.get(Button, id)
     if not current_user.is_superuser and (button.created_by != current_user.id):
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
@@ -167,11 +631,15 @@ def delete_button(
                 ),
             )
 
+    # Taken before deleting, as a rollback would expire `button`
+    event = _button_event("delete", button)
     try:
-        session.delete(button)
-        session.commit()
+        await session.delete(button)
+        await session.run_sync(notify_button_changed, button.id)
+        await session.run_sync(notify_button_event, event)
+        await session.commit()
     except IntegrityError as exc:
-        session.rollback()
+        await session.rollback()
         if not force:
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST,
@@ -181,74 +649,403 @@ def delete_button(
                 ),
             ) from exc
         # Force delete: remove related ButtonUse and ButtonRetirement entries first.
-        session.exec(delete(ButtonUse).where(ButtonUse.button_id == button.id))
-        session.exec(
-            delete(ButtonRetirement).where(ButtonRetirement.button_id == button.id)
+        # (The rollback expired `button`, so its ID is taken from the path.)
+        await session.exec(delete(ButtonUse).where(ButtonUse.button_id == id))
+        await session.exec(
+            delete(ButtonRetirement).where(ButtonRetirement.button_id == id)
         )
-        session.delete(button)
-        session.commit()
+        await session.delete(button)
+        await session.run_sync(notify_button_changed, id)
+        await session.run_sync(notify_button_event, event)
+        await session.commit()
     return Message(message="Button deleted successfully")
 
 
-@router.get("/{id}/increment", response_model=ButtonPublic)
-def increment_button_usage(
+def _idempotency_key_conflict() -> HTTPException:
+    return HTTPException(
+        status.HTTP_400_BAD_REQUEST,
+        detail="Idempotency key was used for another Button",
+    )
+
+
+async def _record_press(
+    session: AsyncSession, press: ButtonPress, timeout_ms: int | None
+) -> tuple[Button | ButtonPublic | None, bool]:
+    """
+    Record a press as configured by `PRESS_INGEST_MODE`, unless its
+    idempotency key shows it is a retry. Returns the Button, if it
+    exists, and whether the press was recorded; a retry of a press of a
+    Button since retired is answered as such by the caller, like any
+    unrecorded press of a retired Button.
+    """
+    key = press.idempotency_key
+    if key is not None and key in seen_press_keys:
+        # Possibly a retry: only then is the key looked up
+        claimed = await session.run_sync(
+            lambda sync_session: crud.get_press_key(session=sync_session, key=key)
+        )
+        if claimed:
+            if claimed.button_id != press.button_id:
+                raise _idempotency_key_conflict()
+            return await session.get(Button, press.button_id), False
+
+    try:
+        if settings.PRESS_INGEST_MODE == "direct":
+            return await session.run_sync(
+                lambda sync_session: crud.increment_button_usage(
+                    session=sync_session,
+                    button_id=press.button_id,
+                    origin=press.origin,
+                    idempotency_key=key,
+                    timeout_ms=timeout_ms,
+                )
+            )
+        if settings.PRESS_BUFFER_ACK == "flush":
+            return await asyncio.wrap_future(get_press_buffer().submit(press))
+    except crud.IdempotencyKeyConflict:
+        raise _idempotency_key_conflict() from None
+    # Acknowledge on enqueue: validate against the current row and
+    # report the count as it will be once the queue is flushed
+    current = await session.get(Button, press.button_id)
+    button = ButtonPublic.model_validate(current) if current else None
+    if button is None or button.retired_at is not None:
+        return button, False
+    press_buffer = get_press_buffer()
+    press_buffer.submit(press)
+    button.usage_count += press_buffer.pending(press.button_id)
+    return button, True
+
+
+def _invalid_press_token() -> HTTPException:
+    return HTTPException(status.HTTP_403_FORBIDDEN, detail="Invalid press token")
+
+
+async def _press_key_version(
+    session: AsyncSession,
+    button_id: uuid.UUID,
+    known: dict[uuid.UUID, int | None] | None = None,
+) -> int | None:
+    """
+    Return the current press key version of a Button (`None` if it
+    doesn't exist), from the Button cache if it is there. Versions read
+    are also kept in `known`, if given, and taken from it.
+    """
+    if known is not None and button_id in known:
+        return known[button_id]
+    version = button_states.get_press_key_version(button_id)
+    if version is None:
+        generation = button_states.generation()
+        version = await session.run_sync(
+            lambda sync_session: crud.get_press_key_version(
+                session=sync_session, button_id=button_id
+            )
+        )
+        if version is not None:
+            button_states.set_press_key_version(button_id, version, generation)
+    if known is not None:
+        known[button_id] = version
+    return version
+
+
+async def _check_press_key_version(
+    session: AsyncSession, button_id: uuid.UUID, version: int | None
+) -> None:
+    """
+    Refuse a press whose token carries `version`, if that isn't the
+    Button's current press key version. A missing Button is answered as
+    such once its press is recorded.
+    """
+    if version is None:
+        return
+    current = await _press_key_version(session, button_id)
+    if current is not None and current != version:
+        raise _invalid_press_token()
+
+
+def _journaled() -> JSONResponse:
+    """
+    Acknowledge a press that was journaled. Whether its Button exists
+    isn't known until it is replayed.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=Message(
+            message=(
+                "Press journaled, to be recorded later "
+                "if its Button exists and isn't retired"
+            )
+        ).model_dump(),
+    )
+
+
+async def _journal_press(journal: PressJournal, press: ButtonPress) -> JSONResponse:
+    """
+    Journal a press the database couldn't take, and acknowledge it.
+    """
+    try:
+        await asyncio.wrap_future(journal.append([press]))
+    except OSError as exc:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, detail="Press could not be recorded"
+        ) from exc
+    return _journaled()
+
+
+@router.get(
+    "/{id}/increment",
+    response_model=ButtonPublic,
+    responses={status.HTTP_202_ACCEPTED: {"model": Message}},
+)
+async def increment_button_usage(
     request: Request,
-    session: SessionDep,
+    session: AsyncSessionDep,
     id: uuid.UUID,  # pylint: disable=redefined-builtin
+    idempotency_key: Annotated[str | None, Query(max_length=255)] = None,
+    idempotency_key_header: Annotated[
+        str | None, Header(alias="Idempotency-Key", max_length=255)
+    ] = None,
+    token: Annotated[str | None, Query(max_length=64)] = None,
 ) -> Any:
     """
     Increment the usage count of a Button.
+
+    Depending on `PRESS_INGEST_MODE`, the press is either written right
+    away or handed to this worker's press buffer. If the Button has a
+    de-duplication window, a repeat press from the same origin within
+    that window is not recorded, and the current Button is returned.
+    Presses of Buttons known to be missing or retired are rejected
+    without touching the database.
+
+    A press may carry an idempotency key, as the `idempotency_key` query
+    parameter or the `Idempotency-Key` header. A retry with the same key
+    within `PRESS_IDEMPOTENCY_TTL_S` is not recorded again, and returns
+    the Button like the original press did.
+
+    With the press journal enabled, a press the database can't take in
+    time (`PRESS_JOURNAL_TIMEOUT_MS`, both to get a connection and to
+    record it) is journaled instead, to be recorded once it is back, and
+    acknowledged with a 202. Presses of Buttons not known to be missing
+    or retired are journaled too: those turn out to be dropped when the
+    journal is replayed.
+
+    A press may carry the `token` of the Button's signed press URL (see
+    `GET /buttons/{id}/press-url`), which `PRESS_TOKENS_REQUIRED` makes
+    mandatory. A token that wasn't signed for the Button is refused
+    before anything else; one from before the URL was rotated, once the
+    Button's current version is known. A press journaled because the
+    database is unavailable is only checked against its token's
+    signature.
     """
-    # Uses using row-level locking
+    version = None
+    if token is not None or settings.PRESS_TOKENS_REQUIRED:
+        version = read_press_token(id, token or "")
+        if version is None:
+            raise _invalid_press_token()
+    state = button_states.get(id)
+    if state == "missing":
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
+    if state == "retired":
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN,
+            detail="Button is retired and cannot be incremented",
+        )
+    if version is not None:
+        # Checked against the database, if need be, along with the press
+        current = button_states.get_press_key_version(id)
+        if current is not None and current != version:
+            raise _invalid_press_token()
+    generation = button_states.generation()
+    key = idempotency_key or idempotency_key_header
+    origin = get_client_ip(request)
+    recent = recent_presses.get((id, origin))
+    if recent is not None and recent[0] == generation:
+        return recent[1]
 
-    statement = select(Button).where(Button.id == id).with_for_update()
-    button = session.exec(statement).one_or_none()
+    press = ButtonPress(button_id=id, origin=origin, idempotency_key=key)
+    journal = get_press_journal()
+    if journal is None:
+        await _check_press_key_version(session, id, version)
+        button, recorded = await _record_press(session, press, None)
+    elif not journal.circuit.allow():
+        # Only the token's signature can be checked meanwhile
+        return await _journal_press(journal, press)
+    else:
+        try:
+            with checkout_timeout(settings.PRESS_JOURNAL_TIMEOUT_MS / 1000):
+                await _check_press_key_version(session, id, version)
+                button, recorded = await _record_press(
+                    session, press, settings.PRESS_JOURNAL_TIMEOUT_MS
+                )
+        except PressJournaled:
+            # Journaled by the press buffer
+            return _journaled()
+        except UNAVAILABLE:
+            journal.circuit.failed()
+            return await _journal_press(journal, press)
+        journal.circuit.succeeded()
+    if key is not None and button:
+        seen_press_keys.add(key)
     if not button:
+        button_states.set(id, "missing", generation)
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
-    if button.retired_at is not None:
+    if not recorded and button.retired_at is not None:
+        button_states.set(id, "retired", generation)
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
             detail="Button is retired and cannot be incremented",
         )
+    if recorded and button.dedup_window_ms:
+        recent_presses.set(
+            (id, origin),
+            (generation, ButtonPublic.model_validate(button)),
+            button.dedup_window_ms / 1000,
+        )
+    return button
 
-    client_ip = get_client_ip(request)
 
-    # Create a new ButtonUse entry
-    button_use = ButtonUse(button_id=button.id, origin=client_ip)
-    session.add(button_use)
+@router.post("/increments:batch", response_model=ButtonPressBatchResults)
+async def record_button_presses(
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    batch: ButtonPressBatch,
+) -> Any:
+    """
+    Record a batch of presses that happened earlier, e.g. replayed by a
+    Stream Deck that lost its connection, keeping their timestamps.
 
-    # Safely increment the usage count field using the locked row
-    button.usage_count += 1
+    The whole batch is written in one statement, which bumps the usage
+    count of each Button once. Results are returned in the order the
+    presses were sent. A press is a `duplicate` if its idempotency key
+    was seen before, or if it falls within the Button's de-duplication
+    window; a press from the future, of a Button the user didn't create
+    (unless they are a superuser), with a press token that isn't valid
+    (checked as in `GET /buttons/{id}/increment`), or whose idempotency
+    key was used for another Button, is `invalid`.
+    """
+    client_ip = get_client_ip(request)
+    latest = datetime.now(timezone.utc) + MAX_PRESS_CLOCK_SKEW
+    generation = button_states.generation()
+    results: dict[int, ButtonPressResult] = {}
+    pending: list[tuple[int, ButtonPress]] = []
+    versions: dict[uuid.UUID, int | None] = {}
+    # Creator of each pressed Button that exists
+    owners: dict[uuid.UUID, uuid.UUID] = {}
+    if not current_user.is_superuser:
+        button_ids = list({item.button_id for item in batch.presses})
+        owners = dict(
+            (
+                await session.exec(
+                    select(Button.id, Button.created_by).where(
+                        col(Button.id).in_(button_ids)
+                    )
+                )
+            ).all()
+        )
+    for index, item in enumerate(batch.presses):
+        pressed_at = item.pressed_at
+        if pressed_at.tzinfo is None:
+            pressed_at = pressed_at.replace(tzinfo=timezone.utc)
+        signed = item.token is not None or settings.PRESS_TOKENS_REQUIRED
+        version = read_press_token(item.button_id, item.token or "") if signed else None
+        state = button_states.get(item.button_id)
+        if signed and version is None:
+            results[index] = ButtonPressResult(
+                status="invalid", detail="Invalid press token"
+            )
+        # A missing Button is answered as such below
+        elif owners.get(item.button_id, current_user.id) != current_user.id:
+            results[index] = ButtonPressResult(
+                status="invalid", detail="Insufficient permissions"
+            )
+        elif pressed_at > latest:
+            results[index] = ButtonPressResult(status="invalid", detail="In the future")
+        elif state == "missing":
+            results[index] = ButtonPressResult(status="not_found")
+        elif state == "retired":
+            results[index] = ButtonPressResult(status="retired")
+        elif version is not None and (
+            await _press_key_version(session, item.button_id, versions)
+        ) not in (None, version):
+            results[index] = ButtonPressResult(
+                status="invalid", detail="Invalid press token"
+            )
+        else:
+            press = ButtonPress(
+                button_id=item.button_id,
+                timestamp=pressed_at.astimezone(timezone.utc),
+                origin=item.origin or client_ip,
+                idempotency_key=item.idempotency_key,
+            )
+            pending.append((index, press))
 
-    session.commit()
-    session.refresh(button)
-    return button
+    misclaimed: set[uuid.UUID] = set()
+    buttons = (
+        await session.run_sync(
+            lambda sync_session: crud.record_button_presses(
+                session=sync_session,
+                presses=[press for _, press in pending],
+                misclaimed=misclaimed,
+            )
+        )
+        if pending
+        else {}
+    )
+    for index, press in pending:
+        button, recorded = buttons.get(press.button_id, (None, set()))
+        if press.idempotency_key is not None and button is not None:
+            seen_press_keys.add(press.idempotency_key)
+        if button is None:
+            button_states.set(press.button_id, "missing", generation)
+            results[index] = ButtonPressResult(status="not_found")
+        elif press.id in recorded:
+            results[index] = ButtonPressResult(status="recorded")
+        elif press.id in misclaimed:
+            results[index] = ButtonPressResult(
+                status="invalid", detail="Idempotency key was used for another Button"
+            )
+        elif button.retired_at is not None:
+            button_states.set(press.button_id, "retired", generation)
+            results[index] = ButtonPressResult(status="retired")
+        else:
+            results[index] = ButtonPressResult(status="duplicate")
+
+    return ButtonPressBatchResults(
+        data=[results[index] for index in range(len(batch.presses))],
+        recorded=sum(len(recorded) for _, recorded in buttons.values()),
+    )
 
 
 @router.get("/{id}/usage")
-def get_button_usage(
-    session: SessionDep,
+async def get_button_usage(
+    session: AsyncSessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,  # pylint: disable=redefined-builtin
 ) -> Any:
     """
     Get the usage count and recent uses of a Button.
     """
-    button = session.get(Button, id)
+    button = await session.get(Button, id)
     if not current_user.is_superuser and (button.created_by != current_user.id):
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
         )
     if not button:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
-    usage_count = session.exec(
-        select(func.count()).where(ButtonUse.button_id == id)  # pylint: disable=E1102
+    usage_count = (
+        await session.exec(
+            select(func.count()).where(  # pylint: disable=E1102
+                ButtonUse.button_id == id
+            )
+        )
     ).one()
-    recent_uses = session.exec(
-        select(ButtonUse)
-        .where(ButtonUse.button_id == id)
-        .order_by(desc(ButtonUse.timestamp))
-        .limit(10)
+    recent_uses = (
+        await session.exec(
+            select(ButtonUse)
+            .where(ButtonUse.button_id == id)
+            .order_by(desc(ButtonUse.timestamp))
+            .limit(10)
+        )
     ).all()
     return {
         "usage_count": usage_count,
@@ -258,9 +1055,31 @@ def get_button_usage(
     }
 
 
+@router.get("/{id}/usage/series", response_model=ButtonUsageSeries)
+async def get_button_usage_series(
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,  # pylint: disable=redefined-builtin
+    start: Annotated[datetime, Query(alias="from")],
+    end: Annotated[datetime | None, Query(alias="to")] = None,
+    bucket: UsageBucketSize = "day",
+    tz: str = "UTC",
+) -> Any:
+    """
+    Get the presses of a Button per hour, day or week, from `from` up
+    to `to` (now by default), with every bucket in the range present.
+    Buckets start at the local hour, midnight or Monday in `tz`, an IANA
+    time zone such as `America/New_York`; times without an offset are
+    taken to be in it. The first bucket only counts presses from `from`
+    on.
+    """
+    [series] = await _usage_series(session, current_user, [id], start, end, bucket, tz)
+    return series
+
+
 @router.put("/{id}/retire", response_model=ButtonPublic)
-def update_retirement(
-    session: SessionDep,
+async def update_retirement(
+    session: AsyncSessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,  # pylint: disable=redefined-builtin
     retire_req: RetireButtonRequest,
@@ -268,7 +1087,7 @@ def update_retirement(
     """
     Retire or unretire a Button.
     """
-    button = session.get(Button, id)
+    button = await session.get(Button, id)
     if not button:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
     if not current_user.is_superuser and button.created_by != current_user.id:
@@ -305,7 +1124,7 @@ def update_retirement(
             )
             .order_by(desc(ButtonRetirement.retired_at))
         )
-        button_retirement = session.exec(stmt).first()
+        button_retirement = (await session.exec(stmt)).first()
         if not button_retirement:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -322,21 +1141,26 @@ def update_retirement(
         )
 
     session.add(button)
-    session.commit()
-    session.refresh(button)
+    await session.run_sync(notify_button_changed, button.id)
+    await session.run_sync(
+        notify_button_event,
+        _button_event("retire" if retire_req.retire else "unretire", button),
+    )
+    await session.commit()
+    await session.refresh(button)
     return button
 
 
 @router.get("/{id}/retirements", response_model=ButtonRetirementsPublic)
-def get_retirements(
-    session: SessionDep,
+async def get_retirements(
+    session: AsyncSessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,  # pylint: disable=redefined-builtin
 ) -> Any:
     """
     Get retirement records for a Button.
     """
-    button = session.get(Button, id)
+    button = await session.get(Button, id)
     if not current_user.is_superuser and (button.created_by != current_user.id):
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, detail="Insufficient permissions"
@@ -344,8 +1168,10 @@ def get_retirements(
     if not button:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Button not found")
 
-    retirement_records = session.exec(
-        select(ButtonRetirement).where(ButtonRetirement.button_id == id)
+    retirement_records = (
+        await session.exec(
+            select(ButtonRetirement).where(ButtonRetirement.button_id == id)
+        )
     ).all()
 
     return ButtonRetirementsPublic(
@@ -354,40 +1180,54 @@ def get_retirements(
 
 
 @router.get("/retirements/", response_model=ButtonRetirementsPublic)
-def list_all_retirements(
-    session: SessionDep,
+async def list_all_retirements(
+    session: AsyncSessionDep,
     current_user: CurrentUser,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1)] = 100,
+    count: CountMode = "exact",
+    skip: Annotated[int, Query(ge=0, deprecated=True)] = 0,
 ) -> Any:
     """
     List all retirement records for Buttons. Depending on the role of
     the user making the request, the response may include all Buttons or
     only those retired by the requesting user.
+
+    Records are listed oldest first, and paged like `GET /buttons/`.
     """
     # TODO: add filtering, sorting, calculate usage count across all Buttons returned
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(  # pylint: disable=E1102
-            ButtonRetirement
-        )
-        count = session.exec(count_statement).one()
-        statement = select(ButtonRetirement).offset(skip).limit(limit)
-        button_retirements = session.exec(statement).all()
-    else:
+    criteria: list[ColumnElement[bool]] = []
+    if not current_user.is_superuser:
         # If not a superuser, filter Buttons by the current user's ID
-        count_statement = (
-            select(func.count())  # pylint: disable=E1102
-            .select_from(ButtonRetirement)
-            .where(ButtonRetirement.created_by == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(ButtonRetirement)
-            .where(ButtonRetirement.created_by == current_user.id)
-            .offset(skip)
-            .limit(limit)
-        )
-        button_retirements = session.exec(statement).all()
+        criteria.append(col(ButtonRetirement.created_by) == current_user.id)
+    total = await _count(session, ButtonRetirement, criteria, count)
 
-    return ButtonRetirementsPublic(data=button_retirements, count=count)
+    page = (
+        select(ButtonRetirement)
+        .where(*criteria)
+        .order_by(col(ButtonRetirement.retired_at), col(ButtonRetirement.id))
+    )
+    if cursor is not None:
+        try:
+            page = page.where(
+                after_cursor(
+                    "retired_at",
+                    col(ButtonRetirement.retired_at),
+                    col(ButtonRetirement.id),
+                    cursor,
+                    datetime,
+                )
+            )
+        except InvalidCursor:
+            raise _invalid_cursor() from None
+    button_retirements = (await session.exec(page.offset(skip).limit(limit + 1))).all()
+    next_cursor = None
+    if len(button_retirements) > limit:
+        button_retirements = button_retirements[:limit]
+        last = button_retirements[-1]
+        next_cursor = encode_cursor("retired_at", last.retired_at, last.id)
+
+    return ButtonRetirementsPublic(
+        data=button_retirements, count=total, next_cursor=next_cursor
+    )
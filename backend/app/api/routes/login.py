@@ -7,10 +7,21 @@ from datetime import timedelta
 from typing import Annotated, Any
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    AsyncSessionDep,
+    CurrentUser,
+    get_client_ip,
+    get_current_active_superuser,
+)
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.login_throttle import LoginThrottled, forgive_login, throttle_login
+from app.core.security import (
+    PasswordHashingBusy,
+    get_password_hash_async,
+    verify_and_update_password_async,
+)
+from app.core.user_cache import notify_user_changed
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
@@ -18,9 +29,10 @@ from app.utils import (
     send_email,
     verify_password_reset_token,
 )
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 
@@ -28,16 +40,47 @@ router = APIRouter(tags=["login"])
 
 
 @router.post("/login/access-token")
-def login_access_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+async def login_access_token(
+    request: Request,
+    session: AsyncSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
     """
     OAuth2 compatible token login; get an access token for future requests.
+    Failed attempts are limited per account and per client IP.
     """
     try:
-        user = crud.authenticate(
-            session=session, email=form_data.username, password=form_data.password
+        attempt = await throttle_login(
+            session, account=form_data.username, client_ip=get_client_ip(request)
+        )
+    except LoginThrottled as exc:
+        logger.warning("Login throttled for user %s", form_data.username)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    try:
+        user = await session.run_sync(
+            lambda sync_session: crud.get_user_by_email(
+                session=sync_session, email=form_data.username
+            )
         )
+        # Hand the connection back to the pool while the password is
+        # checked, so that a burst of logins can't hold them all
+        await session.commit()
+        if user:
+            valid, new_hash = await verify_and_update_password_async(
+                form_data.password, user.hashed_password
+            )
+            if not valid:
+                user = None
+            elif new_hash is not None:
+                # Hashed at another cost than BCRYPT_ROUNDS
+                user.hashed_password = new_hash
+                session.add(user)
+                await session.run_sync(notify_user_changed, user.id)
+                await session.commit()
         if not user:
             logger.warning("Login failed: User %s doesn't exist", form_data.username)
             raise HTTPException(
@@ -54,8 +97,11 @@ def login_access_token(
         token = security.create_access_token(
             user.id, expires_delta=access_token_expires
         )
+        await forgive_login(session, attempt)
         logger.info("User %s successfully logged in", form_data.username)
         return Token(access_token=token)
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         logger.exception("Error during login for user %s", form_data.username)
         raise HTTPException(
@@ -65,7 +111,7 @@ def login_access_token(
 
 
 @router.post("/login/test-token", response_model=UserPublic)
-def test_token(current_user: CurrentUser) -> Any:
+async def test_token(current_user: CurrentUser) -> Any:
     """
     Test access token to see if it is valid and the user is active.
     """
@@ -73,11 +119,13 @@ def test_token(current_user: CurrentUser) -> Any:
 
 
 @router.post("/password-recovery/{email}")
-def recover_password(email: str, session: SessionDep) -> Message:
+async def recover_password(email: str, session: AsyncSessionDep) -> Message:
     """
     Password recovery - send email with password reset token.
     """
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(session=sync_session, email=email)
+    )
 
     if not user:
         raise HTTPException(
@@ -88,7 +136,8 @@ def recover_password(email: str, session: SessionDep) -> Message:
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    await run_in_threadpool(
+        send_email,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -97,7 +146,7 @@ def recover_password(email: str, session: SessionDep) -> Message:
 
 
 @router.post("/reset-password/")
-def reset_password(session: SessionDep, body: NewPassword) -> Message:
+async def reset_password(session: AsyncSessionDep, body: NewPassword) -> Message:
     """
     Reset a password using a token.
     """
@@ -106,7 +155,9 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token"
         )
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(session=sync_session, email=email)
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -116,10 +167,11 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
-    hashed_password = get_password_hash(password=body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     user.hashed_password = hashed_password
     session.add(user)
-    session.commit()
+    await session.run_sync(notify_user_changed, user.id)
+    await session.commit()
     return Message(message="Password updated successfully")
 
 
@@ -128,13 +180,15 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
     dependencies=[Depends(get_current_active_superuser)],
     response_class=HTMLResponse,
 )
-def recover_password_html_content(email: str, session: SessionDep) -> Any:
+async def recover_password_html_content(email: str, session: AsyncSessionDep) -> Any:
     """
     HTML content for password recovery.
 
     TODO: figure out what this is for, and write a better docstring.
     """
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(session=sync_session, email=email)
+    )
 
     if not user:
         raise HTTPException(
@@ -0,0 +1,55 @@
+"""
+Routes for reports on the plays of Buttons.
+"""
+
+from datetime import date, datetime
+from typing import Annotated
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.api.deps import AsyncSessionDep, get_current_active_superuser
+from app.core.psa_report import PsaReportExpired, get_psa_report
+from app.models import PsaReport, ReportPeriod
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+@router.get(
+    "/psa",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=PsaReport,
+    response_class=Response,
+    responses={200: {"content": {"application/json": {}}}},
+)
+async def read_psa_report(
+    session: AsyncSessionDep,
+    period: ReportPeriod = "month",
+    day: Annotated[date | None, Query(alias="date")] = None,
+    tz: str = "UTC",
+) -> Response:
+    """
+    Get the PSA report of the week, month or quarter that `date` (today
+    by default) falls in, from local midnight in `tz` (superuser only).
+    The report of a closed period is returned as it was when it closed,
+    and is not found if it wasn't stored before its uses were dropped.
+    """
+    try:
+        zone = ZoneInfo(tz)
+    except (ValueError, ZoneInfoNotFoundError):
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="Unknown time zone"
+        ) from None
+    day = datetime.now(zone).date() if day is None else day
+    try:
+        report = await session.run_sync(
+            lambda sync_session: get_psa_report(
+                session=sync_session, period=period, day=day, tz=tz
+            )
+        )
+    except PsaReportExpired:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            detail="The uses of this period are no longer retained",
+        ) from None
+    # Already serialized, as stored for a closed period
+    return Response(report, media_type="application/json")
@@ -7,9 +7,14 @@ import uuid
 from typing import Any
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    AsyncSessionDep,
+    CurrentUser,
+    get_current_active_superuser,
+)
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
+from app.core.user_cache import notify_user_changed
 from app.models import (
     Button,
     Message,
@@ -25,6 +30,7 @@ from app.models import (
 from app.utils import generate_new_account_email, send_email
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import col, delete, func, select
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -34,16 +40,16 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+async def read_users(session: AsyncSessionDep, skip: int = 0, limit: int = 100) -> Any:
     """
     Retrieve all users.
     """
 
     count_statement = select(func.count()).select_from(User)  # pylint: disable=E1102
-    count = session.exec(count_statement).one()
+    count = (await session.exec(count_statement)).one()
 
     statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    users = (await session.exec(statement)).all()
 
     return UsersPublic(data=users, count=count)
 
@@ -51,23 +57,33 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+async def create_user(*, session: AsyncSessionDep, user_in: UserCreate) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(
+            session=sync_session, email=user_in.email
+        )
+    )
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A user with this email already exists.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
+    hashed_password = await get_password_hash_async(user_in.password)
+    user = await session.run_sync(
+        lambda sync_session: crud.create_user(
+            session=sync_session, user_create=user_in, hashed_password=hashed_password
+        )
+    )
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        await run_in_threadpool(
+            send_email,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -76,15 +92,19 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
 
 
 @router.patch("/me", response_model=UserPublic)
-def update_user_me(
-    *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
+async def update_user_me(
+    *, session: AsyncSessionDep, user_in: UserUpdateMe, current_user: CurrentUser
 ) -> Any:
     """
     Update own user.
     """
 
-    if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+    if email := user_in.email:
+        existing_user = await session.run_sync(
+            lambda sync_session: crud.get_user_by_email(
+                session=sync_session, email=email
+            )
+        )
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -93,19 +113,22 @@ def update_user_me(
     user_data = user_in.model_dump(exclude_unset=True)
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    await session.run_sync(notify_user_changed, current_user.id)
+    await session.commit()
+    await session.refresh(current_user)
     return current_user
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
-    *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
+async def update_password_me(
+    *, session: AsyncSessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    if not await verify_password_async(
+        body.current_password, current_user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect password"
         )
@@ -114,15 +137,16 @@ def update_password_me(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="New password cannot be the same as the current one",
         )
-    hashed_password = get_password_hash(body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
-    session.commit()
+    await session.run_sync(notify_user_changed, current_user.id)
+    await session.commit()
     return Message(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+async def read_user_me(current_user: CurrentUser) -> Any:
     """
     Get current user.
     """
@@ -130,7 +154,7 @@ def read_user_me(current_user: CurrentUser) -> Any:
 
 
 @router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+async def delete_user_me(session: AsyncSessionDep, current_user: CurrentUser) -> Any:
     """
     Delete own user.
     """
@@ -139,36 +163,48 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Super users are not allowed to delete themselves",
         )
-    session.delete(current_user)
-    session.commit()
+    await session.delete(current_user)
+    await session.run_sync(notify_user_changed, current_user.id)
+    await session.commit()
     return Message(message="User deleted successfully")
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: AsyncSessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await session.run_sync(
+        lambda sync_session: crud.get_user_by_email(
+            session=sync_session, email=user_in.email
+        )
+    )
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A user with this email already exists in the system",
         )
     user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
+    hashed_password = await get_password_hash_async(user_create.password)
+    user = await session.run_sync(
+        lambda sync_session: crud.create_user(
+            session=sync_session,
+            user_create=user_create,
+            hashed_password=hashed_password,
+        )
+    )
     return user
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+async def read_user_by_id(
+    user_id: uuid.UUID, session: AsyncSessionDep, current_user: CurrentUser
 ) -> Any:
     """
     Get a specific user by id. Only superusers can get users other than
     themselves.
     """
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if user == current_user:
         return user
     if not current_user.is_superuser:
@@ -189,9 +225,9 @@ def read_user_by_id(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UserPublic,
 )
-def update_user(
+async def update_user(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_id: uuid.UUID,
     user_in: UserUpdate,
 ) -> Any:
@@ -199,32 +235,47 @@ def update_user(
     Update a user.
     """
 
-    db_user = session.get(User, user_id)
+    db_user = await session.get(User, user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="A user with this id does not exist in the system",
         )
-    if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+    if email := user_in.email:
+        existing_user = await session.run_sync(
+            lambda sync_session: crud.get_user_by_email(
+                session=sync_session, email=email
+            )
+        )
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="A user with this email already exists",
             )
 
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    hashed_password = (
+        await get_password_hash_async(user_in.password) if user_in.password else None
+    )
+    await session.run_sync(notify_user_changed, user_id)
+    db_user = await session.run_sync(
+        lambda sync_session: crud.update_user(
+            session=sync_session,
+            db_user=db_user,
+            user_in=user_in,
+            hashed_password=hashed_password,
+        )
+    )
     return db_user
 
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
-def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
+async def delete_user(
+    session: AsyncSessionDep, current_user: CurrentUser, user_id: uuid.UUID
 ) -> Message:
     """
     Delete a user.
     """
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -235,7 +286,8 @@ def delete_user(
             detail="Super users are not allowed to delete themselves",
         )
     statement = delete(Button).where(col(Button.created_by) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
+    await session.exec(statement)  # type: ignore
+    await session.delete(user)
+    await session.run_sync(notify_user_changed, user_id)
+    await session.commit()
     return Message(message="User deleted successfully")
@@ -2,8 +2,16 @@
 Utility routes for testing and health checks.
 """
 
+import os
+
 from app.api.deps import get_current_active_superuser
-from app.models import Message
+from app.core.button_cache import button_states
+from app.core.db import async_engine, engine
+from app.core.db_pool import pool_stats
+from app.core.press_buffer import press_buffer_stats
+from app.core.press_journal import press_journal_stats
+from app.core.user_cache import user_cache
+from app.models import Message, Metrics
 from app.utils import generate_test_email, send_email
 from fastapi import APIRouter, Depends, status
 from pydantic.networks import EmailStr
@@ -30,6 +38,27 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get("/metrics/", dependencies=[Depends(get_current_active_superuser)])
+def read_metrics() -> Metrics:
+    """
+    Runtime metrics of the worker that serves the request (superuser
+    only). Each worker keeps its own, so repeated calls may be answered
+    by different workers; `pid` tells them apart.
+
+    `db_pool` and `async_db_pool` show the connection pools of the sync
+    and async engines, for sizing them with the `DB_POOL_*` settings.
+    """
+    return Metrics(
+        pid=os.getpid(),
+        db_pool=pool_stats(engine.pool),
+        async_db_pool=pool_stats(async_engine.sync_engine.pool),
+        press_buffer=press_buffer_stats(),
+        button_cache=button_states.stats(),
+        user_cache=user_cache.stats(),
+        press_journal=press_journal_stats(),
+    )
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     """
@@ -0,0 +1,226 @@
+"""
+Cache of Buttons that can't be pressed, for the increment hot path.
+
+Presses of Buttons that don't exist or are retired are answered from
+this cache without opening a transaction, and the press key versions of
+Buttons are kept alongside, to check press tokens against. Every change to a Button
+sends a `pg_notify` on `BUTTON_CHANGED_CHANNEL` as part of its
+transaction, and each worker runs a thread that LISTENs on it and drops
+the Button from its cache, so invalidations reach every worker on every
+node once the change has committed.
+
+Entries are only stored while the listener is connected, and the whole
+cache is cleared whenever it disconnects, since notifications sent
+until it reconnects are lost. Entries also expire after `BUTTON_CACHE_TTL_S`.
+"""
+
+import logging
+import threading
+import uuid
+from typing import Literal
+
+import psycopg
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.db import engine
+from app.models import ButtonCacheStats
+from sqlalchemy import text
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+BUTTON_CHANGED_CHANNEL = "button_changed"
+
+# Seconds the listener waits for notifications before checking whether
+# it should stop
+LISTEN_TIMEOUT = 0.2
+# Seconds before the listener reconnects after losing its connection
+RECONNECT_DELAY = 1.0
+
+ButtonState = Literal["missing", "retired"]
+
+
+class ButtonStateCache:
+    """
+    Bounded TTL caches of Buttons that are missing or retired, and of
+    the press key versions of Buttons.
+
+    Every invalidation bumps a generation counter. A caller reading a
+    Button's state from the database takes `generation()` first and
+    hands it to `set()`, which drops the write if the Button may have
+    changed in between.
+    """
+
+    def __init__(self, *, max_entries: int, ttl: float) -> None:
+        self.ttl = ttl
+        self.listening = False
+        self._entries: TTLCache[uuid.UUID, ButtonState] = TTLCache(max_entries)
+        self._press_key_versions: TTLCache[uuid.UUID, int] = TTLCache(max_entries)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, button_id: uuid.UUID) -> ButtonState | None:
+        """
+        Return the cached state of a Button, if it is missing or retired.
+        """
+        state = self._entries.get(button_id)
+        with self._lock:
+            if state is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return state
+
+    def generation(self) -> int:
+        """
+        Return the current generation, to be passed to `set()`.
+        """
+        with self._lock:
+            return self._generation
+
+    def set(self, button_id: uuid.UUID, state: ButtonState, generation: int) -> None:
+        """
+        Cache the state of a Button, unless caching is off or anything
+        was invalidated since `generation` was taken.
+        """
+        with self._lock:
+            if not self.listening or self.ttl <= 0 or generation != self._generation:
+                return
+            self._entries.set(button_id, state, self.ttl)
+
+    def get_press_key_version(self, button_id: uuid.UUID) -> int | None:
+        """
+        Return the cached press key version of a Button.
+        """
+        return self._press_key_versions.get(button_id)
+
+    def set_press_key_version(
+        self, button_id: uuid.UUID, version: int, generation: int
+    ) -> None:
+        """
+        Cache the press key version of a Button, as `set()` does its
+        state.
+        """
+        with self._lock:
+            if not self.listening or self.ttl <= 0 or generation != self._generation:
+                return
+            self._press_key_versions.set(button_id, version, self.ttl)
+
+    def invalidate(self, button_id: uuid.UUID | None = None) -> None:
+        """
+        Drop a Button from the cache, or every Button if none is given.
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if button_id is None:
+                self._entries.clear()
+                self._press_key_versions.clear()
+            else:
+                self._entries.pop(button_id)
+                self._press_key_versions.pop(button_id)
+
+    def stats(self) -> ButtonCacheStats:
+        """
+        Snapshot of the cache counters.
+        """
+        with self._lock:
+            return ButtonCacheStats(
+                listening=self.listening,
+                entries=len(self._entries),
+                hits=self._hits,
+                misses=self._misses,
+                invalidations=self._invalidations,
+            )
+
+
+button_states = ButtonStateCache(
+    max_entries=settings.BUTTON_CACHE_MAX_ENTRIES, ttl=settings.BUTTON_CACHE_TTL_S
+)
+
+
+def notify_button_changed(session: Session, button_id: uuid.UUID) -> None:
+    """
+    Queue an invalidation of a Button on every worker, to be sent when
+    the session's transaction commits, and drop it from this worker's
+    cache right away.
+    """
+    session.exec(
+        text("SELECT pg_notify(:channel, :button_id)"),  # type: ignore[call-overload]
+        params={"channel": BUTTON_CHANGED_CHANNEL, "button_id": str(button_id)},
+    )
+    button_states.invalidate(button_id)
+
+
+class ButtonChangeListener:
+    """
+    Thread that LISTENs for Button changes on its own connection and
+    invalidates them in `button_states`.
+    """
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="button-change-listener", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop listening and wait for the thread to exit.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {BUTTON_CHANGED_CHANNEL}")
+                    button_states.listening = True
+                    while not self._stop.is_set():
+                        for notify in connection.notifies(timeout=LISTEN_TIMEOUT):
+                            self._handle(notify.payload)
+            except psycopg.Error:
+                logger.exception("Lost the Button change listener connection")
+                self._stop.wait(RECONNECT_DELAY)
+            finally:
+                button_states.listening = False
+                button_states.invalidate()
+
+    @staticmethod
+    def _handle(payload: str) -> None:
+        try:
+            button_id = uuid.UUID(payload)
+        except ValueError:
+            logger.warning("Ignoring Button change for %r", payload)
+            return
+        button_states.invalidate(button_id)
+
+
+_listener: ButtonChangeListener | None = None
+
+
+def start_button_cache() -> None:
+    """
+    Start listening for Button changes, if the cache is enabled.
+    """
+    global _listener  # pylint: disable=global-statement
+    if settings.BUTTON_CACHE_TTL_S > 0 and _listener is None:
+        _listener = ButtonChangeListener()
+
+
+def stop_button_cache() -> None:
+    """
+    Stop listening for Button changes, which also stops caching.
+    """
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.close()
+        _listener = None
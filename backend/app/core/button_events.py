@@ -0,0 +1,308 @@
+"""
+Live feed of Button events, for `GET /buttons/events`.
+
+Presses (see `crud.record_button_presses`), updates, retirements and
+deletions of Buttons each send a `pg_notify` on `BUTTON_EVENTS_CHANNEL`
+as part of their transaction, with the event as JSON. Each worker runs a
+thread that LISTENs on it, on a connection of its own, and fans every
+event out to all of the worker's subscribers, so that any number of
+open dashboards cost one database connection per worker rather than a
+poller each.
+
+Postgres delivers notifications in commit order, so every worker sees
+the same sequence of events. Each keeps the last `BUTTON_EVENTS_BUFFER`
+of them, and a client reconnecting with the ID of the last event it got
+is sent the ones after it, whichever worker it reconnects to. When that
+isn't possible, because the ID is no longer buffered, the listener lost
+its connection (and the events sent meanwhile), or the client fell more
+than `BUTTON_EVENTS_BUFFER` events behind, the client is sent a
+`resync` event instead, to reload what it shows.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from collections.abc import AsyncGenerator, Container
+from typing import NamedTuple
+
+import psycopg
+from app.core.config import settings
+from app.core.db import engine
+from app.crud import BUTTON_EVENTS_CHANNEL
+from app.models import ButtonEvent
+from sqlalchemy import text
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+# Seconds the listener waits for notifications before checking whether
+# it should stop
+LISTEN_TIMEOUT = 0.2
+# Seconds before the listener reconnects after losing its connection
+RECONNECT_DELAY = 1.0
+# Seconds of silence after which a comment is sent down each stream, so
+# that proxies keep it open
+KEEPALIVE_INTERVAL = 15.0
+
+
+class BufferedEvent(NamedTuple):  # pylint: disable=missing-class-docstring
+    id: str
+    event: str
+    button_id: str
+    type: str
+    created_by: str
+    # The event as JSON, sent as is
+    payload: str
+
+
+# Queued in place of an event when a subscriber has to resync
+RESYNC = None
+
+
+class Subscription:
+    """
+    The queue of events of one client of the feed, filled from the
+    listener thread and drained on the event loop of its request.
+    """
+
+    def __init__(self, max_events: int) -> None:
+        self.max_events = max_events
+        self.queue: asyncio.Queue[BufferedEvent | None] = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+
+    def put(self, event: BufferedEvent | None) -> None:
+        """
+        Queue an event from any thread. A subscriber that has fallen
+        too far behind has its queue replaced by a resync.
+        """
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: BufferedEvent | None) -> None:
+        if self.queue.qsize() >= self.max_events:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+
+class ButtonEventHub:
+    """
+    Fans the events received by the listener out to the subscribers of
+    one worker, and keeps the last `buffer_size` of them for clients
+    resuming the feed.
+    """
+
+    def __init__(self, *, buffer_size: int) -> None:
+        self.buffer_size = buffer_size
+        self.listening = False
+        self._lock = threading.Lock()
+        self._buffer: deque[BufferedEvent] = deque(maxlen=buffer_size)
+        self._subscribers: set[Subscription] = set()
+
+    def subscribe(
+        self, last_event_id: str | None = None
+    ) -> tuple[Subscription, list[BufferedEvent] | None]:
+        """
+        Subscribe to the events, from the event loop of the caller.
+        Returns the subscription and the buffered events after
+        `last_event_id`, if given, or `None` if they aren't all known.
+        """
+        subscription = Subscription(self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id is None:
+                return subscription, []
+            events = list(self._buffer)
+        for position in range(len(events) - 1, -1, -1):
+            if events[position].id == last_event_id:
+                return subscription, events[position + 1 :]
+        return subscription, None
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Stop sending events to a subscriber.
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: BufferedEvent) -> None:
+        """
+        Buffer an event and send it to every subscriber.
+        """
+        with self._lock:
+            self._buffer.append(event)
+            for subscription in self._subscribers:
+                subscription.put(event)
+
+    def reset(self) -> None:
+        """
+        Forget the buffered events, and have every subscriber resync,
+        after events may have been missed.
+        """
+        with self._lock:
+            self._buffer.clear()
+            for subscription in self._subscribers:
+                subscription.put(RESYNC)
+
+    def subscribers(self) -> int:
+        """
+        Return the number of subscribers.
+        """
+        with self._lock:
+            return len(self._subscribers)
+
+
+button_events = ButtonEventHub(buffer_size=settings.BUTTON_EVENTS_BUFFER)
+
+
+def notify_button_event(session: Session, event: ButtonEvent) -> None:
+    """
+    Queue an event, to be published when the session's transaction
+    commits, if events are enabled.
+    """
+    if not settings.BUTTON_EVENTS_ENABLED:
+        return
+    session.exec(
+        text("SELECT pg_notify(:channel, :payload)"),  # type: ignore[call-overload]
+        params={"channel": BUTTON_EVENTS_CHANNEL, "payload": event.model_dump_json()},
+    )
+
+
+def parse_event(payload: str) -> BufferedEvent:
+    """
+    Read the fields subscribers filter on out of an event. Raises
+    `ValueError` or `KeyError` for a malformed one.
+    """
+    fields = json.loads(payload)
+    return BufferedEvent(
+        id=str(fields["id"]),
+        event=str(fields["event"]),
+        button_id=str(fields["button_id"]),
+        type=str(fields["type"]),
+        created_by=str(fields["created_by"]),
+        payload=payload,
+    )
+
+
+class ButtonEventListener:
+    """
+    Thread that LISTENs for Button events on its own connection and
+    publishes them to `button_events`.
+    """
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="button-event-listener", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop listening and wait for the thread to exit.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {BUTTON_EVENTS_CHANNEL}")
+                    button_events.listening = True
+                    while not self._stop.is_set():
+                        for notify in connection.notifies(timeout=LISTEN_TIMEOUT):
+                            self._handle(notify.payload)
+            except psycopg.Error:
+                logger.exception("Lost the Button event listener connection")
+                self._stop.wait(RECONNECT_DELAY)
+            finally:
+                button_events.listening = False
+                button_events.reset()
+
+    @staticmethod
+    def _handle(payload: str) -> None:
+        try:
+            event = parse_event(payload)
+        except (ValueError, KeyError):
+            logger.warning("Ignoring Button event %r", payload)
+            return
+        button_events.publish(event)
+
+
+def format_event(event: BufferedEvent | None) -> str:
+    """
+    Format an event, or a resync, as a server-sent event.
+    """
+    if event is None:
+        return "event: resync\ndata: {}\n\n"
+    return f"id: {event.id}\nevent: {event.event}\ndata: {event.payload}\n\n"
+
+
+async def stream_button_events(
+    *,
+    last_event_id: str | None = None,
+    button_ids: Container[str] | None = None,
+    type: str | None = None,  # pylint: disable=redefined-builtin
+    created_by: str | None = None,
+) -> AsyncGenerator[str, None]:
+    """
+    Yield the events of the Buttons in `button_ids`, of a `type`, or
+    created by a user (each if given) as server-sent events, starting
+    after `last_event_id` if given, until the client goes away.
+    """
+
+    def selected(event: BufferedEvent) -> bool:
+        return (
+            (button_ids is None or event.button_id in button_ids)
+            and (type is None or event.type == type)
+            and (created_by is None or event.created_by == created_by)
+        )
+
+    subscription, backlog = button_events.subscribe(last_event_id)
+    try:
+        if backlog is None:
+            yield format_event(RESYNC)
+        else:
+            for event in backlog:
+                if selected(event):
+                    yield format_event(event)
+        while True:
+            try:
+                queued = await asyncio.wait_for(
+                    subscription.queue.get(), KEEPALIVE_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if queued is RESYNC or selected(queued):
+                yield format_event(queued)
+    finally:
+        button_events.unsubscribe(subscription)
+
+
+_listener: ButtonEventListener | None = None
+
+
+def start_button_events() -> None:
+    """
+    Start listening for Button events, if they are enabled.
+    """
+    global _listener  # pylint: disable=global-statement
+    if settings.BUTTON_EVENTS_ENABLED and _listener is None:
+        _listener = ButtonEventListener()
+
+
+def stop_button_events() -> None:
+    """
+    Stop listening for Button events.
+    """
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.close()
+        _listener = None
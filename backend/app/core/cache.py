@@ -0,0 +1,155 @@
+"""
+Bounded in-process caches.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Thread-safe hash map whose entries expire after a per-entry TTL.
+
+    Lookups, inserts and evictions are all O(1). When the cache is full,
+    the least recently written entry is evicted, so memory stays bounded
+    no matter how many distinct keys are seen; expired entries are
+    dropped lazily as they are looked up or reach the eviction end.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        """
+        Return the value stored under `key`, unless it is missing or
+        has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: K, value: V, ttl: float) -> None:
+        """
+        Store `value` under `key` for `ttl` seconds.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """
+        Drop the entry stored under `key`, if any.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class BloomFilter:
+    """
+    Set of strings that may report false positives, but never false
+    negatives, in a fixed number of bits.
+
+    Sized so that, with up to `capacity` keys added, a key that was
+    never added is reported as present with probability `error_rate`
+    (about 1.2 bytes per key at 1%).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> list[int]:
+        # Double hashing over one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        """
+        Add `key` to the filter.
+        """
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class ExpiringBloomFilter:
+    """
+    Thread-safe Bloom filter whose keys are forgotten after `ttl` to
+    `2 * ttl` seconds.
+
+    Keys are added to the current of two filters, and looked up in
+    both. The current filter becomes the previous one once it is `ttl`
+    seconds old or holds `capacity` keys, so memory stays bounded and
+    the false positive rate stays near `error_rate`; a key may be
+    forgotten early if the filter fills up faster than that.
+    """
+
+    def __init__(self, capacity: int, ttl: float, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.ttl = ttl
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(1, error_rate)
+        self._rotated_at = time.monotonic()
+
+    def _rotate(self) -> None:
+        if (
+            self._current.count >= self.capacity
+            or time.monotonic() - self._rotated_at >= self.ttl
+        ):
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = time.monotonic()
+
+    def add(self, key: str) -> None:
+        """
+        Add `key` to the filter.
+        """
+        with self._lock:
+            self._rotate()
+            self._current.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._rotate()
+            return key in self._current or key in self._previous
@@ -11,6 +11,7 @@ from pydantic import (
     BeforeValidator,
     EmailStr,
     HttpUrl,
+    IPvAnyNetwork,
     PostgresDsn,
     computed_field,
     model_validator,
@@ -64,6 +65,14 @@ class Settings(BaseSettings):
             self.FRONTEND_HOST
         ]
 
+    # Addresses or networks of the reverse proxies (e.g. Traefik) whose
+    # X-Forwarded-For header is trusted: the client's IP is the right-most
+    # address in it that isn't one of them. The header of any other peer
+    # is ignored, so that clients can't pick the IP they're counted as.
+    TRUSTED_PROXIES: Annotated[
+        list[IPvAnyNetwork] | str, BeforeValidator(parse_cors)
+    ] = []
+
     PROJECT_NAME: str
     SENTRY_DSN: HttpUrl | None = None
     POSTGRES_SERVER: str
@@ -87,6 +96,132 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # How routes on `AsyncSessionDep` talk to the database: "sync" runs
+    # each call on a blocking connection in the threadpool, "async" uses
+    # psycopg's async driver on the event loop (see app.core.db).
+    DATABASE_MODE: Literal["sync", "async"] = "sync"
+    # Connection pool of each engine (the sync one, and the async one of
+    # DATABASE_MODE="async"), per worker: up to DB_POOL_SIZE connections
+    # are kept open and DB_POOL_MAX_OVERFLOW more opened under load, and
+    # a checkout waits up to DB_POOL_TIMEOUT_S for one to be free.
+    # Connections are replaced after DB_POOL_RECYCLE_S seconds (-1 =
+    # never), and tested before each checkout with DB_POOL_PRE_PING, at
+    # the cost of a round-trip. See GET /utils/metrics/ for their use.
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_S: float = 30
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = False
+
+    # How presses from `/buttons/{id}/increment` reach the database:
+    # "direct" writes each press in its own transaction, "buffered"
+    # queues them and writes them in batches (see app.core.press_buffer).
+    PRESS_INGEST_MODE: Literal["direct", "buffered"] = "direct"
+    # In buffered mode, "flush" answers a press once it has been written,
+    # "enqueue" as soon as it has been queued (faster, but a crash loses
+    # whatever is still queued).
+    PRESS_BUFFER_ACK: Literal["flush", "enqueue"] = "flush"
+    PRESS_BUFFER_FLUSH_MS: int = 20
+    PRESS_BUFFER_MAX_BATCH: int = 500
+    # Upper bound on the (Button, origin) pairs each worker remembers for
+    # press de-duplication.
+    PRESS_DEDUP_MAX_ENTRIES: int = 10_000
+    # How long (in seconds) the idempotency key of a press is remembered.
+    PRESS_IDEMPOTENCY_TTL_S: int = 86_400
+    # Keys each worker remembers in its in-memory prefilter of seen
+    # idempotency keys (see app.core.press_keys), per TTL period.
+    PRESS_KEY_FILTER_CAPACITY: int = 1_000_000
+    # How often (in seconds) each worker deletes expired idempotency
+    # keys and press de-duplication windows; 0 disables the cleanup.
+    PRESS_KEY_SWEEP_INTERVAL_S: int = 300
+    # Whether presses must carry the signed token of their Button's press
+    # URL (see GET /buttons/{id}/press-url); presses without a valid one
+    # are refused before the database is touched. A token given while
+    # this is off is still checked.
+    PRESS_TOKENS_REQUIRED: bool = False
+    # How often (in seconds) each worker folds the counter slots of
+    # striped Buttons back into one row; 0 disables folding.
+    COUNTER_FOLD_INTERVAL_S: int = 0
+    # How often (in seconds) each worker folds newly recorded uses into
+    # the hourly and daily usage rollups (see app.core.usage_rollup); 0
+    # disables folding.
+    USAGE_ROLLUP_INTERVAL_S: int = 10
+    # How often (in seconds) each worker creates the upcoming monthly
+    # partitions of `buttonuse`, and drops expired ones (see
+    # app.core.use_partitions); 0 disables both.
+    BUTTON_USE_PARTITION_INTERVAL_S: int = 3600
+    # Months of partitions created ahead of the current one.
+    BUTTON_USE_PARTITION_MONTHS_AHEAD: int = 3
+    # Months before the current one whose raw uses are kept; older
+    # partitions are dropped. 0 keeps them all. The usage rollups are
+    # kept regardless.
+    BUTTON_USE_RETENTION_MONTHS: int = 0
+    # How long (in seconds) after a PSA report period ends it is closed,
+    # and its report stored for good (see app.core.psa_report); presses
+    # replayed after that aren't counted in it.
+    PSA_REPORT_CLOSE_DELAY_S: int = 86_400
+    # Time zone whose periods have their PSA reports stored by the
+    # partition maintainer as soon as they close, and their uses kept
+    # until then regardless of BUTTON_USE_RETENTION_MONTHS.
+    PSA_REPORT_TZ: str = "UTC"
+    # Presses of missing or retired Buttons are answered from a per-worker
+    # cache, invalidated across workers through Postgres LISTEN/NOTIFY
+    # (see app.core.button_cache); a TTL of 0 disables it.
+    BUTTON_CACHE_TTL_S: float = 30
+    BUTTON_CACHE_MAX_ENTRIES: int = 10_000
+    # Whether presses, updates and retirements of Buttons are published
+    # through Postgres NOTIFY and served on `GET /buttons/events` (see
+    # app.core.button_events). Publishing adds a NOTIFY to every press
+    # transaction.
+    BUTTON_EVENTS_ENABLED: bool = True
+    # Events each worker keeps for clients resuming the feed, and that a
+    # client may fall behind by before it is told to resync.
+    BUTTON_EVENTS_BUFFER: int = 1_000
+    # bcrypt cost factor (log2 of the rounds) of new password hashes;
+    # hashes of another cost are rehashed when their user next logs in.
+    BCRYPT_ROUNDS: int = 12
+    # Processes each worker hashes and verifies passwords in, off its event
+    # loop and threadpool (0 hashes in the threadpool), and how many more
+    # passwords may wait for them before logins are turned away with a 503
+    # (see app.core.security).
+    PASSWORD_HASH_PROCESSES: int = 2
+    PASSWORD_HASH_QUEUE: int = 16
+    # Login attempts per account and per client IP over a sliding window of
+    # LOGIN_THROTTLE_WINDOW_S seconds, beyond which logins are refused with
+    # a 429 before any password is checked (see app.core.login_throttle);
+    # successful logins don't count, and a limit of 0 disables it. Each
+    # worker keeps the counts of up to LOGIN_THROTTLE_MAX_KEYS accounts
+    # and IPs, unless LOGIN_THROTTLE_SHARED keeps them in Postgres, where
+    # every worker shares them.
+    LOGIN_THROTTLE_WINDOW_S: int = 300
+    LOGIN_THROTTLE_MAX_PER_ACCOUNT: int = 10
+    LOGIN_THROTTLE_MAX_PER_IP: int = 50
+    LOGIN_THROTTLE_MAX_KEYS: int = 100_000
+    LOGIN_THROTTLE_SHARED: bool = False
+    # Authenticated users (and their decoded access tokens) are cached per
+    # worker, invalidated across workers through Postgres LISTEN/NOTIFY
+    # (see app.core.user_cache); a TTL of 0 disables it.
+    USER_CACHE_TTL_S: float = 30
+    USER_CACHE_MAX_ENTRIES: int = 10_000
+    # Directory of the local press journal, where presses are kept while
+    # the database is unavailable until they can be replayed (see
+    # app.core.press_journal); empty disables the journal.
+    PRESS_JOURNAL_DIR: str = ""
+    # With the journal on, how long (in milliseconds) a press may wait
+    # for a connection, and then take to be recorded, before it is
+    # journaled instead.
+    PRESS_JOURNAL_TIMEOUT_MS: int = 2_000
+    # How long (in milliseconds) journal appends wait to share an fsync.
+    PRESS_JOURNAL_FSYNC_MS: int = 5
+    # Size (in bytes) at which the journal starts a new segment file.
+    PRESS_JOURNAL_SEGMENT_BYTES: int = 16 * 1024 * 1024
+    # How often (in seconds) each worker replays journaled presses.
+    PRESS_JOURNAL_REPLAY_INTERVAL_S: float = 1
+    # Consecutive database failures after which presses go straight to
+    # the journal, and for how long (in seconds) before trying again.
+    PRESS_CIRCUIT_FAILURES: int = 5
+    PRESS_CIRCUIT_RESET_S: float = 10
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -0,0 +1,73 @@
+"""
+Periodic folding of striped Button counters.
+
+A Button with `counter_slots` accumulates up to that many counter rows,
+which every read has to sum. When `COUNTER_FOLD_INTERVAL_S` is set, a
+background thread per worker folds them back into a single row every
+that many seconds (see `crud.fold_button_counters`). Folding from
+several workers at once is harmless, just redundant.
+"""
+
+import logging
+import threading
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+
+class CounterFolder:
+    """
+    Thread that folds counter slots every `interval` seconds.
+    """
+
+    def __init__(self, *, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="counter-fold", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop the thread, waiting for a fold in progress to finish.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with Session(engine) as session:
+                    folded = crud.fold_button_counters(session=session)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to fold Button counters")
+                continue
+            if folded:
+                logger.info("Folded the counters of %d Buttons", folded)
+
+
+_folder: CounterFolder | None = None
+
+
+def start_counter_folding() -> None:
+    """
+    Start this worker's counter folder, if folding is enabled.
+    """
+    global _folder  # pylint: disable=global-statement
+    if settings.COUNTER_FOLD_INTERVAL_S > 0 and _folder is None:
+        _folder = CounterFolder(interval=settings.COUNTER_FOLD_INTERVAL_S)
+
+
+def stop_counter_folding() -> None:
+    """
+    Stop this worker's counter folder, if it is running.
+    """
+    global _folder  # pylint: disable=global-statement
+    if _folder is not None:
+        _folder.close()
+        _folder = None
@@ -2,12 +2,109 @@
 Database initialization and session management.
 """
 
+from collections.abc import Callable
+from typing import Any, Concatenate, ParamSpec, TypeVar
+
 from app import crud
 from app.core.config import settings
+from app.core.db_pool import TimedAsyncQueuePool, TimedQueuePool
 from app.models import User, UserCreate
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession as _AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+# Each engine has a pool of its own, of the size set by the DB_POOL_*
+# settings
+POOL_OPTIONS: dict[str, Any] = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT_S,
+    "pool_recycle": settings.DB_POOL_RECYCLE_S,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), poolclass=TimedQueuePool, **POOL_OPTIONS
+)
+# Same database through psycopg's async driver, for DATABASE_MODE="async"
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=TimedAsyncQueuePool,
+    **POOL_OPTIONS,
+)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class AsyncSession(_AsyncSession):
+    """
+    SQLModel's `AsyncSession`, typed so that `run_sync` hands SQLModel's
+    `Session` (which it does at runtime) to functions such as those in
+    `app.crud`.
+    """
+
+    async def run_sync(
+        self,
+        fn: Callable[Concatenate[Session, P], T],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        """
+        Call `fn(sync_session, *args, **kwargs)` in a greenlet, where its
+        blocking database calls are awaited on the event loop.
+        """
+        return await super().run_sync(fn, *args, **kwargs)  # type: ignore[arg-type]
+
+
+class ThreadedSession:  # pylint: disable=missing-function-docstring
+    """
+    Stand-in for `AsyncSession` over a sync `Session`, for
+    DATABASE_MODE="sync": each call runs in Starlette's threadpool, on a
+    blocking connection from `engine`.
+
+    Only the part of the `AsyncSession` API the routes use is provided.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.sync_session = session
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Call `fn(sync_session, *args, **kwargs)` in the threadpool.
+        """
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def exec(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.exec, *args, **kwargs)
+
+    def add(self, instance: object) -> None:
+        self.sync_session.add(instance)
+
+    async def delete(self, instance: object) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def merge(self, instance: T, *, load: bool = True) -> T:
+        if not load:
+            # Doesn't touch the database
+            return self.sync_session.merge(instance, load=False)
+        return await run_in_threadpool(self.sync_session.merge, instance, load=load)
+
+    async def refresh(self, instance: object) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
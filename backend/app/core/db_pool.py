@@ -0,0 +1,205 @@
+"""
+Instrumented connection pools, for sizing them (see `DB_POOL_SIZE`).
+
+Both engines of app.core.db check their connections out of a pool of
+their own, per worker. These pools time every checkout, from the
+request for a connection until it is handed over (waiting for one to be
+checked in, opening a new one, and its pre-ping, if enabled), and count
+the checkouts that time out after `DB_POOL_TIMEOUT_S`. Along with the
+connections in use, that shows whether requests queue for connections,
+and how many each worker really needs: the peak in use times the
+workers (and the few connections each worker's listeners hold) has to
+stay below Postgres' `max_connections`.
+
+A caller that can't wait as long as `DB_POOL_TIMEOUT_S`, such as a
+press with the journal to fall back on, bounds the checkouts it makes
+with `checkout_timeout()`.
+"""
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from app.models import DbPoolStats
+from sqlalchemy import event, exc
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    Pool,
+    PoolProxiedConnection,
+    QueuePool,
+)
+
+
+# Upper bound (in seconds) on the checkouts made in the current context,
+# which SQLAlchemy carries into `run_sync` greenlets, and Starlette into
+# its threadpool
+_checkout_timeout: ContextVar[float | None] = ContextVar(
+    "checkout_timeout", default=None
+)
+
+
+@contextmanager
+def checkout_timeout(timeout: float) -> Iterator[None]:
+    """
+    Wait at most `timeout` seconds (or the pool's own timeout, if lower)
+    for the connections checked out within the block.
+    """
+    token = _checkout_timeout.set(timeout)
+    try:
+        yield
+    finally:
+        _checkout_timeout.reset(token)
+
+
+class PoolCounters:
+    """
+    Counters of the checkouts of one engine's pool, kept across the
+    pools it recreates.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._connects = 0
+        self._invalidations = 0
+        self._max_checked_out = 0
+        self._last_wait = 0.0
+        self._max_wait = 0.0
+        self._total_wait = 0.0
+
+    def checked_out(self, wait: float, checked_out: int) -> None:
+        """
+        Count a checkout that took `wait` seconds, after which
+        `checked_out` connections were in use.
+        """
+        with self._lock:
+            self._checkouts += 1
+            self._last_wait = wait
+            self._max_wait = max(self._max_wait, wait)
+            self._total_wait += wait
+            self._max_checked_out = max(self._max_checked_out, checked_out)
+
+    def timed_out(self) -> None:
+        """
+        Count a checkout that timed out.
+        """
+        with self._lock:
+            self._timeouts += 1
+
+    def connected(self) -> None:
+        """
+        Count a connection opened by the pool, or reopened after it was
+        invalidated.
+        """
+        with self._lock:
+            self._connects += 1
+
+    def invalidated(self) -> None:
+        """
+        Count a connection dropped as broken (e.g. by its pre-ping).
+        """
+        with self._lock:
+            self._invalidations += 1
+
+    def stats(self, pool: QueuePool) -> DbPoolStats:
+        """
+        Snapshot of the counters, with the current state of `pool`.
+        """
+        with self._lock:
+            return DbPoolStats(
+                size=pool.size(),
+                max_overflow=pool._max_overflow,  # pylint: disable=protected-access
+                timeout_s=pool.timeout(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(0, pool.overflow()),
+                max_checked_out=self._max_checked_out,
+                checkouts=self._checkouts,
+                timeouts=self._timeouts,
+                connects=self._connects,
+                invalidations=self._invalidations,
+                last_wait_ms=self._last_wait * 1000,
+                max_wait_ms=self._max_wait * 1000,
+                mean_wait_ms=(
+                    self._total_wait / self._checkouts * 1000 if self._checkouts else 0
+                ),
+            )
+
+
+class _TimedCheckouts(QueuePool):
+    """
+    `QueuePool` that counts its checkouts in the `counters` of its class.
+    """
+
+    counters: PoolCounters
+
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        cls.counters = PoolCounters()
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # A recreated pool takes the listeners of the one it replaces
+        if kwargs.get("_dispatch") is None:
+            event.listen(self, "connect", self._connected)
+            event.listen(self, "invalidate", self._invalidated)
+
+    # Read by `QueuePool` whenever it waits for a connection
+    @property  # type: ignore[override]
+    def _timeout(self) -> float:
+        timeout = _checkout_timeout.get()
+        if timeout is None:
+            return self._pool_timeout
+        return min(timeout, self._pool_timeout)
+
+    @_timeout.setter
+    def _timeout(self, timeout: float) -> None:
+        self._pool_timeout = timeout
+
+    def _connected(self, *_: object) -> None:
+        self.counters.connected()
+
+    def _invalidated(self, *_: object) -> None:
+        self.counters.invalidated()
+
+    def connect(self) -> PoolProxiedConnection:
+        """
+        Check a connection out, counting how long it took.
+        """
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.counters.timed_out()
+            raise
+        self.counters.checked_out(time.perf_counter() - started, self.checkedout())
+        return connection
+
+    def stats(self) -> DbPoolStats:
+        """
+        Snapshot of the counters and state of the pool.
+        """
+        return self.counters.stats(self)
+
+
+class TimedQueuePool(_TimedCheckouts):
+    """
+    Pool of the sync engine.
+    """
+
+
+class TimedAsyncQueuePool(_TimedCheckouts, AsyncAdaptedQueuePool):
+    """
+    Pool of the async engine.
+    """
+
+
+def pool_stats(pool: Pool) -> DbPoolStats | None:
+    """
+    Snapshot of the counters and state of a pool, if it is instrumented.
+    """
+    return pool.stats() if isinstance(pool, _TimedCheckouts) else None
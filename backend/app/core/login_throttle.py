@@ -0,0 +1,228 @@
+"""
+Throttling of login attempts, to keep password guessing from spending
+the CPU on bcrypt.
+
+Attempts are counted per account and per client IP over a sliding
+window of `LOGIN_THROTTLE_WINDOW_S` seconds, approximated from the
+counts of the current and the previous fixed window: the previous count
+is weighted by how much of the previous window the sliding one still
+overlaps. An attempt that would take either count to its limit
+(`LOGIN_THROTTLE_MAX_PER_ACCOUNT`, `LOGIN_THROTTLE_MAX_PER_IP`) is
+refused before the user is even looked up. Attempts are counted as they
+start, so concurrent ones can't all slip through while their passwords
+are checked, and taken back once they succeed, so that only failures
+add up.
+
+By default each worker keeps its own counts, of at most
+`LOGIN_THROTTLE_MAX_KEYS` accounts and IPs (the least recently attempted
+ones are forgotten first), so memory stays bounded however many keys an
+attacker cycles through. With `LOGIN_THROTTLE_SHARED`, the counts are
+kept in the `loginattempt` table instead, where every worker shares
+them, for one more round-trip per login. Either way, accounts and IPs
+are counted under a hash of their name, so that keys have a fixed size
+however long a username is sent.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from app import crud
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.db import AsyncSession
+
+
+class LoginThrottled(Exception):
+    """
+    Raised when a login attempt is over a limit. `retry_after` is the
+    number of seconds until it would be allowed.
+    """
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def retry_after(
+    *, limit: int, previous: int, current: int, elapsed: float, window: float
+) -> float:
+    """
+    Return how long after `elapsed` seconds into the current window the
+    sliding count drops below `limit`, if no attempts are counted
+    meanwhile.
+    """
+    if current >= limit:
+        # Once the current window has become the previous one
+        return window - elapsed + window * (1 - limit / current)
+    return max(0.0, window * (1 - (limit - current) / previous) - elapsed)
+
+
+def over_limit(
+    counts: list[tuple[int, int, int]], *, elapsed: float, window: float
+) -> float | None:
+    """
+    Given the limit and the previous and current counts of each key of
+    an attempt, return `None` if none has reached its limit, or else how
+    long until they all would be below it.
+    """
+    weight = 1 - elapsed / window
+    waits = [
+        retry_after(
+            limit=limit,
+            previous=previous,
+            current=current,
+            elapsed=elapsed,
+            window=window,
+        )
+        for limit, previous, current in counts
+        if previous * weight + current >= limit
+    ]
+    return max(waits) if waits else None
+
+
+class LoginThrottle:
+    """
+    Per-worker sliding-window counts of login attempts per key, for at
+    most `max_keys` keys.
+    """
+
+    def __init__(self, *, window: float, max_keys: int) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        # Key -> (window index, previous count, current count)
+        self._counts: TTLCache[str, tuple[int, int, int]] = TTLCache(max_keys)
+
+    def _counts_at(self, key: str, window_index: int) -> tuple[int, int]:
+        counts = self._counts.get(key)
+        if counts is None:
+            return 0, 0
+        index, previous, current = counts
+        if index == window_index:
+            return previous, current
+        if index == window_index - 1:
+            return current, 0
+        return 0, 0
+
+    def attempt(self, limits: dict[str, int], now: float) -> float | None:
+        """
+        Count an attempt against each key of `limits`, unless any of them
+        has reached its limit. Returns `None` if the attempt is allowed,
+        or else how long until it would be.
+        """
+        window_index, elapsed = divmod(now, self.window)
+        with self._lock:
+            counts = {key: self._counts_at(key, int(window_index)) for key in limits}
+            wait = over_limit(
+                [(limits[key], *counts[key]) for key in limits],
+                elapsed=elapsed,
+                window=self.window,
+            )
+            if wait is not None:
+                return wait
+            for key, (previous, current) in counts.items():
+                # Kept until the counts would have no weight
+                self._counts.set(
+                    key,
+                    (int(window_index), previous, current + 1),
+                    2 * self.window - elapsed,
+                )
+        return None
+
+    def forgive(self, keys: list[str], now: float) -> None:
+        """
+        Take back an attempt counted against `keys` at about `now`.
+        """
+        window_index, elapsed = divmod(now, self.window)
+        with self._lock:
+            for key in keys:
+                counts = self._counts.get(key)
+                if counts is not None and counts[0] == window_index and counts[2]:
+                    index, previous, current = counts
+                    self._counts.set(
+                        key, (index, previous, current - 1), 2 * self.window - elapsed
+                    )
+
+    def clear(self) -> None:
+        """
+        Forget every count.
+        """
+        self._counts.clear()
+
+
+login_throttle = LoginThrottle(
+    window=settings.LOGIN_THROTTLE_WINDOW_S, max_keys=settings.LOGIN_THROTTLE_MAX_KEYS
+)
+
+
+def throttle_key(kind: str, name: str) -> str:
+    """
+    Return the key attempts on the account or IP `name` are counted
+    under.
+    """
+    return f"{kind}:{hashlib.blake2b(name.encode(), digest_size=16).hexdigest()}"
+
+
+def login_limits(account: str, client_ip: str) -> dict[str, int]:
+    """
+    Return the enabled limits of a login attempt, by key.
+    """
+    account_key = throttle_key("account", account.lower())
+    limits = {
+        account_key: settings.LOGIN_THROTTLE_MAX_PER_ACCOUNT,
+        throttle_key("ip", client_ip): settings.LOGIN_THROTTLE_MAX_PER_IP,
+    }
+    return {key: limit for key, limit in limits.items() if limit > 0}
+
+
+async def throttle_login(
+    session: AsyncSession, *, account: str, client_ip: str
+) -> list[str]:
+    """
+    Count a login attempt to `account` from `client_ip`. Returns the
+    keys it was counted against, to `forgive_login` if it succeeds.
+    Raises `LoginThrottled` if it is over a limit.
+    """
+    limits = login_limits(account, client_ip)
+    if not limits:
+        return []
+    now = time.time()
+    if not settings.LOGIN_THROTTLE_SHARED:
+        wait = login_throttle.attempt(limits, now)
+    else:
+        window = settings.LOGIN_THROTTLE_WINDOW_S
+        window_index, elapsed = divmod(now, window)
+        allowed, counts = await session.run_sync(
+            lambda sync_session: crud.record_login_attempt(
+                session=sync_session,
+                limits=limits,
+                window_index=int(window_index),
+                weight=1 - elapsed / window,
+            )
+        )
+        wait = None
+        if not allowed:
+            wait = over_limit(counts, elapsed=elapsed, window=window) or 0.0
+    if wait is not None:
+        raise LoginThrottled(max(1, math.ceil(wait)))
+    return list(limits)
+
+
+async def forgive_login(session: AsyncSession, keys: list[str]) -> None:
+    """
+    Take back a login attempt that succeeded.
+    """
+    if not keys:
+        return
+    now = time.time()
+    if not settings.LOGIN_THROTTLE_SHARED:
+        login_throttle.forgive(keys, now)
+        return
+    await session.run_sync(
+        lambda sync_session: crud.forgive_login_attempt(
+            session=sync_session,
+            keys=keys,
+            window_index=int(now // settings.LOGIN_THROTTLE_WINDOW_S),
+        )
+    )
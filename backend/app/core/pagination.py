@@ -0,0 +1,86 @@
+"""
+Keyset pagination.
+
+Lists are ordered on an indexed `(key, id)` pair, and each page ends
+with an opaque cursor encoding the pair of its last row. The next page
+starts strictly after that pair, which an index range scan finds in the
+same time however deep the page is, and rows inserted meanwhile neither
+shift nor repeat rows across pages, unlike with `OFFSET`.
+
+A cursor also records the ordering it was issued for, so that it isn't
+applied to another one.
+"""
+
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Literal, TypeVar
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import ColumnElement, SQLColumnExpression, literal, tuple_
+
+T = TypeVar("T", datetime, str, int)
+
+# How the total number of rows is computed: exactly, by `count(*)`;
+# as estimated by the planner, which doesn't read the rows; or not at all
+CountMode = Literal["exact", "estimated", "none"]
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised for a cursor that wasn't issued by `encode_cursor` for the
+    ordering it is used with.
+    """
+
+
+def encode_cursor(order: str, key: datetime | str | int, id: uuid.UUID) -> str:
+    """
+    Encode the key of the last row of a page in `order` as an opaque
+    cursor.
+    """
+    # pylint: disable=redefined-builtin
+    payload = to_json([order, key, id])
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str, key_type: type[T]) -> tuple[T, uuid.UUID]:
+    """
+    Decode a cursor issued for `order` back into the key it was encoded
+    from.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, key, id = json.loads(payload)  # pylint: disable=redefined-builtin
+        # ValidationError is a ValueError
+        decoded = TypeAdapter(key_type).validate_python(key), uuid.UUID(id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if cursor_order != order:
+        raise InvalidCursor(cursor)
+    return decoded
+
+
+def after_cursor(
+    order: str,
+    key: SQLColumnExpression[T],
+    id: SQLColumnExpression[uuid.UUID],
+    cursor: str,
+    key_type: type[T],
+    *,
+    descending: bool = False,
+) -> ColumnElement[bool]:
+    """
+    Condition selecting the rows after a cursor, in `(key, id)` order,
+    or in reverse order if `descending`. Raises `InvalidCursor` for a
+    malformed cursor, or one issued for another ordering.
+    """
+    # pylint: disable=redefined-builtin
+    last_key, last_id = decode_cursor(cursor, order, key_type)
+    # A row comparison, so that Postgres seeks into the (key, id) index
+    # rather than filtering on each column
+    row = tuple_(key, id)
+    last = tuple_(literal(last_key), literal(last_id))
+    return row < last if descending else row > last
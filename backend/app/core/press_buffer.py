@@ -0,0 +1,245 @@
+"""
+Write-behind buffer for Button presses.
+
+When a cart wall fires many keys at once, committing every press in its
+own transaction makes the commit (and the row lock on each Button's
+counter) the bottleneck. In buffered mode, presses are queued in-process
+and a single writer thread per worker flushes them every
+`PRESS_BUFFER_FLUSH_MS` milliseconds, or as soon as
+`PRESS_BUFFER_MAX_BATCH` presses are queued, as one statement (see
+`crud.record_button_presses`). If the database is unavailable, the batch
+goes to the press journal when it is enabled.
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import Future
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.press_journal import UNAVAILABLE, PressJournaled, get_press_journal
+from app.models import ButtonPress, ButtonPublic, PressBufferStats
+from psycopg.errors import DeadlockDetected
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+PressResult = tuple[ButtonPublic | None, bool]
+
+# Attempts at flushing a batch that lost a deadlock against another
+# worker flushing an overlapping set of Buttons.
+FLUSH_ATTEMPTS = 3
+
+_STOP = object()
+
+
+class PressBuffer:
+    """
+    Queue of pending presses drained by a single writer thread.
+    """
+
+    def __init__(self, *, flush_interval: float, max_batch: int) -> None:
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: queue.Queue[object] = queue.Queue()
+        self._pending: Counter[uuid.UUID] = Counter()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._presses = 0
+        self._failed_batches = 0
+        self._last_batch_size = 0
+        self._max_batch_size = 0
+        self._last_flush = 0.0
+        self._max_flush = 0.0
+        self._total_flush = 0.0
+        self._writer = threading.Thread(
+            target=self._run, name="press-buffer", daemon=True
+        )
+        self._writer.start()
+
+    def submit(self, press: ButtonPress) -> "Future[PressResult]":
+        """
+        Queue a press. The returned future resolves once the batch it
+        belongs to has been flushed, with the same result as
+        `crud.increment_button_usage`.
+        """
+        future: Future[PressResult] = Future()
+        with self._lock:
+            self._pending[press.button_id] += 1
+        self._queue.put((press, future))
+        return future
+
+    def pending(self, button_id: uuid.UUID) -> int:
+        """
+        Number of presses of a Button that are queued but not flushed.
+        """
+        with self._lock:
+            return self._pending[button_id]
+
+    def close(self) -> None:
+        """
+        Flush whatever is queued and stop the writer thread.
+        """
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def stats(self) -> PressBufferStats:
+        """
+        Snapshot of the batch size and flush latency counters.
+        """
+        with self._lock:
+            batches = self._batches or 1
+            return PressBufferStats(
+                ack=settings.PRESS_BUFFER_ACK,
+                queued=sum(self._pending.values()),
+                batches=self._batches,
+                presses=self._presses,
+                failed_batches=self._failed_batches,
+                last_batch_size=self._last_batch_size,
+                max_batch_size=self._max_batch_size,
+                mean_batch_size=self._presses / batches,
+                last_flush_ms=self._last_flush * 1000,
+                max_flush_ms=self._max_flush * 1000,
+                mean_flush_ms=self._total_flush / batches * 1000,
+            )
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)  # type: ignore[arg-type]
+
+    def _flush(self, batch: list[tuple[ButtonPress, "Future[PressResult]"]]) -> None:
+        presses = [press for press, _ in batch]
+        start = time.perf_counter()
+        journal = get_press_journal()
+        misclaimed: set[uuid.UUID] = set()
+        try:
+            results = self._write(presses, misclaimed)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.exception("Failed to flush %d buffered presses", len(batch))
+            error: Exception = exc
+            if journal is not None and isinstance(exc, UNAVAILABLE):
+                journal.circuit.failed()
+                try:
+                    journal.append(presses).result()
+                    error = PressJournaled()
+                except OSError:
+                    pass
+            with self._lock:
+                self._failed_batches += 1
+                self._release(presses)
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        if journal is not None:
+            journal.circuit.succeeded()
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._release(presses)
+            self._batches += 1
+            self._presses += len(batch)
+            self._last_batch_size = len(batch)
+            self._max_batch_size = max(self._max_batch_size, len(batch))
+            self._last_flush = elapsed
+            self._max_flush = max(self._max_flush, elapsed)
+            self._total_flush += elapsed
+        for press, future in batch:
+            if press.id in misclaimed:
+                future.set_exception(crud.IdempotencyKeyConflict())
+                continue
+            button, recorded = results.get(press.button_id, (None, set()))
+            future.set_result((button, press.id in recorded))
+
+    def _release(self, presses: list[ButtonPress]) -> None:
+        # Caller holds the lock
+        for press in presses:
+            self._pending[press.button_id] -= 1
+            if not self._pending[press.button_id]:
+                del self._pending[press.button_id]
+
+    @staticmethod
+    def _write(
+        presses: list[ButtonPress], misclaimed: set[uuid.UUID]
+    ) -> dict[uuid.UUID, tuple[ButtonPublic, set[uuid.UUID]]]:
+        attempt = 1
+        while True:
+            try:
+                with Session(engine) as session:
+                    return crud.record_button_presses(
+                        session=session,
+                        presses=presses,
+                        misclaimed=misclaimed,
+                        timeout_ms=(
+                            settings.PRESS_JOURNAL_TIMEOUT_MS
+                            if get_press_journal()
+                            else None
+                        ),
+                    )
+            except OperationalError as exc:
+                if not isinstance(exc.orig, DeadlockDetected):
+                    raise
+                if attempt == FLUSH_ATTEMPTS:
+                    raise
+                logger.warning("Press flush deadlocked, retrying (%d)", attempt)
+                attempt += 1
+
+
+_buffer: PressBuffer | None = None
+_buffer_lock = threading.Lock()
+
+
+def get_press_buffer() -> PressBuffer:
+    """
+    Return this worker's press buffer, starting its writer thread on
+    first use (so that it is started after the worker has forked).
+    """
+    global _buffer  # pylint: disable=global-statement
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = PressBuffer(
+                flush_interval=settings.PRESS_BUFFER_FLUSH_MS / 1000,
+                max_batch=settings.PRESS_BUFFER_MAX_BATCH,
+            )
+        return _buffer
+
+
+def press_buffer_stats() -> PressBufferStats | None:
+    """
+    Return the counters of this worker's press buffer, if it is running.
+    """
+    return _buffer.stats() if _buffer is not None else None
+
+
+def close_press_buffer() -> None:
+    """
+    Flush and stop this worker's press buffer, if it is running.
+    """
+    global _buffer  # pylint: disable=global-statement
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.close()
+            _buffer = None
@@ -0,0 +1,415 @@
+"""
+Local journal of presses that couldn't reach the database.
+
+With `PRESS_JOURNAL_DIR` set, a press whose write fails because the
+database is unavailable, or that waits longer than
+`PRESS_JOURNAL_TIMEOUT_MS` for a connection or for its statement, is
+appended to this journal instead and acknowledged once it is on disk.
+After `PRESS_CIRCUIT_FAILURES` consecutive failures the circuit opens,
+and presses go straight to the journal for `PRESS_CIRCUIT_RESET_S`
+seconds before the database is tried again.
+
+The journal is a directory of append-only segment files, each a
+sequence of records: the little-endian length and CRC-32 of a payload,
+then the payload (the press as JSON). A writer thread per worker
+appends records and fsyncs them every `PRESS_JOURNAL_FSYNC_MS`, so
+concurrent presses share an fsync, and starts a new segment past
+`PRESS_JOURNAL_SEGMENT_BYTES`. A worker holds an exclusive `flock` on
+the segment it is writing.
+
+A replayer thread per worker closes its own segment once it holds
+records, then replays every segment it can lock, including those left
+behind by a crashed worker, through `crud.record_button_presses`,
+keeping the presses' original timestamps, and deletes it. Presses of
+Buttons that turn out to be missing or retired are dropped then, and
+those of a Button with a de-duplication window are checked against the
+presses recorded around them, including live ones recorded meanwhile.
+A record whose CRC doesn't match, such as one torn by a crash
+mid-write, ends its segment. Every journaled press carries an idempotency
+key, so replaying a segment again after a crash doesn't count it
+twice.
+"""
+
+import fcntl
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from pathlib import Path
+from typing import BinaryIO
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import ButtonPress, PressJournalStats
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the database couldn't record a press, rather than
+# that the press itself was rejected
+UNAVAILABLE = (OperationalError, InterfaceError, PoolTimeoutError)
+
+HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".journal"
+# Presses replayed per statement
+REPLAY_BATCH = 1_000
+
+_STOP = object()
+
+
+class PressJournaled(Exception):
+    """
+    Raised instead of a database error for presses that were journaled.
+    """
+
+
+def encode(press: ButtonPress) -> bytes:
+    """
+    Encode a press as a journal record.
+    """
+    payload = press.model_dump_json().encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode(data: bytes) -> tuple[list[ButtonPress], bool]:
+    """
+    Decode the records of a segment. Returns the presses up to the
+    first truncated or corrupt record, and whether there was one.
+    """
+    presses: list[ButtonPress] = []
+    offset = 0
+    while offset < len(data):
+        if offset + HEADER.size > len(data):
+            return presses, True
+        length, crc = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        payload = data[offset : offset + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return presses, True
+        presses.append(ButtonPress.model_validate_json(payload))
+        offset += length
+    return presses, False
+
+
+class PressCircuit:
+    """
+    Circuit breaker over the database, as seen by the press path.
+
+    Opens after `failures` consecutive failures. Once `reset` seconds
+    have passed, a single press is let through to try the database
+    again: if it succeeds the circuit closes, otherwise it stays open
+    for another `reset` seconds.
+    """
+
+    def __init__(self, *, failures: int, reset: float) -> None:
+        self.failures = failures
+        self.reset = reset
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Whether presses are currently sent straight to the journal.
+        """
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """
+        Whether a press should try the database.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset:
+                return False
+            # Let this press through, and keep the rest out meanwhile
+            self._opened_at = time.monotonic()
+            return True
+
+    def succeeded(self) -> None:
+        """
+        Record that the database recorded a press.
+        """
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+
+    def failed(self) -> None:
+        """
+        Record that the database was unavailable for a press.
+        """
+        with self._lock:
+            self._consecutive += 1
+            if self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+class PressJournal:
+    """
+    Segmented journal of presses in `directory`, with a writer and a
+    replayer thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        segment_bytes: int,
+        fsync_interval: float,
+        replay_interval: float,
+        circuit: PressCircuit,
+    ) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.replay_interval = replay_interval
+        self.circuit = circuit
+        self._queue: queue.Queue[object] = queue.Queue()
+        self._lock = threading.Lock()
+        self._segment: BinaryIO | None = None
+        self._segment_size = 0
+        self._appended = 0
+        self._replayed = 0
+        self._corrupt = 0
+        self._stop = threading.Event()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="press-journal-writer", daemon=True
+        )
+        self._replayer = threading.Thread(
+            target=self._replay_loop, name="press-journal-replayer", daemon=True
+        )
+        self._writer.start()
+        self._replayer.start()
+
+    def append(self, presses: list[ButtonPress]) -> "Future[None]":
+        """
+        Queue presses to be journaled. The returned future resolves once
+        they have been fsynced.
+
+        Presses without an idempotency key are given one, so that they
+        are recorded once however many times they are replayed.
+        """
+        for press in presses:
+            if press.idempotency_key is None:
+                press.idempotency_key = f"journal:{press.id}"
+        future: Future[None] = Future()
+        records = b"".join(encode(press) for press in presses)
+        self._queue.put((records, len(presses), future))
+        return future
+
+    def close(self) -> None:
+        """
+        Stop both threads, after writing whatever is queued. Journaled
+        presses are left on disk, to be replayed by the next worker.
+        """
+        self._stop.set()
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._replayer.join()
+        with self._lock:
+            self._close_segment()
+
+    def stats(self) -> PressJournalStats:
+        """
+        Snapshot of the journal's depth and counters.
+        """
+        sizes = []
+        for path in self._segment_paths():
+            try:
+                sizes.append(path.stat().st_size)
+            except FileNotFoundError:
+                # Replayed meanwhile
+                continue
+        with self._lock:
+            return PressJournalStats(
+                circuit_open=self.circuit.is_open,
+                segments=len(sizes),
+                bytes=sum(sizes),
+                appended=self._appended,
+                replayed=self._replayed,
+                corrupt=self._corrupt,
+            )
+
+    def replay(self) -> int:
+        """
+        Close this worker's segment if it holds records, then replay
+        and delete every segment no other worker holds.
+
+        Returns the number of presses replayed.
+        """
+        with self._lock:
+            if self._segment_size:
+                self._close_segment()
+        replayed = 0
+        for path in self._segment_paths():
+            replayed += self._replay_segment(path)
+        if replayed:
+            logger.info("Replayed %d journaled presses", replayed)
+        return replayed
+
+    def _segment_paths(self) -> list[Path]:
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def _replay_segment(self, path: Path) -> int:
+        try:
+            segment = path.open("rb")
+        except FileNotFoundError:
+            return 0
+        with segment:
+            try:
+                fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Being written, or replayed by another worker
+                return 0
+            try:
+                if os.stat(path).st_ino != os.fstat(segment.fileno()).st_ino:
+                    return 0
+            except FileNotFoundError:
+                # Replayed and deleted by another worker meanwhile
+                return 0
+            presses, corrupt = decode(segment.read())
+            for start in range(0, len(presses), REPLAY_BATCH):
+                with Session(engine) as session:
+                    crud.record_button_presses(
+                        session=session, presses=presses[start : start + REPLAY_BATCH]
+                    )
+            path.unlink()
+        if corrupt:
+            logger.warning(
+                "Journal segment %s ended with a corrupt record after %d presses",
+                path.name,
+                len(presses),
+            )
+        with self._lock:
+            self._replayed += len(presses)
+            self._corrupt += corrupt
+        return len(presses)
+
+    def _replay_loop(self) -> None:
+        while not self._stop.wait(self.replay_interval):
+            try:
+                if self.replay():
+                    self.circuit.succeeded()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to replay journaled presses")
+
+    def _write_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # Let presses arriving meanwhile share the fsync
+            deadline = time.monotonic() + self.fsync_interval
+            while (timeout := deadline - time.monotonic()) > 0:
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)  # type: ignore[arg-type]
+
+    def _write(self, batch: list[tuple[bytes, int, "Future[None]"]]) -> None:
+        try:
+            with self._lock:
+                if self._segment is None:
+                    self._open_segment()
+                assert self._segment is not None
+                for records, _, _ in batch:
+                    self._segment.write(records)
+                    self._segment_size += len(records)
+                self._segment.flush()
+                os.fsync(self._segment.fileno())
+                self._appended += sum(count for _, count, _ in batch)
+                if self._segment_size >= self.segment_bytes:
+                    self._close_segment()
+        except OSError as exc:
+            logger.exception("Failed to journal %d presses", len(batch))
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+        for _, _, future in batch:
+            future.set_result(None)
+
+    def _open_segment(self) -> None:
+        # Caller holds the lock. The segment is locked before it gets
+        # its name, so that no replayer can take it while it is empty.
+        name = f"{time.time_ns():020d}-{os.getpid()}"
+        partial = self.directory / f"{name}.partial"
+        segment = partial.open("ab")
+        fcntl.flock(segment, fcntl.LOCK_EX)
+        partial.rename(self.directory / f"{name}{SEGMENT_SUFFIX}")
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        self._segment = segment
+        self._segment_size = 0
+
+    def _close_segment(self) -> None:
+        # Caller holds the lock
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+            self._segment_size = 0
+
+
+_journal: PressJournal | None = None
+
+
+def get_press_journal() -> PressJournal | None:
+    """
+    Return this worker's press journal, if the journal is enabled.
+    """
+    return _journal
+
+
+def press_journal_stats() -> PressJournalStats | None:
+    """
+    Return the depth and counters of the press journal, if enabled.
+    """
+    return _journal.stats() if _journal is not None else None
+
+
+def start_press_journal() -> None:
+    """
+    Start this worker's press journal, if `PRESS_JOURNAL_DIR` is set.
+    """
+    global _journal  # pylint: disable=global-statement
+    if settings.PRESS_JOURNAL_DIR and _journal is None:
+        _journal = PressJournal(
+            Path(settings.PRESS_JOURNAL_DIR),
+            segment_bytes=settings.PRESS_JOURNAL_SEGMENT_BYTES,
+            fsync_interval=settings.PRESS_JOURNAL_FSYNC_MS / 1000,
+            replay_interval=settings.PRESS_JOURNAL_REPLAY_INTERVAL_S,
+            circuit=PressCircuit(
+                failures=settings.PRESS_CIRCUIT_FAILURES,
+                reset=settings.PRESS_CIRCUIT_RESET_S,
+            ),
+        )
+
+
+def stop_press_journal() -> None:
+    """
+    Stop this worker's press journal, if it is running.
+    """
+    global _journal  # pylint: disable=global-statement
+    if _journal is not None:
+        _journal.close()
+        _journal = None
@@ -0,0 +1,95 @@
+"""
+Idempotency keys of presses.
+
+A press may carry an idempotency key, which the statement recording it
+claims in `buttonpresskey` (unique on the key), so a retry is never
+recorded twice, whichever worker it reaches. Retries are rare, so to
+answer them without a lookup on every keyed press, each worker
+remembers the keys it has seen in `seen_press_keys`, a Bloom filter:
+only a key that may have been seen is looked up, to return the result
+of the original press.
+
+Expired keys can be reclaimed by the recording statement as they are,
+and are deleted every `PRESS_KEY_SWEEP_INTERVAL_S` seconds by a
+background thread per worker so the table stays small. The same thread
+deletes the expired de-duplication windows of `buttonpressdedup`, which
+would otherwise keep a row for every (Button, origin) ever pressed.
+"""
+
+import logging
+import threading
+
+from app import crud
+from app.core.cache import ExpiringBloomFilter
+from app.core.config import settings
+from app.core.db import engine
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+seen_press_keys = ExpiringBloomFilter(
+    settings.PRESS_KEY_FILTER_CAPACITY, ttl=settings.PRESS_IDEMPOTENCY_TTL_S
+)
+
+
+class PressKeySweeper:
+    """
+    Thread that deletes expired idempotency keys and de-duplication
+    windows every `interval` seconds.
+    """
+
+    def __init__(self, *, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="press-key-sweep", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop the thread, waiting for a sweep in progress to finish.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with Session(engine) as session:
+                    deleted = crud.delete_expired_press_keys(session=session)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to delete expired press keys")
+                continue
+            if deleted:
+                logger.info("Deleted %d expired press keys", deleted)
+            try:
+                with Session(engine) as session:
+                    deleted = crud.delete_expired_press_dedups(session=session)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to delete expired press dedup windows")
+                continue
+            if deleted:
+                logger.info("Deleted %d expired press dedup windows", deleted)
+
+
+_sweeper: PressKeySweeper | None = None
+
+
+def start_press_key_sweeper() -> None:
+    """
+    Start this worker's press key sweeper, if the cleanup is enabled.
+    """
+    global _sweeper  # pylint: disable=global-statement
+    if settings.PRESS_KEY_SWEEP_INTERVAL_S > 0 and _sweeper is None:
+        _sweeper = PressKeySweeper(interval=settings.PRESS_KEY_SWEEP_INTERVAL_S)
+
+
+def stop_press_key_sweeper() -> None:
+    """
+    Stop this worker's press key sweeper, if it is running.
+    """
+    global _sweeper  # pylint: disable=global-statement
+    if _sweeper is not None:
+        _sweeper.close()
+        _sweeper = None
@@ -0,0 +1,152 @@
+"""
+Reports of the plays of public service announcements (PSAs), for the
+FCC.
+
+A report covers the plays of the PSA Buttons over a week (from Monday),
+a month or a quarter, from local midnight in a time zone: every play,
+the totals per Button and per source, and the retirements of each Button
+during the period (see `crud.build_psa_report`).
+
+The report of an open period is generated from the raw uses on every
+request. A period is closed `PSA_REPORT_CLOSE_DELAY_S` seconds after it
+ends, once presses replayed late, from a batch or a worker's journal,
+have had time to land. Its report is then generated once more and
+stored as an immutable snapshot, whose JSON is returned as is from then
+on, without reading the uses again, and which outlives the uses once
+their partitions are dropped. Reports are also available from the
+command line as `python -m app.psa_report`.
+
+The partition maintainer (see app.core.use_partitions) stores the
+reports of the periods closed in `PSA_REPORT_TZ` as they close, and
+keeps the uses of the periods still open there. With a retention set,
+a closed period whose report wasn't stored and whose uses aren't all
+retained anymore gets no report, rather than one missing plays.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import get_args
+from zoneinfo import ZoneInfo
+
+from app import crud
+from app.core.config import settings
+from app.models import ReportPeriod
+from sqlmodel import Session
+
+
+class PsaReportExpired(Exception):
+    """
+    Raised for a closed period whose report wasn't stored before some of
+    its uses were dropped.
+    """
+
+
+def period_bounds(
+    period: ReportPeriod, day: date, zone: ZoneInfo
+) -> tuple[datetime, datetime]:
+    """
+    Return the start (inclusive) and end (exclusive) of the period that
+    `day` falls in, at local midnight in `zone`.
+    """
+    if period == "week":
+        first = day - timedelta(days=day.weekday())
+        last = first + timedelta(weeks=1)
+    else:
+        months = 1 if period == "month" else 3
+        first = day.replace(month=day.month - (day.month - 1) % months, day=1)
+        month = first.month - 1 + months
+        last = first.replace(year=first.year + month // 12, month=month % 12 + 1)
+    return datetime.combine(first, time(), zone), datetime.combine(last, time(), zone)
+
+
+def _utc(moment: datetime) -> datetime:
+    # Uses store UTC without a time zone
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _uses_retained_from(session: Session) -> datetime | None:
+    if settings.BUTTON_USE_RETENTION_MONTHS <= 0:
+        return None
+    return crud.get_uses_retained_from(session=session)
+
+
+def get_psa_report(
+    *,
+    session: Session,
+    period: ReportPeriod,
+    day: date,
+    tz: str,
+    now: datetime | None = None,
+) -> str:
+    """
+    Return the PSA report of the period that `day` falls in, in the time
+    zone `tz`, as JSON: its snapshot if the period is closed, generating
+    and storing it the first time. Raises `ZoneInfoNotFoundError` (or
+    `ValueError`) for an unknown time zone, and `PsaReportExpired` for a
+    closed period without a snapshot that starts before the retained
+    uses.
+    """
+    start, end = period_bounds(period, day, ZoneInfo(tz))
+    now = datetime.now(timezone.utc) if now is None else now
+    closed = end + timedelta(seconds=settings.PSA_REPORT_CLOSE_DELAY_S) <= now
+    if closed:
+        snapshot = crud.get_psa_report_snapshot(
+            session=session, period=period, tz=tz, start=start.date()
+        )
+        if snapshot is not None:
+            return snapshot
+        retained_from = _uses_retained_from(session)
+        if retained_from is not None and _utc(start) < retained_from:
+            raise PsaReportExpired
+    report = crud.build_psa_report(
+        session=session, period=period, tz=tz, start=start, end=end, closed=closed
+    )
+    if closed:
+        return crud.save_psa_report_snapshot(session=session, report=report)
+    return report.model_dump_json()
+
+
+def open_periods_start(now: datetime) -> datetime:
+    """
+    Return the start of the oldest period in `PSA_REPORT_TZ` that isn't
+    closed at `now`, in UTC without a time zone.
+    """
+    zone = ZoneInfo(settings.PSA_REPORT_TZ)
+    closing = now - timedelta(seconds=settings.PSA_REPORT_CLOSE_DELAY_S)
+    day = closing.astimezone(zone).date()
+    return min(
+        _utc(period_bounds(period, day, zone)[0]) for period in get_args(ReportPeriod)
+    )
+
+
+def store_closed_psa_reports(*, session: Session, now: datetime) -> list[str]:
+    """
+    Store the reports of the last week, month and quarter closed in
+    `PSA_REPORT_TZ` at `now`, unless they are already. With a retention
+    set, also those of the periods before them that aren't stored yet,
+    back to the oldest one whose uses are all retained.
+
+    Returns the periods stored, e.g. "month from 2026-09-01".
+    """
+    tz = settings.PSA_REPORT_TZ
+    zone = ZoneInfo(tz)
+    closing = now - timedelta(seconds=settings.PSA_REPORT_CLOSE_DELAY_S)
+    retained_from = _uses_retained_from(session)
+    stored = []
+    for period in get_args(ReportPeriod):
+        # The last day of the period before the one still open
+        open_start, _ = period_bounds(period, closing.astimezone(zone).date(), zone)
+        day = open_start.date() - timedelta(days=1)
+        while True:
+            start, _ = period_bounds(period, day, zone)
+            if retained_from is not None and _utc(start) < retained_from:
+                break
+            if crud.get_psa_report_snapshot(
+                session=session, period=period, tz=tz, start=start.date()
+            ) is not None:
+                break
+            get_psa_report(session=session, period=period, day=day, tz=tz, now=now)
+            stored.append(f"{period} from {start.date().isoformat()}")
+            if retained_from is None:
+                break
+            day = start.date() - timedelta(days=1)
+    return stored
@@ -1,19 +1,48 @@
 """
 Security utilities for password hashing and JWT token creation.
+
+Passwords are hashed and verified by the async helpers in a small pool
+of processes of each worker (`PASSWORD_HASH_PROCESSES`), so that bcrypt
+ties up neither the event loop nor the threadpool the rest of the API
+relies on. At most `PASSWORD_HASH_QUEUE` passwords may wait for the
+pool; beyond that `PasswordHashingBusy` is raised at once (answered
+with a 503), so that a burst of logins costs a bounded amount of CPU
+instead of queueing up behind itself.
 """
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import threading
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, TypeVar
 
 import jwt
 from app.core.config import settings
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes of another cost than BCRYPT_ROUNDS need an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
+
+class PasswordHashingBusy(Exception):
+    """
+    Raised when too many passwords are already waiting to be hashed.
+    """
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     """
@@ -27,6 +56,44 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
+# Key of the press tokens, derived from SECRET_KEY so that they can't be
+# used as anything else
+_PRESS_TOKEN_KEY = hmac.new(
+    settings.SECRET_KEY.encode(), b"press-token", hashlib.sha256
+).digest()
+# Bytes of the HMAC kept in a press token
+PRESS_TOKEN_MAC_BYTES = 16
+
+
+def _press_token_mac(button_id: uuid.UUID, version: int) -> str:
+    mac = hmac.new(
+        _PRESS_TOKEN_KEY, f"{button_id}:{version}".encode(), hashlib.sha256
+    ).digest()[:PRESS_TOKEN_MAC_BYTES]
+    return base64.urlsafe_b64encode(mac).rstrip(b"=").decode()
+
+
+def create_press_token(button_id: uuid.UUID, version: int) -> str:
+    """
+    Create the token of the press URL of a Button: its press key
+    version and an HMAC of the Button's ID and that version.
+    """
+    return f"{version}.{_press_token_mac(button_id, version)}"
+
+
+def read_press_token(button_id: uuid.UUID, token: str) -> int | None:
+    """
+    Return the press key version of a press token if it was created for
+    the Button, without looking the Button up, or else `None`.
+    """
+    version, _, mac = token.partition(".")
+    if not (version.isascii() and version.isdigit()) or len(version) > 9:
+        return None
+    expected = _press_token_mac(button_id, int(version))
+    if not hmac.compare_digest(mac.encode(), expected.encode()):
+        return None
+    return int(version)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
@@ -34,8 +101,117 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a plain password against a hashed password. Also returns a
+    new hash of the password if it is valid but its hash is of another
+    cost than `BCRYPT_ROUNDS`.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """
     Generate a hashed password using bcrypt.
     """
     return pwd_context.hash(password)
+
+
+class PasswordHashPool:
+    """
+    Bounded pool of processes to hash passwords in.
+
+    Calls are counted from submission to completion, and refused once
+    `processes + queue` are in flight.
+    """
+
+    def __init__(self, *, processes: int, queue: int) -> None:
+        self.limit = processes + queue
+        # Spawned, rather than forked from a worker running threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Call `fn(*args)` in a process of the pool. Raises
+        `PasswordHashingBusy` if the pool is full.
+        """
+        with self._lock:
+            if self._pending >= self.limit:
+                raise PasswordHashingBusy
+            self._pending += 1
+        try:
+            return await asyncio.wrap_future(self._executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def close(self) -> None:
+        """
+        Drop the waiting calls and wait for the processes to exit.
+        """
+        self._executor.shutdown(cancel_futures=True)
+
+
+_pool: PasswordHashPool | None = None
+
+
+async def _run_hashing(fn: Callable[..., T], *args: Any) -> T:
+    if _pool is None:
+        return await run_in_threadpool(fn, *args)
+    return await _pool.run(fn, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password in the hashing pool (or the threadpool), so that
+    bcrypt doesn't block the event loop.
+    """
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    `verify_and_update_password` in the hashing pool (or the threadpool).
+    """
+    return await _run_hashing(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash a password in the hashing pool (or the threadpool), so that
+    bcrypt doesn't block the event loop.
+    """
+    return await _run_hashing(get_password_hash, password)
+
+
+def start_password_hashing() -> None:
+    """
+    Start the password hashing pool, if it is enabled.
+    """
+    global _pool  # pylint: disable=global-statement
+    if settings.PASSWORD_HASH_PROCESSES > 0 and _pool is None:
+        _pool = PasswordHashPool(
+            processes=settings.PASSWORD_HASH_PROCESSES,
+            queue=settings.PASSWORD_HASH_QUEUE,
+        )
+
+
+def stop_password_hashing() -> None:
+    """
+    Stop the password hashing pool; passwords are then hashed in the
+    threadpool.
+    """
+    global _pool  # pylint: disable=global-statement
+    if _pool is not None:
+        _pool.close()
+        _pool = None
@@ -0,0 +1,115 @@
+"""
+Hourly and daily rollups of Button usage.
+
+Every press statement appends the number of uses it recorded per Button
+and hour to `buttonusedelta`, alongside the raw uses (see
+`crud.record_button_presses`). Appending rather than upserting keeps
+concurrent presses of a Button from queueing on a shared rollup row.
+When `USAGE_ROLLUP_INTERVAL_S` is set, a background thread per worker
+folds the deltas into `buttonusehourly` and `buttonusedaily` every that
+many seconds (see `crud.fold_usage_rollups`); folds are serialized
+across workers by an advisory lock, so a worker skips its turn while
+another one folds.
+
+Readers add the pending deltas to the rollups, so their counts are
+exact however long ago the last fold was. `rebuild_usage_rollups`
+recomputes the rollups from the raw uses, and `check_usage_rollups`
+reports where they differ; both are available from the command line as
+`python -m app.usage_rollups`.
+"""
+
+import logging
+import threading
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import UsageRollupMismatch
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+
+class UsageRollupFolder:
+    """
+    Thread that folds the usage deltas every `interval` seconds.
+    """
+
+    def __init__(self, *, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="usage-rollup-fold", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop the thread, waiting for a fold in progress to finish.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with Session(engine) as session:
+                    folded = crud.fold_usage_rollups(session=session)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to fold the usage rollups")
+                continue
+            if folded:
+                logger.debug("Folded %d days of Button usage", folded)
+
+
+def rebuild_usage_rollups() -> None:
+    """
+    Recompute the usage rollups from the raw uses, while presses go on.
+
+    The advisory lock is taken on its own, before the rebuild's
+    `REPEATABLE READ` transaction begins, so that its snapshot comes
+    after any fold that held the lock: the deltas it deletes are then
+    exactly those of the uses it counts.
+    """
+    with engine.connect() as connection:
+        connection.execute(crud.LOCK_USAGE_ROLLUPS)
+        connection.commit()
+        try:
+            connection.execution_options(isolation_level="REPEATABLE READ")
+            with Session(connection) as session:
+                crud.rebuild_usage_rollups(session=session)
+        finally:
+            connection.execution_options(isolation_level="READ COMMITTED")
+            connection.execute(crud.UNLOCK_USAGE_ROLLUPS)
+            connection.commit()
+
+
+def check_usage_rollups() -> list[UsageRollupMismatch]:
+    """
+    Return the buckets of the usage rollups that don't match the raw
+    uses.
+    """
+    with Session(engine) as session:
+        return crud.check_usage_rollups(session=session)
+
+
+_folder: UsageRollupFolder | None = None
+
+
+def start_usage_rollup_folding() -> None:
+    """
+    Start this worker's usage rollup folder, if folding is enabled.
+    """
+    global _folder  # pylint: disable=global-statement
+    if settings.USAGE_ROLLUP_INTERVAL_S > 0 and _folder is None:
+        _folder = UsageRollupFolder(interval=settings.USAGE_ROLLUP_INTERVAL_S)
+
+
+def stop_usage_rollup_folding() -> None:
+    """
+    Stop this worker's usage rollup folder, if it is running.
+    """
+    global _folder  # pylint: disable=global-statement
+    if _folder is not None:
+        _folder.close()
+        _folder = None
@@ -0,0 +1,119 @@
+"""
+Streaming export of raw Button uses.
+
+The rows of an export are read through a server-side (named) cursor,
+`EXPORT_BATCH_ROWS` at a time, on a connection of its own rather than
+the request's session, which is closed once the response has started.
+Each batch is encoded straight from the rows to CSV or NDJSON and sent
+before the next one is fetched, so memory stays flat however many rows
+the export holds.
+"""
+
+import csv
+import io
+from collections.abc import AsyncIterator, Generator, Sequence
+from datetime import datetime
+from typing import Any, Literal
+
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from pydantic_core import to_json
+from sqlalchemy import Executable, Row
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+ExportFormat = Literal["csv", "ndjson"]
+
+# Columns of an export, in order
+EXPORT_COLUMNS = ("id", "button_id", "title", "type", "timestamp", "origin")
+EXPORT_BATCH_ROWS = 10_000
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def utc_isoformat(timestamp: datetime) -> str:
+    """
+    Format a naive UTC timestamp, as stored, in ISO 8601 with a `Z`.
+    """
+    return f"{timestamp.isoformat()}Z"
+
+
+def encode_csv_header() -> bytes:
+    """
+    Encode the header line of a CSV export.
+    """
+    return (",".join(EXPORT_COLUMNS) + "\n").encode()
+
+
+def encode_csv(rows: Sequence[Row[Any]]) -> bytes:
+    """
+    Encode rows of `EXPORT_COLUMNS` as CSV lines.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(
+        (id, button_id, title, type, utc_isoformat(timestamp), origin)
+        for id, button_id, title, type, timestamp, origin in rows  # pylint: disable=redefined-builtin
+    )
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(rows: Sequence[Row[Any]]) -> bytes:
+    """
+    Encode rows of `EXPORT_COLUMNS` as one JSON object per line.
+    """
+    return b"".join(
+        to_json(
+            {
+                "id": id,
+                "button_id": button_id,
+                "title": title,
+                "type": type,
+                "timestamp": utc_isoformat(timestamp),
+                "origin": origin,
+            }
+        )
+        + b"\n"
+        for id, button_id, title, type, timestamp, origin in rows  # pylint: disable=redefined-builtin
+    )
+
+
+def _sync_batches(statement: Executable) -> Generator[Sequence[Row[Any]], None, None]:
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=EXPORT_BATCH_ROWS
+        ).execute(statement)
+        yield from result.partitions()
+
+
+async def stream_batches(statement: Executable) -> AsyncIterator[Sequence[Row[Any]]]:
+    """
+    Run `statement` on a server-side cursor of its own connection, from
+    the engine of the `DATABASE_MODE`, and yield its rows in batches.
+    """
+    if settings.DATABASE_MODE == "async":
+        async with async_engine.connect() as connection:
+            result = await connection.stream(
+                statement, execution_options={"yield_per": EXPORT_BATCH_ROWS}
+            )
+            async for batch in result.partitions():
+                yield batch
+        return
+    batches = _sync_batches(statement)
+    try:
+        async for batch in iterate_in_threadpool(batches):
+            yield batch
+    finally:
+        # Release the connection if the client went away mid-export
+        await run_in_threadpool(batches.close)
+
+
+async def stream_export(
+    statement: Executable, export_format: ExportFormat
+) -> AsyncIterator[bytes]:
+    """
+    Yield the rows of `statement`, which selects `EXPORT_COLUMNS`,
+    encoded as `export_format`, a batch at a time.
+    """
+    if export_format == "csv":
+        yield encode_csv_header()
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+    async for batch in stream_batches(statement):
+        yield encode(batch)
@@ -0,0 +1,139 @@
+"""
+Monthly partitions of `buttonuse`, and their retention.
+
+`buttonuse` is range-partitioned by the month of its `timestamp` (in
+UTC), with a default partition for uses outside every month. A
+background thread per worker creates the partitions of the current
+month and of the next `BUTTON_USE_PARTITION_MONTHS_AHEAD` ones when it
+starts, then again every `BUTTON_USE_PARTITION_INTERVAL_S` seconds (see
+`crud.create_use_partitions`).
+
+With `BUTTON_USE_RETENTION_MONTHS` set, it also drops the partitions
+of the months before the current one and that many previous ones,
+rather than deleting their uses row by row (see
+`crud.drop_use_partitions`). Detaching them locks `buttonuse` whole,
+so presses and reads of uses stall until the drop commits, for up to
+its 5 second lock timeout (once a month, when a month expires). The
+hourly and daily usage rollups outlive them (see
+app.core.usage_rollup), so usage series still cover dropped months.
+
+Before that, it stores the PSA reports of the periods that have closed
+(see app.core.psa_report), and keeps the months of the periods still
+open, even past the retention.
+
+Either is skipped while another worker is at it.
+"""
+
+import logging
+import threading
+from datetime import datetime, timezone
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.psa_report import open_periods_start, store_closed_psa_reports
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+
+def retention_cutoff(now: datetime, months: int) -> datetime:
+    """
+    Return the start of the oldest month whose uses are retained, when
+    they are retained for `months` months before that of `now`.
+    """
+    month = now.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+    year, index = divmod(month.year * 12 + month.month - 1 - months, 12)
+    return month.replace(year=year, month=index + 1)
+
+
+def maintain_use_partitions() -> tuple[list[str], list[str], list[str]]:
+    """
+    Create the upcoming partitions of `buttonuse`, store the PSA reports
+    of the periods that have closed, and drop the expired partitions if
+    a retention is set. Returns the names of the partitions created, the
+    reports stored, and the partitions dropped.
+    """
+    now = datetime.now(timezone.utc)
+    dropped: list[str] = []
+    with Session(engine) as session:
+        created = crud.create_use_partitions(
+            session=session,
+            start=now,
+            months=settings.BUTTON_USE_PARTITION_MONTHS_AHEAD + 1,
+        )
+        # Stored before their uses can be dropped
+        stored = store_closed_psa_reports(session=session, now=now)
+        if settings.BUTTON_USE_RETENTION_MONTHS > 0:
+            dropped = crud.drop_use_partitions(
+                session=session,
+                before=min(
+                    retention_cutoff(now, settings.BUTTON_USE_RETENTION_MONTHS),
+                    retention_cutoff(open_periods_start(now), 0),
+                ),
+            )
+    return created, stored, dropped
+
+
+class UsePartitionMaintainer:
+    """
+    Thread that maintains the partitions now, then every `interval`
+    seconds.
+    """
+
+    def __init__(self, *, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="use-partitions", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop the thread, waiting for maintenance in progress to finish.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                created, stored, dropped = maintain_use_partitions()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to maintain the buttonuse partitions")
+            else:
+                if created:
+                    logger.info("Created partitions %s", ", ".join(created))
+                if stored:
+                    logger.info("Stored the PSA reports of %s", ", ".join(stored))
+                if dropped:
+                    logger.info("Dropped partitions %s", ", ".join(dropped))
+            if self._stop.wait(self.interval):
+                return
+
+
+_maintainer: UsePartitionMaintainer | None = None
+
+
+def start_use_partitioning() -> None:
+    """
+    Start this worker's partition maintainer, if maintenance is enabled.
+    """
+    global _maintainer  # pylint: disable=global-statement
+    if settings.BUTTON_USE_PARTITION_INTERVAL_S > 0 and _maintainer is None:
+        _maintainer = UsePartitionMaintainer(
+            interval=settings.BUTTON_USE_PARTITION_INTERVAL_S
+        )
+
+
+def stop_use_partitioning() -> None:
+    """
+    Stop this worker's partition maintainer, if it is running.
+    """
+    global _maintainer  # pylint: disable=global-statement
+    if _maintainer is not None:
+        _maintainer.close()
+        _maintainer = None
@@ -0,0 +1,227 @@
+"""
+Cache of authenticated users, for `deps.get_current_user`.
+
+Two bounded TTL caches spare authenticated requests their JWT decoding
+and user lookup: one from each access token to its validated subject
+and expiry, which can't change, and one from each user ID to a snapshot
+of the user. A cached token is used until it expires or for
+`USER_CACHE_TTL_S` seconds, whichever comes first.
+
+Every change to a user sends a `pg_notify` on `USER_CHANGED_CHANNEL` as
+part of its transaction, and each worker runs a thread that LISTENs on
+it and drops the user from its cache, so changes reach every worker on
+every node once they have committed. As with the Button cache (see
+app.core.button_cache), users are only stored while the listener is
+connected, the cache is cleared whenever it disconnects, and a user
+read from the database before an invalidation isn't stored.
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+import psycopg
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.db import engine
+from app.models import User, UserCacheStats
+from sqlalchemy import text
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+USER_CHANGED_CHANNEL = "user_changed"
+
+# Seconds the listener waits for notifications before checking whether
+# it should stop
+LISTEN_TIMEOUT = 0.2
+# Seconds before the listener reconnects after losing its connection
+RECONNECT_DELAY = 1.0
+
+
+class UserCache:
+    """
+    Bounded TTL caches of decoded access tokens and of users.
+
+    Users are handed out as detached copies, to be merged into the
+    session of each request, so a route changing its user never changes
+    the cached snapshot. Invalidations bump a generation counter, as in
+    `ButtonStateCache`.
+    """
+
+    def __init__(self, *, max_entries: int, ttl: float) -> None:
+        self.ttl = ttl
+        self.listening = False
+        self._tokens: TTLCache[str, tuple[uuid.UUID, float]] = TTLCache(max_entries)
+        self._users: TTLCache[uuid.UUID, User] = TTLCache(max_entries)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get_token(self, token: str) -> uuid.UUID | None:
+        """
+        Return the user ID of a cached access token.
+        """
+        entry = self._tokens.get(token)
+        return None if entry is None else entry[0]
+
+    def set_token(self, token: str, user_id: uuid.UUID, expires_at: float) -> None:
+        """
+        Cache a validated access token, until `expires_at` (a Unix
+        timestamp) at the latest.
+        """
+        ttl = min(self.ttl, expires_at - time.time())
+        if self.listening and ttl > 0:
+            self._tokens.set(token, (user_id, expires_at), ttl)
+
+    def get_user(self, user_id: uuid.UUID) -> User | None:
+        """
+        Return a detached snapshot of a cached user.
+        """
+        user = self._users.get(user_id)
+        with self._lock:
+            if user is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return user
+
+    def generation(self) -> int:
+        """
+        Return the current generation, to be passed to `set_user()`.
+        """
+        with self._lock:
+            return self._generation
+
+    def set_user(self, user: User, generation: int) -> None:
+        """
+        Cache a snapshot of a user, unless caching is off or anything
+        was invalidated since `generation` was taken.
+        """
+        snapshot = User(**user.model_dump())
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            if not self.listening or self.ttl <= 0 or generation != self._generation:
+                return
+            self._users.set(user.id, snapshot, self.ttl)
+
+    def invalidate(self, user_id: uuid.UUID | None = None) -> None:
+        """
+        Drop a user from the cache, or every user (and token) if none is
+        given.
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if user_id is None:
+                self._tokens.clear()
+                self._users.clear()
+            else:
+                self._users.pop(user_id)
+
+    def stats(self) -> UserCacheStats:
+        """
+        Snapshot of the cache counters.
+        """
+        with self._lock:
+            return UserCacheStats(
+                listening=self.listening,
+                tokens=len(self._tokens),
+                users=len(self._users),
+                hits=self._hits,
+                misses=self._misses,
+                invalidations=self._invalidations,
+            )
+
+
+user_cache = UserCache(
+    max_entries=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL_S
+)
+
+
+def notify_user_changed(session: Session, user_id: uuid.UUID) -> None:
+    """
+    Queue an invalidation of a user on every worker, to be sent when the
+    session's transaction commits, and drop it from this worker's cache
+    right away.
+    """
+    session.exec(
+        text("SELECT pg_notify(:channel, :user_id)"),  # type: ignore[call-overload]
+        params={"channel": USER_CHANGED_CHANNEL, "user_id": str(user_id)},
+    )
+    user_cache.invalidate(user_id)
+
+
+class UserChangeListener:
+    """
+    Thread that LISTENs for user changes on its own connection and
+    invalidates them in `user_cache`.
+    """
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="user-change-listener", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stop listening and wait for the thread to exit.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {USER_CHANGED_CHANNEL}")
+                    user_cache.listening = True
+                    while not self._stop.is_set():
+                        for notify in connection.notifies(timeout=LISTEN_TIMEOUT):
+                            self._handle(notify.payload)
+            except psycopg.Error:
+                logger.exception("Lost the user change listener connection")
+                self._stop.wait(RECONNECT_DELAY)
+            finally:
+                user_cache.listening = False
+                user_cache.invalidate()
+
+    @staticmethod
+    def _handle(payload: str) -> None:
+        try:
+            user_id = uuid.UUID(payload)
+        except ValueError:
+            logger.warning("Ignoring user change for %r", payload)
+            return
+        user_cache.invalidate(user_id)
+
+
+_listener: UserChangeListener | None = None
+
+
+def start_user_cache() -> None:
+    """
+    Start listening for user changes, if the cache is enabled.
+    """
+    global _listener  # pylint: disable=global-statement
+    if settings.USER_CACHE_TTL_S > 0 and _listener is None:
+        _listener = UserChangeListener()
+
+
+def stop_user_cache() -> None:
+    """
+    Stop listening for user changes, which also stops caching.
+    """
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.close()
+        _listener = None
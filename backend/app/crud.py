@@ -3,35 +3,73 @@ CRUD operations for the application.
 """
 
 import uuid
+from collections import Counter
+from datetime import date, datetime, timezone
 from typing import Any
 
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
-from app.models import Button, ButtonCreate, User, UserCreate, UserUpdate
-from sqlmodel import Session, select
+from app.models import (
+    PSA_BUTTON_TYPE,
+    Button,
+    ButtonCreate,
+    ButtonPress,
+    ButtonPressKey,
+    ButtonPublic,
+    ButtonRetirement,
+    ButtonUsageSummary,
+    ButtonUsageTotals,
+    ButtonUse,
+    PsaButtonTotals,
+    PsaPlay,
+    PsaReport,
+    PsaRetirement,
+    PsaSourceTotals,
+    ReportPeriod,
+    UsageBucket,
+    UsageBucketSize,
+    UsageRollupMismatch,
+    User,
+    UserCreate,
+    UserUpdate,
+)
+from sqlalchemy import ColumnElement, DateTime, Select, func, or_, text
+from sqlmodel import Session, col, select
 
 
-def create_user(*, session: Session, user_create: UserCreate) -> User:
+def create_user(
+    *, session: Session, user_create: UserCreate, hashed_password: str | None = None
+) -> User:
     """
     Create a new user in the database.
-    This function takes a user object and hashes the password.
+    This function takes a user object and hashes the password, unless
+    it was already hashed into `hashed_password`.
     """
-    hashed = get_password_hash(user_create.password)
     db_obj = User(**user_create.model_dump())
-    db_obj.hashed_password = hashed
+    db_obj.hashed_password = hashed_password or get_password_hash(user_create.password)
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
     return db_obj
 
 
-def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
+def update_user(
+    *,
+    session: Session,
+    db_user: User,
+    user_in: UserUpdate,
+    hashed_password: str | None = None,
+) -> Any:
     """
     Update a user in the database.
-    This function takes a user object and an update object.
+    This function takes a user object and an update object. A new
+    password is hashed, unless it was already hashed into
+    `hashed_password`.
     """
     user_data = user_in.model_dump(exclude_unset=True)
     if "password" in user_data:
-        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+        password = user_data.pop("password")
+        user_data["hashed_password"] = hashed_password or get_password_hash(password)
 
     for field, value in user_data.items():
         setattr(db_user, field, value)
@@ -62,6 +100,123 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+# Counts a login attempt against each of its keys (account and client IP)
+# in the current window, if none of them has reached its limit yet, and
+# returns the counts of each key before the attempt. A key's counts are
+# shifted to the previous window when a new window starts. Up to 10 keys
+# whose counts are older than the previous window are deleted along the
+# way, so the table only holds the keys seen lately.
+RECORD_LOGIN_ATTEMPT = text(
+    """
+    WITH attempt AS (
+        SELECT *
+        FROM unnest(CAST(:keys AS text[]), CAST(:limits AS integer[]))
+            AS a(key, max_attempts)
+    ),
+    counts AS (
+        SELECT
+            attempt.key,
+            attempt.max_attempts,
+            CASE loginattempt.window_index
+                WHEN :window_index THEN loginattempt.previous
+                WHEN :window_index - 1 THEN loginattempt.current
+                ELSE 0
+            END AS previous,
+            CASE loginattempt.window_index
+                WHEN :window_index THEN loginattempt.current
+                ELSE 0
+            END AS current
+        FROM attempt
+        LEFT JOIN loginattempt ON loginattempt.key = attempt.key
+    ),
+    allowed AS (
+        SELECT bool_and(previous * :weight + current < max_attempts) AS allowed
+        FROM counts
+    ),
+    recorded AS (
+        INSERT INTO loginattempt (key, window_index, previous, current)
+        SELECT key, :window_index, previous, current + 1
+        FROM counts
+        WHERE (SELECT allowed FROM allowed)
+        ON CONFLICT (key) DO UPDATE SET
+            previous = CASE
+                WHEN loginattempt.window_index = EXCLUDED.window_index
+                THEN loginattempt.previous
+                ELSE EXCLUDED.previous
+            END,
+            current = CASE
+                WHEN loginattempt.window_index = EXCLUDED.window_index
+                THEN loginattempt.current + 1
+                ELSE EXCLUDED.current
+            END,
+            window_index = EXCLUDED.window_index
+    ),
+    swept AS (
+        DELETE FROM loginattempt
+        WHERE key IN (
+            SELECT key FROM loginattempt
+            WHERE window_index < :window_index - 1
+                AND key <> ALL(CAST(:keys AS text[]))
+            LIMIT 10
+            FOR UPDATE SKIP LOCKED
+        )
+    )
+    SELECT counts.max_attempts, counts.previous, counts.current, allowed
+    FROM counts, allowed
+    """
+)
+
+FORGIVE_LOGIN_ATTEMPT = text(
+    """
+    UPDATE loginattempt SET current = current - 1
+    WHERE key = ANY(CAST(:keys AS text[]))
+        AND window_index = :window_index
+        AND current > 0
+    """
+)
+
+
+def record_login_attempt(
+    *,
+    session: Session,
+    limits: dict[str, int],
+    window_index: int,
+    weight: float,
+) -> tuple[bool, list[tuple[int, int, int]]]:
+    """
+    Count a login attempt against each key of `limits` in the window
+    `window_index`, unless any of them has reached its limit, with the
+    previous window weighted by `weight`. Returns whether the attempt
+    was allowed, and the limit and the previous and current counts of
+    each key before it.
+    """
+    rows = session.exec(
+        RECORD_LOGIN_ATTEMPT,  # type: ignore[call-overload]
+        params={
+            "keys": list(limits),
+            "limits": list(limits.values()),
+            "window_index": window_index,
+            "weight": weight,
+        },
+    ).all()
+    session.commit()
+    allowed = all(row.allowed for row in rows)
+    return allowed, [(row.max_attempts, row.previous, row.current) for row in rows]
+
+
+def forgive_login_attempt(
+    *, session: Session, keys: list[str], window_index: int
+) -> None:
+    """
+    Take back a login attempt counted in the window `window_index`.
+    """
+    session.exec(
+        FORGIVE_LOGIN_ATTEMPT,  # type: ignore[call-overload]
+        params={"keys": keys, "window_index": window_index},
+    )
+    session.commit()
+
+
 def create_button(
     *, session: Session, button_in: ButtonCreate, created_by: uuid.UUID
 ) -> Button:
@@ -79,3 +234,1192 @@ def create_button(
     session.commit()
     session.refresh(db_button)
     return db_button
+
+
+# Channel the events of `GET /buttons/events` are published on (see
+# app.core.button_events)
+BUTTON_EVENTS_CHANNEL = "button_events"
+
+# Records a batch of presses, passed as parallel arrays. See
+# `record_button_presses` for what each CTE does. Kept as a single text
+# statement so that it is compiled once, whatever the batch size.
+RECORD_PRESSES = text(
+    """
+    WITH RECURSIVE presses AS (
+        SELECT *
+        FROM unnest(
+            CAST(:ids AS uuid[]),
+            CAST(:button_ids AS uuid[]),
+            CAST(:timestamps AS timestamp[]),
+            CAST(:origins AS varchar[]),
+            CAST(:idempotency_keys AS varchar[])
+        ) WITH ORDINALITY
+            AS press (id, button_id, timestamp, origin, idempotency_key, n)
+    ),
+    live AS (
+        SELECT p.*, b.dedup_window_ms
+        FROM presses AS p
+        JOIN button AS b ON b.id = p.button_id
+        WHERE b.retired_at IS NULL
+    ),
+    claimed AS (
+        INSERT INTO buttonpresskey (key, button_id, press_id, expires_at)
+        SELECT DISTINCT ON (idempotency_key)
+            idempotency_key,
+            button_id,
+            id,
+            CURRENT_TIMESTAMP + :idempotency_ttl * INTERVAL '1 second'
+        FROM live
+        WHERE idempotency_key IS NOT NULL
+        ORDER BY idempotency_key, timestamp, n
+        ON CONFLICT (key) DO UPDATE
+        SET button_id = excluded.button_id,
+            press_id = excluded.press_id,
+            expires_at = excluded.expires_at
+        WHERE buttonpresskey.expires_at <= CURRENT_TIMESTAMP
+        RETURNING press_id
+    ),
+    holders AS (
+        SELECT DISTINCT ON (key) key, button_id
+        FROM (
+            SELECT
+                k.key,
+                k.button_id,
+                0 AS in_batch,
+                CAST(NULL AS timestamp) AS timestamp,
+                CAST(NULL AS bigint) AS n
+            FROM buttonpresskey AS k
+            WHERE k.key IN (SELECT idempotency_key FROM live)
+              AND k.expires_at > CURRENT_TIMESTAMP
+            UNION ALL
+            SELECT idempotency_key, button_id, 1, timestamp, n
+            FROM live
+            WHERE idempotency_key IS NOT NULL
+        ) AS holder
+        ORDER BY key, in_batch, timestamp, n
+    ),
+    misclaimed AS (
+        SELECT l.button_id, array_agg(l.id) AS press_ids
+        FROM live AS l
+        JOIN holders AS h ON h.key = l.idempotency_key
+        WHERE h.button_id <> l.button_id
+        GROUP BY l.button_id
+    ),
+    keyed AS (
+        SELECT *
+        FROM live
+        WHERE idempotency_key IS NULL
+           OR id IN (SELECT press_id FROM claimed)
+    ),
+    dedup AS (
+        SELECT
+            k.*,
+            coalesce(k.origin, '') AS dedup_origin,
+            k.dedup_window_ms * INTERVAL '1 millisecond' AS dedup_window,
+            EXISTS (
+                SELECT 1 FROM buttonuse AS u
+                WHERE u.button_id = k.button_id
+                  AND coalesce(u.origin, '') = coalesce(k.origin, '')
+                  AND u.timestamp
+                      > k.timestamp - k.dedup_window_ms * INTERVAL '1 millisecond'
+                  AND u.timestamp
+                      < k.timestamp + k.dedup_window_ms * INTERVAL '1 millisecond'
+            ) AS blocked
+        FROM keyed AS k
+        WHERE k.dedup_window_ms > 0
+    ),
+    grouped AS (
+        SELECT
+            button_id,
+            dedup_origin,
+            dedup_window,
+            array_agg(id ORDER BY timestamp, n) AS ids,
+            array_agg(timestamp ORDER BY timestamp, n) AS timestamps,
+            array_agg(blocked ORDER BY timestamp, n) AS blocked
+        FROM dedup
+        GROUP BY button_id, dedup_origin, dedup_window
+    ),
+    spaced (button_id, dedup_origin, i, id, last_admitted, admitted) AS (
+        SELECT
+            button_id,
+            dedup_origin,
+            1,
+            ids[1],
+            CASE WHEN NOT blocked[1] THEN timestamps[1] END,
+            NOT blocked[1]
+        FROM grouped
+        UNION ALL
+        SELECT
+            g.button_id,
+            g.dedup_origin,
+            s.i + 1,
+            g.ids[s.i + 1],
+            CASE
+                WHEN NOT g.blocked[s.i + 1]
+                 AND g.timestamps[s.i + 1] >= coalesce(
+                        s.last_admitted + g.dedup_window,
+                        CAST('-infinity' AS timestamp)
+                     )
+                THEN g.timestamps[s.i + 1]
+                ELSE s.last_admitted
+            END,
+            NOT g.blocked[s.i + 1]
+            AND g.timestamps[s.i + 1] >= coalesce(
+                s.last_admitted + g.dedup_window, CAST('-infinity' AS timestamp)
+            )
+        FROM spaced AS s
+        JOIN grouped AS g
+          ON g.button_id = s.button_id AND g.dedup_origin = s.dedup_origin
+        WHERE s.i < cardinality(g.ids)
+    ),
+    candidates AS (
+        SELECT d.*
+        FROM dedup AS d
+        JOIN spaced AS s ON s.id = d.id
+        WHERE s.admitted
+    ),
+    admitted AS (
+        INSERT INTO buttonpressdedup
+            (button_id, origin, press_id, pressed_at, expires_at)
+        SELECT
+            button_id,
+            dedup_origin,
+            (array_agg(id ORDER BY timestamp DESC, n DESC))[1],
+            max(timestamp),
+            max(timestamp) + dedup_window
+        FROM candidates
+        GROUP BY button_id, dedup_origin, dedup_window
+        ORDER BY button_id, dedup_origin
+        ON CONFLICT (button_id, origin) DO UPDATE
+        SET press_id = CASE
+                WHEN excluded.pressed_at > buttonpressdedup.pressed_at
+                THEN excluded.press_id
+                ELSE buttonpressdedup.press_id
+            END,
+            pressed_at = greatest(buttonpressdedup.pressed_at, excluded.pressed_at),
+            expires_at = greatest(buttonpressdedup.expires_at, excluded.expires_at)
+        WHERE buttonpressdedup.pressed_at IS NOT DISTINCT FROM (
+                SELECT seen.pressed_at
+                FROM buttonpressdedup AS seen
+                WHERE seen.button_id = excluded.button_id
+                  AND seen.origin = excluded.origin
+            )
+           OR buttonpressdedup.expires_at <= (
+                SELECT min(c.timestamp)
+                FROM candidates AS c
+                WHERE c.button_id = excluded.button_id
+                  AND c.dedup_origin = excluded.origin
+            )
+        RETURNING button_id, origin
+    ),
+    eligible AS (
+        SELECT id, button_id, timestamp, origin
+        FROM keyed
+        WHERE coalesce(dedup_window_ms, 0) = 0
+        UNION ALL
+        SELECT c.id, c.button_id, c.timestamp, c.origin
+        FROM candidates AS c
+        JOIN admitted AS a
+          ON a.button_id = c.button_id AND a.origin = c.dedup_origin
+    ),
+    bumped AS (
+        INSERT INTO buttoncounter (button_id, slot, usage_count)
+        SELECT
+            e.button_id,
+            floor(random() * coalesce(b.counter_slots, 1)),
+            count(*)
+        FROM eligible AS e
+        JOIN button AS b ON b.id = e.button_id
+        GROUP BY e.button_id, b.counter_slots
+        ORDER BY e.button_id
+        ON CONFLICT (button_id, slot) DO UPDATE
+        SET usage_count = buttoncounter.usage_count + excluded.usage_count
+        RETURNING button_id, slot, usage_count
+    ),
+    recorded AS (
+        INSERT INTO buttonuse (id, button_id, timestamp, origin)
+        SELECT id, button_id, timestamp, origin
+        FROM eligible
+        RETURNING button_id, id, timestamp, origin
+    ),
+    pending AS (
+        INSERT INTO buttonusedelta (button_id, bucket_start, count)
+        SELECT button_id, date_trunc('hour', timestamp), count(*)
+        FROM eligible
+        GROUP BY 1, 2
+    )
+    SELECT
+        button.*,
+        counts.usage_count,
+        uses.press_ids AS recorded,
+        misclaimed.press_ids AS misclaimed,
+        CASE WHEN :publish_events AND uses.press_ids IS NOT NULL THEN
+            pg_notify(
+                :events_channel,
+                json_build_object(
+                    'id', uses.press_ids[1],
+                    'event', 'press',
+                    'button_id', button.id,
+                    'type', button.type,
+                    'created_by', button.created_by,
+                    'at', uses.pressed_at AT TIME ZONE 'UTC',
+                    'presses', cardinality(uses.press_ids),
+                    'origin', uses.origin,
+                    'usage_count', counts.usage_count
+                )::text
+            )
+        END AS published
+    FROM button
+    LEFT JOIN bumped ON bumped.button_id = button.id
+    LEFT JOIN (
+        SELECT
+            button_id,
+            array_agg(id ORDER BY timestamp) AS press_ids,
+            max(timestamp) AS pressed_at,
+            (array_agg(origin ORDER BY timestamp DESC))[1] AS origin
+        FROM recorded
+        GROUP BY button_id
+    ) AS uses ON uses.button_id = button.id
+    LEFT JOIN misclaimed ON misclaimed.button_id = button.id
+    CROSS JOIN LATERAL (
+        SELECT coalesce(bumped.usage_count, 0) + coalesce(
+            (
+                SELECT sum(c.usage_count)
+                FROM buttoncounter AS c
+                WHERE c.button_id = button.id
+                  AND c.slot IS DISTINCT FROM bumped.slot
+            ),
+            0
+        ) AS usage_count
+    ) AS counts
+    WHERE button.id IN (SELECT button_id FROM presses)
+    """
+)
+
+
+# Sets a statement timeout for the rest of the transaction
+SET_STATEMENT_TIMEOUT = text("SELECT set_config('statement_timeout', :timeout, true)")
+
+
+def record_button_presses(
+    *,
+    session: Session,
+    presses: list[ButtonPress],
+    timeout_ms: int | None = None,
+    misclaimed: set[uuid.UUID] | None = None,
+) -> dict[uuid.UUID, tuple[ButtonPublic, set[uuid.UUID]]]:
+    """
+    Record a batch of Button presses in one round-trip (two with a
+    `timeout_ms`, after which the statement is cancelled).
+
+    Everything happens in a single statement of chained data-modifying
+    CTEs, so row locks are only held for the duration of one statement:
+
+    - presses of retired Buttons are dropped;
+    - presses with an idempotency key claim it in `buttonpresskey`, and
+      are dropped if it was already claimed (by an earlier press or an
+      earlier one in the batch) and hasn't expired; those whose key was
+      claimed for another Button are told apart, as of the statement's
+      snapshot and earlier presses of the batch (a claim committed by
+      another worker meanwhile shows as a plain repeat);
+    - presses of a Button with a de-duplication window are dropped if a
+      press from the same origin was recorded within the window on
+      either side of them, or if they fall within the window of the
+      previous press admitted from the same origin in the batch, taken
+      in time order (a dropped press doesn't extend the window, as with
+      single presses). Those left are admitted through an upsert on
+      `buttonpressdedup`, which keeps the last recorded press from each
+      origin: it only succeeds if no press from the same origin was
+      recorded by another worker since the statement started, or if
+      that one's window ends before the first of them, so duplicates
+      are dropped consistently across workers (in a race, those of the
+      batch are dropped together);
+    - one counter slot per Button (picked at random among its
+      `counter_slots`) is bumped, or created, by its number of admitted
+      presses, leaving the `button` row itself untouched;
+    - the admitted presses are inserted into `buttonuse` with a single
+      multi-row insert, with `ButtonPress.id` as their ID;
+    - their number per Button and hour is appended to `buttonusedelta`,
+      to be folded into the usage rollups;
+    - a press event per Button is published on the live feed of Button
+      events (see app.core.button_events), once the batch commits.
+
+    Returns, for every pressed Button that exists, its row (as of after
+    the batch) and the IDs of its presses that were recorded. Buttons
+    that don't exist are left out. The IDs of the presses whose key was
+    claimed for another Button are added to `misclaimed`, if given.
+    """
+    if timeout_ms:
+        session.exec(
+            SET_STATEMENT_TIMEOUT,  # type: ignore[call-overload]
+            params={"timeout": f"{timeout_ms}ms"},
+        )
+    rows = session.exec(
+        RECORD_PRESSES,  # type: ignore[call-overload]
+        params={
+            "ids": [press.id for press in presses],
+            "button_ids": [press.button_id for press in presses],
+            "timestamps": [press.timestamp for press in presses],
+            "origins": [press.origin for press in presses],
+            "idempotency_keys": [press.idempotency_key for press in presses],
+            "idempotency_ttl": settings.PRESS_IDEMPOTENCY_TTL_S,
+            "publish_events": settings.BUTTON_EVENTS_ENABLED,
+            "events_channel": BUTTON_EVENTS_CHANNEL,
+        },
+    ).all()
+    session.commit()
+    results = {}
+    for row in rows:
+        fields = dict(row._mapping)
+        del fields["published"]
+        recorded = set(fields.pop("recorded") or ())
+        if misclaimed is not None:
+            misclaimed.update(fields["misclaimed"] or ())
+        del fields["misclaimed"]
+        results[fields["id"]] = (ButtonPublic.model_validate(fields), recorded)
+    return results
+
+
+class IdempotencyKeyConflict(Exception):
+    """
+    Raised for a press whose idempotency key was claimed for another
+    Button.
+    """
+
+
+def increment_button_usage(
+    *,
+    session: Session,
+    button_id: uuid.UUID,
+    origin: str | None,
+    idempotency_key: str | None = None,
+    timeout_ms: int | None = None,
+) -> tuple[ButtonPublic | None, bool]:
+    """
+    Record a single press of a Button in one round-trip.
+
+    Returns the Button (as of after the press) and whether the press
+    was recorded. A `None` Button means it does not exist; an
+    unrecorded press means the Button is retired, that its idempotency
+    key was already used, or that the press was a duplicate within the
+    Button's de-duplication window. Raises `IdempotencyKeyConflict` if
+    the key was used for another Button.
+    """
+    press = ButtonPress(
+        button_id=button_id, origin=origin, idempotency_key=idempotency_key
+    )
+    misclaimed: set[uuid.UUID] = set()
+    results = record_button_presses(
+        session=session, presses=[press], timeout_ms=timeout_ms, misclaimed=misclaimed
+    )
+    if misclaimed:
+        raise IdempotencyKeyConflict
+    button, recorded = results.get(button_id, (None, set()))
+    return button, press.id in recorded
+
+
+def get_press_key(*, session: Session, key: str) -> ButtonPressKey | None:
+    """
+    Get the press that claimed an idempotency key, unless it expired.
+    """
+    statement = select(ButtonPressKey).where(
+        ButtonPressKey.key == key,
+        ButtonPressKey.expires_at > func.now(),
+    )
+    return session.exec(statement).first()
+
+
+def get_press_key_version(*, session: Session, button_id: uuid.UUID) -> int | None:
+    """
+    Get the press key version of a Button, if it exists.
+    """
+    statement = select(Button.press_key_version).where(Button.id == button_id)
+    return session.exec(statement).first()
+
+
+# Deletes expired idempotency keys a chunk at a time, skipping keys
+# being reclaimed concurrently.
+DELETE_EXPIRED_PRESS_KEYS = text(
+    """
+    DELETE FROM buttonpresskey
+    WHERE key IN (
+        SELECT key FROM buttonpresskey
+        WHERE expires_at <= CURRENT_TIMESTAMP
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+
+
+def delete_expired_press_keys(*, session: Session, chunk_size: int = 10_000) -> int:
+    """
+    Delete every expired idempotency key, committing after each chunk
+    of `chunk_size` keys so locks are held briefly.
+
+    Returns the number of keys deleted.
+    """
+    deleted = 0
+    while True:
+        result = session.exec(
+            DELETE_EXPIRED_PRESS_KEYS,  # type: ignore[call-overload]
+            params={"limit": chunk_size},
+        )
+        session.commit()
+        deleted += int(result.rowcount)
+        if result.rowcount < chunk_size:
+            return deleted
+
+
+# Deletes expired de-duplication windows a chunk at a time, skipping
+# windows being taken over by a press concurrently. Their timestamps are
+# UTC without a time zone.
+DELETE_EXPIRED_PRESS_DEDUPS = text(
+    """
+    DELETE FROM buttonpressdedup
+    WHERE (button_id, origin) IN (
+        SELECT button_id, origin FROM buttonpressdedup
+        WHERE expires_at <= CURRENT_TIMESTAMP AT TIME ZONE 'UTC'
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+
+
+def delete_expired_press_dedups(
+    *, session: Session, chunk_size: int = 10_000
+) -> int:
+    """
+    Delete every expired de-duplication window, committing after each
+    chunk of `chunk_size` windows so locks are held briefly.
+
+    Returns the number of windows deleted.
+    """
+    deleted = 0
+    while True:
+        result = session.exec(
+            DELETE_EXPIRED_PRESS_DEDUPS,  # type: ignore[call-overload]
+            params={"limit": chunk_size},
+        )
+        session.commit()
+        deleted += int(result.rowcount)
+        if result.rowcount < chunk_size:
+            return deleted
+
+
+# Moves the count of every slot but the first into the first, so that
+# Buttons that are no longer pressed heavily read back a single row.
+# Deleting a slot waits for (and includes) any press still bumping it,
+# and a press arriving after the delete recreates the slot, so no count
+# is lost.
+FOLD_COUNTERS = text(
+    """
+    WITH folded AS (
+        DELETE FROM buttoncounter
+        WHERE slot > 0
+        RETURNING button_id, usage_count
+    )
+    INSERT INTO buttoncounter (button_id, slot, usage_count)
+    SELECT button_id, 0, sum(usage_count)
+    FROM folded
+    GROUP BY button_id
+    ORDER BY button_id
+    ON CONFLICT (button_id, slot) DO UPDATE
+    SET usage_count = buttoncounter.usage_count + excluded.usage_count
+    """
+)
+
+
+def fold_button_counters(*, session: Session) -> int:
+    """
+    Fold the counter slots of every Button into its first slot.
+
+    Returns the number of Buttons whose slots were folded.
+    """
+    result = session.exec(FOLD_COUNTERS)  # type: ignore[call-overload]
+    session.commit()
+    return int(result.rowcount)
+
+
+# Advisory lock serializing the folds of the usage deltas into the
+# rollups, and their rebuilds, across workers
+USAGE_ROLLUP_LOCK = "hashtext('buttonuse rollups')"
+TRY_LOCK_USAGE_ROLLUPS = text(f"SELECT pg_try_advisory_xact_lock({USAGE_ROLLUP_LOCK})")
+LOCK_USAGE_ROLLUPS = text(f"SELECT pg_advisory_lock({USAGE_ROLLUP_LOCK})")
+UNLOCK_USAGE_ROLLUPS = text(f"SELECT pg_advisory_unlock({USAGE_ROLLUP_LOCK})")
+
+# Adds the usage deltas recorded since the last fold to the hourly and
+# daily rollups, and deletes them, atomically, so that a reader sees
+# each use in exactly one of them. A press committing meanwhile leaves
+# its delta for the next fold.
+FOLD_USAGE_ROLLUPS = text(
+    """
+    WITH folded AS (
+        DELETE FROM buttonusedelta
+        RETURNING button_id, bucket_start, count
+    ),
+    hourly AS (
+        INSERT INTO buttonusehourly (button_id, bucket_start, count)
+        SELECT button_id, bucket_start, sum(count)
+        FROM folded
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (button_id, bucket_start) DO UPDATE
+        SET count = buttonusehourly.count + excluded.count
+    )
+    INSERT INTO buttonusedaily (button_id, bucket_start, count)
+    SELECT button_id, date_trunc('day', bucket_start), sum(count)
+    FROM folded
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (button_id, bucket_start) DO UPDATE
+    SET count = buttonusedaily.count + excluded.count
+    """
+)
+
+
+def fold_usage_rollups(*, session: Session) -> int:
+    """
+    Fold the pending usage deltas into the hourly and daily rollups.
+    Skipped while another worker folds or rebuilds them.
+
+    Returns the number of days of Button usage that were updated.
+    """
+    if not session.exec(TRY_LOCK_USAGE_ROLLUPS).scalar():  # type: ignore[call-overload]
+        session.rollback()
+        return 0
+    result = session.exec(FOLD_USAGE_ROLLUPS)  # type: ignore[call-overload]
+    session.commit()
+    return int(result.rowcount)
+
+
+# The month from which the raw uses are all still there: that of the
+# oldest monthly partition of `buttonuse`, or of the oldest use in its
+# default partition. The rollups of older months outlive their uses.
+USES_RETAINED_FROM = """
+    SELECT least(
+        (
+            SELECT CAST(to_date(substr(min(child.relname), 12), 'YYYYMM') AS timestamp)
+            FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = CAST('buttonuse' AS regclass)
+                AND child.relname LIKE 'buttonuse\\_p%'
+        ),
+        (SELECT date_trunc('month', min(timestamp)) FROM buttonuse_default)
+    ) AS start
+"""
+
+
+def get_uses_retained_from(*, session: Session) -> datetime | None:
+    """
+    Return the start of the month (in UTC, without a time zone) from
+    which the raw uses are all still there, or None if there are none.
+    """
+    return session.exec(text(USES_RETAINED_FROM)).scalar()  # type: ignore[call-overload,no-any-return]
+
+
+REBUILD_USAGE_ROLLUPS = [
+    text("DELETE FROM buttonusedelta WHERE bucket_start >= :retained_from"),
+    text("DELETE FROM buttonusehourly WHERE bucket_start >= :retained_from"),
+    text("DELETE FROM buttonusedaily WHERE bucket_start >= :retained_from"),
+    text(
+        """
+        INSERT INTO buttonusehourly (button_id, bucket_start, count)
+        SELECT button_id, date_trunc('hour', timestamp), count(*)
+        FROM buttonuse
+        GROUP BY 1, 2
+        """
+    ),
+    text(
+        """
+        INSERT INTO buttonusedaily (button_id, bucket_start, count)
+        SELECT button_id, date_trunc('day', bucket_start), sum(count)
+        FROM buttonusehourly
+        WHERE bucket_start >= :retained_from
+        GROUP BY 1, 2
+        """
+    ),
+]
+
+
+def rebuild_usage_rollups(*, session: Session) -> None:
+    """
+    Recompute the hourly and daily rollups from the raw uses, from the
+    month the oldest of them is in on. Older rollups are left alone.
+
+    The session must be in a `REPEATABLE READ` transaction, begun while
+    holding `LOCK_USAGE_ROLLUPS` (see
+    `app.core.usage_rollup.rebuild_usage_rollups`), so that the deltas
+    it deletes are those of the uses it counts, and no fold runs
+    meanwhile.
+    """
+    # Taken before the snapshot, so that no partition is dropped from
+    # under the rebuild
+    session.exec(text("LOCK TABLE buttonuse IN ACCESS SHARE MODE"))  # type: ignore[call-overload]
+    retained_from = session.exec(text(USES_RETAINED_FROM)).scalar()  # type: ignore[call-overload]
+    if retained_from is not None:
+        for statement in REBUILD_USAGE_ROLLUPS:
+            session.exec(
+                statement,  # type: ignore[call-overload]
+                params={"retained_from": retained_from},
+            )
+    session.commit()
+
+
+# Buckets of either rollup whose count, plus the pending deltas, differs
+# from the raw uses of their Button, over the months the raw uses are
+# retained for. A single statement, so that it sees each fold and press
+# entirely or not at all.
+CHECK_USAGE_ROLLUPS = text(
+    f"""
+    WITH retained AS ({USES_RETAINED_FROM}),
+    raw AS (
+        SELECT button_id, date_trunc('hour', timestamp) AS bucket_start, count(*)
+        FROM buttonuse
+        GROUP BY 1, 2
+    ),
+    pending AS (
+        SELECT button_id, bucket_start, sum(count) AS count
+        FROM buttonusedelta
+        WHERE bucket_start >= (SELECT start FROM retained)
+        GROUP BY 1, 2
+    ),
+    hourly AS (
+        SELECT
+            coalesce(rollup.button_id, pending.button_id) AS button_id,
+            coalesce(rollup.bucket_start, pending.bucket_start) AS bucket_start,
+            coalesce(rollup.count, 0) + coalesce(pending.count, 0) AS count
+        FROM (
+            SELECT * FROM buttonusehourly
+            WHERE bucket_start >= (SELECT start FROM retained)
+        ) AS rollup
+        FULL JOIN pending USING (button_id, bucket_start)
+    ),
+    daily AS (
+        SELECT
+            coalesce(rollup.button_id, pending.button_id) AS button_id,
+            coalesce(rollup.bucket_start, pending.bucket_start) AS bucket_start,
+            coalesce(rollup.count, 0) + coalesce(pending.count, 0) AS count
+        FROM (
+            SELECT * FROM buttonusedaily
+            WHERE bucket_start >= (SELECT start FROM retained)
+        ) AS rollup
+        FULL JOIN (
+            SELECT button_id, date_trunc('day', bucket_start) AS bucket_start,
+                sum(count) AS count
+            FROM pending
+            GROUP BY 1, 2
+        ) AS pending USING (button_id, bucket_start)
+    ),
+    raw_daily AS (
+        SELECT button_id, date_trunc('day', bucket_start) AS bucket_start,
+            sum(count) AS count
+        FROM raw
+        GROUP BY 1, 2
+    )
+    SELECT 'hourly', button_id, bucket_start, coalesce(hourly.count, 0),
+        coalesce(raw.count, 0)
+    FROM hourly
+    FULL JOIN raw USING (button_id, bucket_start)
+    WHERE hourly.count IS DISTINCT FROM raw.count
+    UNION ALL
+    SELECT 'daily', button_id, bucket_start, coalesce(daily.count, 0),
+        coalesce(raw_daily.count, 0)
+    FROM daily
+    FULL JOIN raw_daily USING (button_id, bucket_start)
+    WHERE daily.count IS DISTINCT FROM raw_daily.count
+    ORDER BY 2, 3, 1
+    """
+)
+
+
+def check_usage_rollups(*, session: Session) -> list[UsageRollupMismatch]:
+    """
+    Compare the hourly and daily rollups, plus the pending deltas, with
+    the raw uses, from the month the oldest of them is in on. Returns
+    the buckets that differ.
+    """
+    return [
+        UsageRollupMismatch(
+            rollup=rollup,
+            button_id=button_id,
+            bucket_start=bucket_start,
+            count=count,
+            raw_count=raw_count,
+        )
+        for rollup, button_id, bucket_start, count, raw_count in session.exec(
+            CHECK_USAGE_ROLLUPS  # type: ignore[call-overload]
+        )
+    ]
+
+
+# Advisory lock serializing the maintenance of the `buttonuse`
+# partitions across workers
+USE_PARTITION_LOCK = "hashtext('buttonuse partitions')"
+TRY_LOCK_USE_PARTITIONS = text(
+    f"SELECT pg_try_advisory_xact_lock({USE_PARTITION_LOCK})"
+)
+USE_PARTITION_PREFIX = "buttonuse_p"
+
+USE_PARTITIONS = text(
+    """
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = CAST('buttonuse' AS regclass)
+        AND child.relname LIKE 'buttonuse\\_p%'
+    ORDER BY 1
+    """
+)
+
+# Creates the partition as a table of its own and attaches it, rather
+# than with `CREATE TABLE ... PARTITION OF`: attaching doesn't lock
+# presses or reads out of `buttonuse`. Uses of its month that landed in
+# the default partition meanwhile are moved in first, as attaching
+# requires, with the default partition locked against inserts until
+# the partition is attached, so that none lands there in between. That
+# only holds up presses from outside every partition.
+CREATE_USE_PARTITION = [
+    "CREATE TABLE {name} (LIKE buttonuse INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+    "LOCK TABLE buttonuse_default IN SHARE ROW EXCLUSIVE MODE",
+    """
+    WITH moved AS (
+        DELETE FROM buttonuse_default
+        WHERE timestamp >= :start AND timestamp < :end
+        RETURNING *
+    )
+    INSERT INTO {name} SELECT * FROM moved
+    """,
+    "ALTER TABLE buttonuse ATTACH PARTITION {name} "
+    "FOR VALUES FROM ('{start}') TO ('{end}')",
+]
+
+DROP_USE_PARTITION = [
+    "ALTER TABLE buttonuse DETACH PARTITION {name}",
+    "DROP TABLE {name}",
+]
+
+
+def use_partition_month(name: str) -> datetime:
+    """
+    Return the month a partition of `buttonuse` holds the uses of.
+    """
+    return datetime.strptime(name.removeprefix(USE_PARTITION_PREFIX), "%Y%m")
+
+
+def next_month(month: datetime) -> datetime:
+    """
+    Return the start of the month after `month`.
+    """
+    if month.month == 12:
+        return month.replace(year=month.year + 1, month=1, day=1)
+    return month.replace(month=month.month + 1, day=1)
+
+
+def create_use_partitions(
+    *, session: Session, start: datetime, months: int
+) -> list[str]:
+    """
+    Create the monthly partitions of `buttonuse` for `months` months
+    from that of `start` (in UTC) which don't exist yet. Skipped while
+    another worker maintains the partitions.
+
+    Returns the names of the partitions created.
+    """
+    if not session.exec(TRY_LOCK_USE_PARTITIONS).scalar():  # type: ignore[call-overload]
+        session.rollback()
+        return []
+    # Give up rather than queue presses behind the partition locks
+    session.exec(text("SET LOCAL lock_timeout = '5s'"))  # type: ignore[call-overload]
+    existing = set(session.exec(USE_PARTITIONS).scalars())  # type: ignore[call-overload]
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    month = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    created = []
+    for _ in range(months):
+        end = next_month(month)
+        name = f"{USE_PARTITION_PREFIX}{month:%Y%m}"
+        if name not in existing:
+            for statement in CREATE_USE_PARTITION:
+                session.exec(
+                    text(statement.format(name=name, start=month, end=end)),  # type: ignore[call-overload]
+                    params={"start": month, "end": end},
+                )
+            created.append(name)
+        month = end
+    session.commit()
+    return created
+
+
+def drop_use_partitions(*, session: Session, before: datetime) -> list[str]:
+    """
+    Drop the monthly partitions of `buttonuse` whose month ends on or
+    before `before` (the start of a month, in UTC), and delete the uses
+    from before it in the default partition, which only holds a few
+    strays. Skipped while another worker maintains the partitions.
+
+    Detaching a partition (which can't be done concurrently within a
+    transaction) takes an ACCESS EXCLUSIVE lock on `buttonuse`: presses
+    and reads of uses wait for the drop to commit, or for its 5 second
+    `lock_timeout` to give up on it.
+
+    Returns the names of the partitions dropped.
+    """
+    if not session.exec(TRY_LOCK_USE_PARTITIONS).scalar():  # type: ignore[call-overload]
+        session.rollback()
+        return []
+    session.exec(text("SET LOCAL lock_timeout = '5s'"))  # type: ignore[call-overload]
+    dropped = []
+    for name in session.exec(USE_PARTITIONS).scalars().all():  # type: ignore[call-overload]
+        if next_month(use_partition_month(name)) > before:
+            break
+        for statement in DROP_USE_PARTITION:
+            session.exec(text(statement.format(name=name)))  # type: ignore[call-overload]
+        dropped.append(name)
+    session.exec(
+        text("DELETE FROM buttonuse_default WHERE timestamp < :before"),  # type: ignore[call-overload]
+        params={"before": before},
+    )
+    session.commit()
+    return dropped
+
+
+def estimate_count(*, session: Session, statement: Select[Any]) -> int:
+    """
+    Estimate the number of rows a statement returns, from the planner's
+    statistics rather than by reading them.
+    """
+    compiled = statement.compile(dialect=session.get_bind().dialect)
+    plan = (
+        session.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+        .scalar_one()
+    )
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def summarize_button_usage(
+    *, session: Session, criteria: list[ColumnElement[bool]]
+) -> ButtonUsageSummary:
+    """
+    Total the usage of the Buttons matching `criteria`, overall, per
+    type and per retirement status, in a single grouped statement.
+    """
+    buttons = (
+        select(
+            col(Button.type).label("type"),
+            col(Button.retired_at).is_not(None).label("retired"),
+            func.coalesce(Button.duration, 0).label("duration"),
+            Button.usage_count.label("presses"),  # type: ignore[attr-defined]
+        )
+        .where(*criteria)
+        .subquery()
+    )
+    presses = buttons.c.presses
+    statement = select(  # type: ignore[call-overload]
+        # A bit per column left out of the row's grouping set
+        func.grouping(buttons.c.type, buttons.c.retired),
+        buttons.c.type,
+        buttons.c.retired,
+        func.count(),  # pylint: disable=not-callable
+        func.coalesce(func.sum(presses), 0),
+        func.coalesce(func.sum(buttons.c.duration * presses), 0),
+    ).group_by(func.grouping_sets(text("()"), buttons.c.type, buttons.c.retired))
+    empty = ButtonUsageTotals(buttons=0, presses=0, airtime=0)
+    summary = ButtonUsageSummary(total=empty, by_type={}, active=empty, retired=empty)
+    for grouping, type_, retired, count, presses, airtime in session.exec(statement):
+        totals = ButtonUsageTotals(buttons=count, presses=presses, airtime=airtime)
+        if grouping == 0b11:
+            summary.total = totals
+        elif grouping == 0b01:
+            summary.by_type[type_] = totals
+        elif retired:
+            summary.retired = totals
+        else:
+            summary.active = totals
+    return summary
+
+
+# Presses per bucket of each Button, with every bucket starting in
+# [start, end) present, in the order of `button_ids`. Buckets are
+# truncated in `tz`, so days and weeks start at local midnight.
+#
+# The part [lo, hi) of each bucket within [start, end) is counted from
+# the usage rollups: whole UTC days [day_lo, day_hi) from the daily
+# rollup, the other whole hours [hour_lo, hour_hi) from the hourly one,
+# and both from the uses recorded since the last fold in
+# `buttonusedelta`. Only the partial hours at either end, such as the
+# current one, are counted from the raw uses, through the
+# (button_id, timestamp) index. Being a single statement, it sees each
+# fold either entirely or not at all.
+USAGE_SERIES = text(
+    """
+    WITH buttons AS (
+        SELECT *
+        FROM unnest(CAST(:button_ids AS uuid[])) WITH ORDINALITY
+            AS button (button_id, n)
+    ),
+    buckets AS (
+        SELECT
+            start,
+            date_add(start, CAST('1 ' || :bucket AS interval), :tz) AS end_
+        FROM generate_series(
+            date_trunc(:bucket, CAST(:start AS timestamptz), :tz),
+            CAST(:end AS timestamptz) - INTERVAL '1 microsecond',
+            CAST('1 ' || :bucket AS interval),
+            :tz
+        ) AS start
+    ),
+    bounds AS (
+        SELECT buttons.n, buttons.button_id, buckets.start, lo, hi, hour_lo, hour_hi,
+            day_lo, greatest(date_trunc('day', hi), day_lo) AS day_hi
+        FROM buttons
+        CROSS JOIN buckets
+        CROSS JOIN LATERAL (
+            SELECT
+                greatest(buckets.start, CAST(:start AS timestamptz))
+                    AT TIME ZONE 'UTC' AS lo,
+                least(buckets.end_, CAST(:end AS timestamptz))
+                    AT TIME ZONE 'UTC' AS hi
+        ) AS clipped
+        CROSS JOIN LATERAL (
+            SELECT least(
+                date_trunc('hour', lo - INTERVAL '1 microsecond')
+                    + INTERVAL '1 hour',
+                hi
+            ) AS hour_lo
+        ) AS first_hour
+        CROSS JOIN LATERAL (
+            SELECT greatest(date_trunc('hour', hi), hour_lo) AS hour_hi
+        ) AS last_hour
+        CROSS JOIN LATERAL (
+            SELECT least(
+                date_trunc('day', lo - INTERVAL '1 microsecond') + INTERVAL '1 day',
+                hour_hi
+            ) AS day_lo
+        ) AS first_day
+    )
+    SELECT
+        button_id,
+        start,
+        (
+            SELECT count(*) FROM buttonuse
+            WHERE button_id = bounds.button_id
+                AND timestamp >= lo AND timestamp < hour_lo
+        ) + (
+            SELECT count(*) FROM buttonuse
+            WHERE button_id = bounds.button_id
+                AND timestamp >= hour_hi AND timestamp < hi
+        ) + (
+            SELECT coalesce(sum(count), 0) FROM buttonusehourly
+            WHERE button_id = bounds.button_id
+                AND bucket_start >= hour_lo AND bucket_start < day_lo
+        ) + (
+            SELECT coalesce(sum(count), 0) FROM buttonusehourly
+            WHERE button_id = bounds.button_id
+                AND bucket_start >= day_hi AND bucket_start < hour_hi
+        ) + (
+            SELECT coalesce(sum(count), 0) FROM buttonusedaily
+            WHERE button_id = bounds.button_id
+                AND bucket_start >= day_lo AND bucket_start < day_hi
+        ) + (
+            SELECT coalesce(sum(count), 0) FROM buttonusedelta
+            WHERE button_id = bounds.button_id
+                AND bucket_start >= hour_lo AND bucket_start < hour_hi
+        ) AS count
+    FROM bounds
+    ORDER BY n, start
+    """
+).columns(start=DateTime(timezone=True))
+
+
+def get_usage_series(
+    *,
+    session: Session,
+    button_ids: list[uuid.UUID],
+    start: datetime,
+    end: datetime,
+    bucket: UsageBucketSize,
+    tz: str,
+) -> dict[uuid.UUID, list[UsageBucket]]:
+    """
+    Count the presses of each Button per `bucket` between `start`
+    (inclusive) and `end` (exclusive), in a single statement. The first
+    bucket starts at or before `start`, but only counts presses from
+    `start` on.
+    """
+    series: dict[uuid.UUID, list[UsageBucket]] = {
+        button_id: [] for button_id in button_ids
+    }
+    rows = session.exec(
+        USAGE_SERIES,  # type: ignore[call-overload]
+        params={
+            "button_ids": button_ids,
+            "start": start,
+            "end": end,
+            "bucket": bucket,
+            "tz": tz,
+        },
+    )
+    for button_id, bucket_start, count in rows:
+        series[button_id].append(UsageBucket(start=bucket_start, count=count))
+    return series
+
+
+def build_psa_report(
+    *,
+    session: Session,
+    period: ReportPeriod,
+    tz: str,
+    start: datetime,
+    end: datetime,
+    closed: bool,
+) -> PsaReport:
+    """
+    Generate the PSA report of the period from `start` (inclusive) to
+    `end` (exclusive), both with a time zone, from the raw uses of the
+    PSA Buttons and their retirements.
+    """
+    # buttonuse and buttonretirement store UTC without a time zone
+    lo = start.astimezone(timezone.utc).replace(tzinfo=None)
+    hi = end.astimezone(timezone.utc).replace(tzinfo=None)
+    plays = session.exec(
+        select(ButtonUse.timestamp, ButtonUse.button_id, ButtonUse.origin)
+        .join(Button, col(Button.id) == col(ButtonUse.button_id))
+        .where(
+            col(Button.type) == PSA_BUTTON_TYPE,
+            col(ButtonUse.timestamp) >= lo,
+            col(ButtonUse.timestamp) < hi,
+        )
+        .order_by(col(ButtonUse.timestamp), col(ButtonUse.id))
+    ).all()
+    counts = Counter(button_id for _, button_id, _ in plays)
+    # Buttons pressed before they were created, through replayed
+    # presses, are listed too
+    buttons = session.exec(
+        select(Button.id, Button.title, Button.source, Button.duration)
+        .where(
+            col(Button.type) == PSA_BUTTON_TYPE,
+            or_(col(Button.created_at) < hi, col(Button.id).in_(list(counts))),
+        )
+        .order_by(col(Button.title), col(Button.id))
+    ).all()
+    retirements: dict[uuid.UUID, list[PsaRetirement]] = {}
+    for retirement in session.exec(
+        select(ButtonRetirement)
+        .join(Button, col(Button.id) == col(ButtonRetirement.button_id))
+        .where(
+            col(Button.type) == PSA_BUTTON_TYPE,
+            col(ButtonRetirement.retired_at) < hi,
+            or_(
+                col(ButtonRetirement.unretired_at).is_(None),
+                col(ButtonRetirement.unretired_at) > lo,
+            ),
+        )
+        .order_by(col(ButtonRetirement.retired_at))
+    ):
+        retirements.setdefault(retirement.button_id, []).append(
+            PsaRetirement(
+                retired_at=retirement.retired_at.replace(tzinfo=timezone.utc),
+                unretired_at=retirement.unretired_at
+                and retirement.unretired_at.replace(tzinfo=timezone.utc),
+            )
+        )
+
+    totals = [
+        PsaButtonTotals(
+            button_id=id,
+            title=title,
+            source=source,
+            plays=counts[id],
+            airtime=(duration or 0) * counts[id],
+            retirements=retirements.get(id, []),
+        )
+        for id, title, source, duration in buttons  # pylint: disable=redefined-builtin
+    ]
+    sources: dict[str | None, PsaSourceTotals] = {}
+    for button in totals:
+        source = sources.setdefault(
+            button.source,
+            PsaSourceTotals(source=button.source, buttons=0, plays=0, airtime=0),
+        )
+        source.buttons += 1
+        source.plays += button.plays
+        source.airtime += button.airtime
+    return PsaReport(
+        period=period,
+        tz=tz,
+        start=start,
+        end=end,
+        closed=closed,
+        generated_at=datetime.now(timezone.utc),
+        plays=len(plays),
+        airtime=sum(button.airtime for button in totals),
+        buttons=totals,
+        # Buttons without a source last
+        sources=sorted(
+            sources.values(), key=lambda source: (source.source is None, source.source)
+        ),
+        log=[
+            PsaPlay(
+                timestamp=timestamp.replace(tzinfo=timezone.utc),
+                button_id=button_id,
+                origin=origin,
+            )
+            for timestamp, button_id, origin in plays
+        ],
+    )
+
+
+GET_PSA_REPORT_SNAPSHOT = text(
+    """
+    SELECT report::text FROM psareportsnapshot
+    WHERE period = :period AND tz = :tz AND start = :start
+    """
+)
+
+
+def get_psa_report_snapshot(
+    *, session: Session, period: ReportPeriod, tz: str, start: date
+) -> str | None:
+    """
+    Return the stored PSA report of the period starting on the local
+    date `start`, as JSON, if there is one.
+    """
+    return session.exec(  # type: ignore[no-any-return]
+        GET_PSA_REPORT_SNAPSHOT,  # type: ignore[call-overload]
+        params={"period": period, "tz": tz, "start": start},
+    ).scalar()
+
+
+SAVE_PSA_REPORT_SNAPSHOT = text(
+    """
+    INSERT INTO psareportsnapshot (period, tz, start, created_at, report)
+    VALUES (:period, :tz, :start, now(), CAST(:report AS json))
+    ON CONFLICT DO NOTHING
+    """
+)
+
+
+def save_psa_report_snapshot(*, session: Session, report: PsaReport) -> str:
+    """
+    Store the PSA report of a closed period, unless another one was
+    stored for it meanwhile, and return the one stored, as JSON.
+    """
+    start = report.start.date()
+    session.exec(
+        SAVE_PSA_REPORT_SNAPSHOT,  # type: ignore[call-overload]
+        params={
+            "period": report.period,
+            "tz": report.tz,
+            "start": start,
+            "report": report.model_dump_json(),
+        },
+    )
+    session.commit()
+    stored = get_psa_report_snapshot(
+        session=session, period=report.period, tz=report.tz, start=start
+    )
+    assert stored is not None
+    return stored
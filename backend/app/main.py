@@ -2,10 +2,32 @@
 Entry point for the FastAPI application.
 """
 
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from app.api.main import api_router
+from app.core.button_cache import start_button_cache, stop_button_cache
+from app.core.button_events import start_button_events, stop_button_events
 from app.core.config import settings
-from fastapi import FastAPI
+from app.core.counter_fold import start_counter_folding, stop_counter_folding
+from app.core.db import async_engine
+from app.core.press_buffer import close_press_buffer
+from app.core.press_journal import start_press_journal, stop_press_journal
+from app.core.press_keys import start_press_key_sweeper, stop_press_key_sweeper
+from app.core.security import (
+    PasswordHashingBusy,
+    start_password_hashing,
+    stop_password_hashing,
+)
+from app.core.usage_rollup import (
+    start_usage_rollup_folding,
+    stop_usage_rollup_folding,
+)
+from app.core.use_partitions import start_use_partitioning, stop_use_partitioning
+from app.core.user_cache import start_user_cache, stop_user_cache
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
@@ -22,8 +44,39 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
+    """
+    Start up and shut down the application. On shutdown, presses still
+    queued in the press buffer are flushed.
+    """
+    start_use_partitioning()
+    start_button_cache()
+    start_user_cache()
+    start_password_hashing()
+    start_counter_folding()
+    start_press_key_sweeper()
+    start_press_journal()
+    start_usage_rollup_folding()
+    start_button_events()
+    yield
+    stop_button_events()
+    stop_usage_rollup_folding()
+    stop_press_key_sweeper()
+    stop_counter_folding()
+    stop_password_hashing()
+    stop_user_cache()
+    stop_button_cache()
+    close_press_buffer()
+    stop_press_journal()
+    stop_use_partitioning()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
 )
@@ -38,4 +91,18 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy(_: Request, __: PasswordHashingBusy) -> JSONResponse:
+    """
+    Turn away requests that would hash a password while the hashing
+    pool is full.
+    """
+    return JSONResponse(
+        {"detail": "Too many password checks in progress, try again shortly"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
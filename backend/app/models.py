@@ -3,12 +3,24 @@ Models for SQLAlchemy and Pydantic.
 """
 
 import uuid
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import date, datetime, timezone
+from typing import TYPE_CHECKING, Any, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr
-from sqlalchemy import Column, ForeignKey, text
-from sqlalchemy.orm import Mapped
+from sqlalchemy import (
+    DDL,
+    JSON,
+    BigInteger,
+    Column,
+    Connection,
+    ForeignKey,
+    Index,
+    event,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.orm import Mapped, column_property
 from sqlmodel import DateTime, Field, Relationship, SQLModel
 
 DEFAULT_DELETED_USER_ID: uuid.UUID = uuid.UUID("00000000-0000-0000-0000-000000000000")
@@ -70,17 +82,283 @@ class UsersPublic(SQLModel):  # pylint: disable=missing-class-docstring
 
 
 class ButtonUse(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Partitioned by month of `timestamp` (in UTC), so that old months
+    # are dropped whole (see app.core.use_partitions). A partition's
+    # rows all have to carry the partition key in their primary key.
+    # The first index serves the per-Button count, the most recent uses,
+    # and the cascade from `button`, in every partition. The BRIN index,
+    # a few pages per partition, narrows the exports of a time range
+    # within a partition, in the order the uses were recorded.
+    __table_args__ = (
+        Index("ix_buttonuse_button_id_timestamp", "button_id", text("timestamp DESC")),
+        Index("ix_buttonuse_timestamp", "timestamp", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     button_id: uuid.UUID = Field(
         sa_column=Column(
             "button_id", ForeignKey("button.id", ondelete="CASCADE"), nullable=False
         )
     )
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), primary_key=True
+    )
     origin: Optional[str] = Field(default=None, max_length=255)
     button: Mapped["Button"] = Relationship(back_populates="uses")
 
 
+# Rows outside every monthly partition, such as presses replayed from
+# the journal after their month was dropped, land in a default one
+event.listen(
+    ButtonUse.__table__,  # type: ignore[attr-defined]
+    "after_create",
+    DDL(  # type: ignore[no-untyped-call]
+        "CREATE TABLE buttonuse_default PARTITION OF buttonuse DEFAULT"
+    ),
+)
+
+
+UsageBucketSize = Literal["hour", "day", "week"]
+
+
+class UsageBucket(SQLModel):  # pylint: disable=missing-class-docstring
+    # Start of the bucket, in the time zone of the series
+    start: datetime
+    count: int
+
+
+class ButtonUsageSeries(SQLModel):
+    """
+    Presses of a Button per bucket, with a bucket for every hour, day or
+    week in the requested range, including those without presses.
+    """
+
+    button_id: uuid.UUID
+    bucket: UsageBucketSize
+    tz: str
+    data: list[UsageBucket]
+
+
+class ButtonUsageSeriesList(SQLModel):  # pylint: disable=missing-class-docstring
+    data: list[ButtonUsageSeries]
+
+
+class ButtonPress(SQLModel):
+    """
+    A single press of a Button, as handed to the write path. Its `id`
+    becomes the ID of the ButtonUse it is recorded as.
+    """
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
+    button_id: uuid.UUID
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    origin: Optional[str] = Field(default=None, max_length=255)
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)
+
+
+MAX_PRESS_BATCH = 10_000
+
+
+class ButtonPressIn(SQLModel):  # pylint: disable=missing-class-docstring
+    # A press replayed through `POST /buttons/increments:batch`
+    button_id: uuid.UUID
+    pressed_at: datetime = Field(
+        description="When the press happened (assumed UTC without an offset)"
+    )
+    origin: Optional[str] = Field(
+        default=None,
+        max_length=255,
+        description="Defaults to the IP address of the client",
+    )
+    idempotency_key: Optional[str] = Field(
+        default=None,
+        max_length=255,
+        description="A press with the key of an earlier one isn't recorded again",
+    )
+    token: Optional[str] = Field(
+        default=None,
+        max_length=64,
+        description="Token of the Button's press URL",
+    )
+
+
+class ButtonPressUrl(SQLModel):  # pylint: disable=missing-class-docstring
+    # Signed press URL of a Button, from `GET /buttons/{id}/press-url`
+    url: str
+    token: str
+    version: int
+
+
+class ButtonPressBatch(SQLModel):  # pylint: disable=missing-class-docstring
+    presses: list[ButtonPressIn] = Field(max_length=MAX_PRESS_BATCH)
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "presses": [
+                    {
+                        "button_id": "aa557cdd-cc28-449a-8669-c4f2d331b4d9",
+                        "pressed_at": "2025-03-31T12:34:56.789Z",
+                        "origin": "studio-a-deck",
+                        "idempotency_key": "studio-a-deck:1743424496789",
+                    }
+                ]
+            }
+        }
+    )
+
+
+ButtonPressStatus = Literal["recorded", "duplicate", "retired", "not_found", "invalid"]
+
+
+class ButtonPressResult(SQLModel):  # pylint: disable=missing-class-docstring
+    # Outcome of one press of a batch, in the order they were sent
+    status: ButtonPressStatus
+    detail: Optional[str] = None
+
+
+class ButtonPressBatchResults(SQLModel):  # pylint: disable=missing-class-docstring
+    data: list[ButtonPressResult]
+    recorded: int
+
+
+class ButtonPressKey(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Idempotency key of a recorded press, so that a retry of it isn't
+    # recorded again until the key expires.
+    key: str = Field(primary_key=True, max_length=255)
+    button_id: uuid.UUID = Field(
+        sa_column=Column(
+            "button_id", ForeignKey("button.id", ondelete="CASCADE"), nullable=False
+        )
+    )
+    press_id: uuid.UUID
+    expires_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True)
+    )
+
+
+class ButtonPressDedup(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Last recorded press per (Button, origin), so that presses within
+    # the Button's de-duplication window are dropped by every worker.
+    # A missing origin is stored as "". Rows are deleted once expired
+    # (see app.core.press_keys).
+    button_id: uuid.UUID = Field(
+        sa_column=Column(
+            "button_id",
+            ForeignKey("button.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    origin: str = Field(default="", primary_key=True, max_length=255)
+    press_id: uuid.UUID
+    pressed_at: datetime
+    expires_at: datetime = Field(index=True)
+
+
+class ButtonCounter(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Usage count of a Button, kept out of the wide `button` row so that
+    # a press rewrites a narrow tuple and leaves `button.updated_at`
+    # alone. A Button with `counter_slots` spreads its count over that
+    # many rows (slots), each press bumping a random one, so concurrent
+    # presses don't queue on a single row lock; its count is the sum of
+    # its slots. A missing slot counts as 0.
+    button_id: uuid.UUID = Field(
+        sa_column=Column(
+            "button_id",
+            ForeignKey("button.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    slot: int = Field(default=0, primary_key=True)
+    usage_count: int = Field(default=0, nullable=False)
+
+
+class ButtonUseHourly(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Number of uses of a Button per hour (in UTC) that have been folded
+    # in from `buttonusedelta`. See app.core.usage_rollup.
+    button_id: uuid.UUID = Field(
+        sa_column=Column(
+            "button_id",
+            ForeignKey("button.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    bucket_start: datetime = Field(primary_key=True)
+    count: int
+
+
+class ButtonUseDaily(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Number of uses of a Button per day (in UTC), as above
+    button_id: uuid.UUID = Field(
+        sa_column=Column(
+            "button_id",
+            ForeignKey("button.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    bucket_start: datetime = Field(primary_key=True)
+    count: int
+
+
+class ButtonUseDelta(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Uses per Button and hour recorded by each press statement, not yet
+    # folded into the rollups. Appended rather than upserted, so that
+    # presses don't queue on a shared rollup row.
+    __table_args__ = (
+        Index("ix_buttonusedelta_button_id_bucket_start", "button_id", "bucket_start"),
+    )
+    # Every press statement takes an ID, so 32 bits would run out
+    id: Optional[int] = Field(default=None, primary_key=True, sa_type=BigInteger)
+    button_id: uuid.UUID = Field(
+        sa_column=Column(
+            "button_id", ForeignKey("button.id", ondelete="CASCADE"), nullable=False
+        )
+    )
+    bucket_start: datetime
+    count: int
+
+
+# Leave free space on every page so that counter bumps can be HOT
+# updates (the new tuple version lands on the same page and no index
+# entry is written).
+BUTTON_COUNTER_FILLFACTOR = 50
+event.listen(
+    ButtonCounter.__table__,  # type: ignore[attr-defined]
+    "after_create",
+    DDL(  # type: ignore[no-untyped-call]
+        f"ALTER TABLE buttoncounter SET (fillfactor = {BUTTON_COUNTER_FILLFACTOR})"
+    ),
+)
+
+
+def has_pg_trgm(
+    ddl: Any, target: Any, bind: Connection | None, *args: Any, **kw: Any
+) -> bool:
+    """
+    Whether the pg_trgm extension can be installed. It ships with the
+    Postgres image, but not with every Postgres, and without it title
+    searches still work, only scanning the Buttons.
+    """
+    # pylint: disable=unused-argument
+    return bind is None or (
+        bind.exec_driver_sql(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        ).first()
+        is not None
+    )
+
+
+event.listen(
+    SQLModel.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(  # type: ignore[no-untyped-call]
+        callable_=has_pg_trgm
+    ),
+)
+
+
+MAX_COUNTER_SLOTS = 64
+
+
 class ButtonBase(SQLModel):  # pylint: disable=missing-class-docstring
     # Shared fields for ALL Button models.
     title: str = Field(min_length=1, max_length=255)
@@ -88,6 +366,23 @@ class ButtonBase(SQLModel):  # pylint: disable=missing-class-docstring
     description: Optional[str] = Field(default=None, max_length=255)
     duration: Optional[int] = Field(default=None, description="In seconds")
     source: Optional[str] = Field(default=None, max_length=255)
+    dedup_window_ms: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description=(
+            "Presses from the same origin within this many milliseconds of "
+            "the last recorded one are ignored (e.g. 750)"
+        ),
+    )
+    counter_slots: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=MAX_COUNTER_SLOTS,
+        description=(
+            "Number of rows the usage count is spread over, so that a "
+            "heavily pressed Button doesn't serialize its presses (e.g. 8)"
+        ),
+    )
 
 
 class ButtonCreate(ButtonBase):  # pylint: disable=missing-class-docstring
@@ -126,6 +421,26 @@ class Button(ButtonBase, table=True):  # pylint: disable=missing-class-docstring
     # Actual SQLModel table that includes DB-specific fields. This class
     # won't typically have its own JSON example, since it's not the
     # direct input or output model.
+    # Keys of the pages of GET /buttons/ for each sort and filter, and a
+    # trigram index for its title search
+    __table_args__ = (
+        Index("ix_button_created_at_id", "created_at", "id"),
+        Index("ix_button_created_by_created_at_id", "created_by", "created_at", "id"),
+        Index("ix_button_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_button_title_id", "title", "id"),
+        Index(
+            "ix_button_retired_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("retired_at IS NOT NULL"),
+        ),
+        Index(
+            "ix_button_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(callable_=has_pg_trgm),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -154,18 +469,36 @@ class Button(ButtonBase, table=True):  # pylint: disable=missing-class-docstring
             default=DEFAULT_DELETED_USER_ID,
             server_default=text("'00000000-0000-0000-0000-000000000000'::uuid"),
             nullable=False,
+            index=True,
         )
     )
     # Load the user who created the button, via the relationship:
     creator: Mapped["User"] = Relationship(back_populates="buttons")
     retired_at: Optional[datetime] = Field(default=None)
-    usage_count: int = Field(default=0, nullable=False)
+    # Signed into the token of the Button's press URL; bumping it
+    # invalidates the URLs handed out before (see app.core.security)
+    press_key_version: int = Field(
+        default=0, sa_column_kwargs={"server_default": text("0")}
+    )
+    if TYPE_CHECKING:
+        # Mapped below, once the class exists
+        usage_count: int
     uses: Mapped[list[ButtonUse]] = Relationship(
         back_populates="button",
         sa_relationship_kwargs={"cascade": "all, delete-orphan"},
     )
 
 
+# Number of recorded presses of a Button, summed over its counter slots
+# in a subquery, so that it is loaded in the same statement as the Button
+Button.usage_count = column_property(  # type: ignore[assignment]
+    select(func.coalesce(func.sum(ButtonCounter.usage_count), 0))
+    .where(ButtonCounter.button_id == Button.id)  # type: ignore[arg-type]
+    .correlate_except(ButtonCounter)
+    .scalar_subquery()
+)
+
+
 class ButtonPublic(ButtonBase):  # pylint: disable=missing-class-docstring
     # Fields returned when reading an existing button
     # Matches the final shape the API will return.
@@ -190,9 +523,34 @@ class ButtonPublic(ButtonBase):  # pylint: disable=missing-class-docstring
     )
 
 
+class ButtonUsageTotals(SQLModel):  # pylint: disable=missing-class-docstring
+    buttons: int
+    presses: int
+    # Seconds on air, the duration of each Button times its presses.
+    # Buttons without a duration count for none.
+    airtime: int
+
+
+class ButtonUsageSummary(SQLModel):
+    """
+    Usage over all the Buttons matching the filters of a listing, not
+    only those on the page.
+    """
+
+    total: ButtonUsageTotals
+    by_type: dict[str, ButtonUsageTotals]
+    active: ButtonUsageTotals
+    retired: ButtonUsageTotals
+
+
 class ButtonsPublic(SQLModel):  # pylint: disable=missing-class-docstring
     data: list[ButtonPublic]
-    count: int
+    # Null when not requested
+    count: Optional[int]
+    # Cursor of the next page, null on the last page
+    next_cursor: Optional[str] = None
+    # Null when not requested
+    summary: Optional[ButtonUsageSummary] = None
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
@@ -219,15 +577,26 @@ class ButtonsPublic(SQLModel):  # pylint: disable=missing-class-docstring
                     },
                 ],
                 "count": 2,
+                "next_cursor": None,
             }
         }
     )
 
 
 class ButtonRetirement(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Keys of the pages of GET /buttons/retirements/
+    __table_args__ = (
+        Index("ix_buttonretirement_retired_at_id", "retired_at", "id"),
+        Index(
+            "ix_buttonretirement_created_by_retired_at_id",
+            "created_by",
+            "retired_at",
+            "id",
+        ),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     button_id: uuid.UUID = Field(
-        foreign_key="button.id", nullable=False, ondelete="CASCADE"
+        foreign_key="button.id", nullable=False, ondelete="CASCADE", index=True
     )
     created_by: uuid.UUID = Field(
         sa_column=Column(
@@ -236,6 +605,7 @@ class ButtonRetirement(SQLModel, table=True):  # pylint: disable=missing-class-d
             default=DEFAULT_DELETED_USER_ID,
             server_default=text("'00000000-0000-0000-0000-000000000000'::uuid"),
             nullable=False,
+            index=True,
         )
     )
     retired_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -267,7 +637,234 @@ class ButtonRetirementsPublic(BaseModel):
     """
 
     data: list[ButtonRetirement]
+    count: Optional[int]
+    next_cursor: Optional[str] = None
+
+
+ButtonEventType = Literal["press", "update", "retire", "unretire", "delete"]
+
+
+class ButtonEvent(SQLModel):
+    """
+    An event of the live feed of `GET /buttons/events`.
+    """
+
+    # Sent as the ID of the event, to resume the feed after it
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
+    event: ButtonEventType
+    button_id: uuid.UUID
+    type: str
+    created_by: uuid.UUID
+    at: datetime
+    # Of a press event: the presses of the Button recorded together, the
+    # origin of the last one, and the usage count of the Button after them
+    presses: Optional[int] = None
+    origin: Optional[str] = None
+    usage_count: Optional[int] = None
+
+
+# REPORTS --------------------------------------------------------------
+
+ReportPeriod = Literal["week", "month", "quarter"]
+# Type of the Buttons PSA reports cover
+PSA_BUTTON_TYPE = "PSA"
+
+
+class PsaPlay(SQLModel):  # pylint: disable=missing-class-docstring
+    timestamp: datetime
+    button_id: uuid.UUID
+    origin: Optional[str]
+
+
+class PsaRetirement(SQLModel):  # pylint: disable=missing-class-docstring
+    # A retirement overlapping the period, unclipped; no `unretired_at`
+    # while the Button is still retired
+    retired_at: datetime
+    unretired_at: Optional[datetime]
+
+
+class PsaButtonTotals(SQLModel):  # pylint: disable=missing-class-docstring
+    button_id: uuid.UUID
+    title: str
+    source: Optional[str]
+    plays: int
+    # Seconds on air, the duration of the Button times its plays
+    airtime: int
+    retirements: list[PsaRetirement]
+
+
+class PsaSourceTotals(SQLModel):  # pylint: disable=missing-class-docstring
+    source: Optional[str]
+    buttons: int
+    plays: int
+    airtime: int
+
+
+class PsaReport(SQLModel):
+    """
+    The plays of the PSA Buttons over a week, month or quarter, starting
+    at local midnight in `tz`: every play in order, and the totals per
+    Button and per source. Every PSA Button that existed during the
+    period is listed, played or not.
+
+    Once `closed`, a report is stored as it was generated and never
+    generated again.
+    """
+
+    period: ReportPeriod
+    tz: str
+    start: datetime
+    end: datetime
+    closed: bool
+    generated_at: datetime
+    plays: int
+    airtime: int
+    buttons: list[PsaButtonTotals]
+    sources: list[PsaSourceTotals]
+    log: list[PsaPlay]
+
+
+class PsaReportSnapshot(
+    SQLModel, table=True
+):  # pylint: disable=missing-class-docstring
+    # The PSA report of a closed period, as first generated. See
+    # app.core.psa_report. Kept as `json` rather than `jsonb`, so that
+    # it is returned byte for byte as it was stored.
+    period: str = Field(primary_key=True, max_length=10)
+    tz: str = Field(primary_key=True, max_length=64)
+    # Local date the period starts on
+    start: date = Field(primary_key=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    report: dict[str, Any] = Field(sa_column=Column(JSON, nullable=False))
+
+
+# Snapshots are immutable: they are inserted once and never updated
+event.listen(
+    PsaReportSnapshot.__table__,  # type: ignore[attr-defined]
+    "after_create",
+    DDL(  # type: ignore[no-untyped-call]
+        """
+        CREATE OR REPLACE FUNCTION psareportsnapshot_immutable() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'PSA report snapshots are immutable';
+        END
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER psareportsnapshot_immutable
+        BEFORE UPDATE ON psareportsnapshot
+        FOR EACH ROW EXECUTE FUNCTION psareportsnapshot_immutable();
+        """
+    ),
+)
+
+
+# METRICS --------------------------------------------------------------
+
+
+class PressBufferStats(SQLModel):
+    """
+    Counters for the write-behind press buffer of one worker.
+    """
+
+    ack: str
+    queued: int
+    batches: int
+    presses: int
+    failed_batches: int
+    last_batch_size: int
+    max_batch_size: int
+    mean_batch_size: float
+    last_flush_ms: float
+    max_flush_ms: float
+    mean_flush_ms: float
+
+
+class ButtonCacheStats(SQLModel):
+    """
+    Counters for the cache of missing and retired Buttons of one worker.
+    """
+
+    listening: bool
+    entries: int
+    hits: int
+    misses: int
+    invalidations: int
+
+
+class UserCacheStats(SQLModel):
+    """
+    Counters for the cache of authenticated users of one worker.
+    """
+
+    listening: bool
+    tokens: int
+    users: int
+    hits: int
+    misses: int
+    invalidations: int
+
+
+class UsageRollupMismatch(SQLModel):
+    """
+    A bucket of a usage rollup, plus the uses not folded into it yet,
+    that doesn't match the raw uses of its Button over the bucket.
+    """
+
+    rollup: Literal["hourly", "daily"]
+    button_id: uuid.UUID
+    # In UTC, without a time zone, as stored
+    bucket_start: datetime
     count: int
+    raw_count: int
+
+
+class PressJournalStats(SQLModel):
+    """
+    Depth and counters of the local press journal. Segments and bytes
+    cover every worker's segments; the counters are this worker's.
+    """
+
+    circuit_open: bool
+    segments: int
+    bytes: int
+    appended: int
+    replayed: int
+    corrupt: int
+
+
+class DbPoolStats(SQLModel):
+    """
+    State and checkout counters of one connection pool of one worker.
+    Waits cover the whole checkout, including opening a connection.
+    """
+
+    size: int
+    max_overflow: int
+    timeout_s: float
+    checked_out: int
+    checked_in: int
+    overflow: int
+    max_checked_out: int
+    checkouts: int
+    timeouts: int
+    connects: int
+    invalidations: int
+    last_wait_ms: float
+    max_wait_ms: float
+    mean_wait_ms: float
+
+
+class Metrics(SQLModel):
+    """
+    Runtime metrics of the worker that served the request.
+    """
+
+    pid: int
+    db_pool: Optional[DbPoolStats] = None
+    async_db_pool: Optional[DbPoolStats] = None
+    press_buffer: Optional[PressBufferStats] = None
+    button_cache: Optional[ButtonCacheStats] = None
+    user_cache: Optional[UserCacheStats] = None
+    press_journal: Optional[PressJournalStats] = None
 
 
 # MESSAGE --------------------------------------------------------------
@@ -308,3 +905,16 @@ class NewPassword(SQLModel):
 
     token: str
     new_password: str = Field(min_length=8, max_length=40)
+
+
+class LoginAttempt(SQLModel, table=True):  # pylint: disable=missing-class-docstring
+    # Login attempts per account or client IP in the current and the
+    # previous window of LOGIN_THROTTLE_WINDOW_S, when the login throttle
+    # is shared by all workers (see app.core.login_throttle). Only
+    # counters, which may be lost in a crash, so the table is unlogged.
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key: str = Field(primary_key=True, max_length=300)
+    window_index: int = Field(sa_column=Column(BigInteger, nullable=False, index=True))
+    previous: int = 0
+    current: int = 0
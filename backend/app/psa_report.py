@@ -0,0 +1,74 @@
+"""
+Script to write the PSA report of a week, month or quarter as JSON.
+
+Usage (from `backend/`):
+
+    python -m app.psa_report quarter
+    python -m app.psa_report month --date 2026-09-01 --tz America/New_York -o psa.json
+
+Without `--date`, reports on the period before the current one. The
+report of a closed period is stored the first time it is generated; the
+partition maintainer stores those of `PSA_REPORT_TZ` as they close.
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date, datetime, timedelta
+from typing import get_args
+from zoneinfo import ZoneInfo
+
+from app.core.db import engine
+from app.core.psa_report import get_psa_report, period_bounds
+from app.models import PsaReport, ReportPeriod
+from sqlmodel import Session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def previous_period_day(period: ReportPeriod, zone: ZoneInfo) -> date:
+    """
+    Return the last day of the period before the current one in `zone`.
+    """
+    start, _ = period_bounds(period, datetime.now(zone).date(), zone)
+    return start.date() - timedelta(days=1)
+
+
+def main() -> None:
+    """
+    Entry point of the script.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("period", choices=get_args(ReportPeriod))
+    parser.add_argument(
+        "--date", type=date.fromisoformat, help="a day of the period (YYYY-MM-DD)"
+    )
+    parser.add_argument("--tz", default="UTC", help="time zone of the period")
+    parser.add_argument("-o", "--output", help="file to write to (default: stdout)")
+    args = parser.parse_args()
+    zone = ZoneInfo(args.tz)
+    day = args.date or previous_period_day(args.period, zone)
+    with Session(engine) as session:
+        report = PsaReport.model_validate_json(
+            get_psa_report(session=session, period=args.period, day=day, tz=args.tz)
+        )
+    logger.info(
+        "PSA report of the %s from %s to %s (%s): %d plays of %d Buttons",
+        args.period,
+        report.start.isoformat(),
+        report.end.isoformat(),
+        "closed" if report.closed else "open",
+        report.plays,
+        len(report.buttons),
+    )
+    content = report.model_dump_json(indent=2) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(content)
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,34 @@
 Tests for the buttons API endpoints.
 """
 
+import json
+import socket
+import threading
 import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
 
+import httpx
+import pytest
+import uvicorn
+from app import crud
+from app.api.routes.buttons import recent_presses
+from app.core.button_cache import button_states
+from app.core.button_events import button_events
 from app.core.config import settings
+from app.core.press_buffer import close_press_buffer
+from app.core.press_journal import PressCircuit, PressJournal
+from app.core.security import create_press_token
+from app.main import app
+from app.models import ButtonCreate, ButtonPress, ButtonUse
 from app.tests.utils.button import create_random_button
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string, wait_for
 from fastapi import status
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
 
 
 def test_create_button(
@@ -98,6 +119,216 @@ def test_read_buttons(
     assert len(content["data"]) >= 2
 
 
+def test_read_buttons_pages(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test walking the pages of all buttons by cursor.
+    """
+    created = {create_random_button(db).id for _ in range(3)}
+    url = f"{settings.API_V1_STR}/buttons/"
+    params: dict[str, str | int] = {"limit": 2}
+    seen: list[dict[str, str]] = []
+    while True:
+        response = client.get(url, headers=superuser_token_headers, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        content = response.json()
+        assert len(content["data"]) <= 2
+        seen += content["data"]
+        if content["next_cursor"] is None:
+            break
+        params = {"limit": 2, "cursor": content["next_cursor"]}
+    ids = [uuid.UUID(button["id"]) for button in seen]
+    assert len(ids) == len(set(ids))
+    assert created <= set(ids)
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.json()["count"] == len(ids)
+
+    response = client.get(
+        url, headers=superuser_token_headers, params={"count": "estimated"}
+    )
+    assert isinstance(response.json()["count"], int)
+    response = client.get(
+        url, headers=superuser_token_headers, params={"count": "none"}
+    )
+    assert response.json()["count"] is None
+    response = client.get(
+        url, headers=superuser_token_headers, params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_buttons_filtered(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test filtering and sorting buttons, and paging through the results.
+    """
+    user = create_random_user(db)
+    marker = random_lower_string()
+    buttons = [
+        crud.create_button(
+            session=db,
+            button_in=ButtonCreate(
+                title=f"{prefix} {marker.upper()}", type=button_type
+            ),
+            created_by=user.id,
+        )
+        for prefix, button_type in [("b 100%", "PSA"), ("a", "ID"), ("c", "PSA")]
+    ]
+    for button, presses in zip(buttons, [2, 3, 1]):
+        for _ in range(presses):
+            crud.increment_button_usage(session=db, button_id=button.id, origin=None)
+    buttons[2].retired_at = datetime.now(timezone.utc)
+    db.add(buttons[2])
+    db.commit()
+
+    def titles(**params: str) -> list[str]:
+        response = client.get(
+            f"{settings.API_V1_STR}/buttons/",
+            headers=superuser_token_headers,
+            params={"title": marker, **params},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        return [button["title"].split()[0] for button in response.json()["data"]]
+
+    assert titles(sort="title") == ["a", "b", "c"]
+    assert titles(sort="-title") == ["c", "b", "a"]
+    assert titles(sort="-usage_count") == ["a", "b", "c"]
+    assert titles(sort="usage_count", type="PSA") == ["c", "b"]
+    assert titles(retired="true") == ["c"]
+    assert titles(retired="false", sort="-created_at") == ["a", "b"]
+    assert titles(created_by=str(user.id), sort="title") == ["a", "b", "c"]
+    assert titles(created_by=str(uuid.uuid4())) == []
+    # LIKE wildcards in the search are matched literally
+    assert titles(title=f"0% {marker}") == ["b"]
+    assert titles(title=f"1_0 {marker}") == []
+
+    # Pages in usage order, through ties on the count
+    params = {"title": marker, "sort": "-usage_count", "limit": "1"}
+    seen = []
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/buttons/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        content = response.json()
+        seen += [button["usage_count"] for button in content["data"]]
+        if content["next_cursor"] is None:
+            break
+        params["cursor"] = content["next_cursor"]
+    assert seen == [3, 2, 1]
+    with patch("app.api.routes.buttons.MAX_USAGE_SORT_BUTTONS", 2):
+        response = client.get(
+            f"{settings.API_V1_STR}/buttons/",
+            headers=superuser_token_headers,
+            params={"title": marker, "sort": "-usage_count"},
+        )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    # A cursor is only valid for the sort it was issued for
+    params["sort"] = "title"
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/",
+        headers=superuser_token_headers,
+        params=params,
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_read_buttons_summary(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that the usage summary covers every matching button, not only
+    the page.
+    """
+    user = create_random_user(db)
+    marker = random_lower_string()
+    buttons = [
+        crud.create_button(
+            session=db,
+            button_in=ButtonCreate(
+                title=f"{marker} {index}", type=button_type, duration=duration
+            ),
+            created_by=user.id,
+        )
+        for index, (button_type, duration) in enumerate(
+            [("PSA", 30), ("PSA", None), ("ID", 10)]
+        )
+    ]
+    for button, presses in zip(buttons, [2, 3, 4]):
+        for _ in range(presses):
+            crud.increment_button_usage(session=db, button_id=button.id, origin=None)
+    buttons[2].retired_at = datetime.now(timezone.utc)
+    db.add(buttons[2])
+    db.commit()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/",
+        headers=superuser_token_headers,
+        params={"title": marker, "summary": True, "limit": 1},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    content = response.json()
+    assert len(content["data"]) == 1
+    assert content["count"] == 3
+    assert content["summary"] == {
+        "total": {"buttons": 3, "presses": 9, "airtime": 100},
+        "by_type": {
+            "PSA": {"buttons": 2, "presses": 5, "airtime": 60},
+            "ID": {"buttons": 1, "presses": 4, "airtime": 40},
+        },
+        "active": {"buttons": 2, "presses": 5, "airtime": 60},
+        "retired": {"buttons": 1, "presses": 4, "airtime": 40},
+    }
+
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/",
+        headers=superuser_token_headers,
+        params={"title": random_lower_string(), "summary": True},
+    )
+    summary = response.json()["summary"]
+    assert summary["total"] == {"buttons": 0, "presses": 0, "airtime": 0}
+    assert summary["by_type"] == {}
+
+
+def test_read_retirements_pages(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test walking the pages of all retirement records by cursor.
+    """
+    for _ in range(3):
+        button = create_random_button(db)
+        response = client.put(
+            f"{settings.API_V1_STR}/buttons/{button.id}/retire",
+            headers=superuser_token_headers,
+            json={"retire": True},
+        )
+        assert response.status_code == status.HTTP_200_OK
+    url = f"{settings.API_V1_STR}/buttons/retirements/"
+    response = client.get(url, headers=superuser_token_headers)
+    total = response.json()["count"]
+    assert total >= 3
+
+    params: dict[str, str | int] = {"limit": 2, "count": "none"}
+    keys = []
+    while True:
+        response = client.get(url, headers=superuser_token_headers, params=params)
+        content = response.json()
+        keys += [
+            (datetime.fromisoformat(record["retired_at"]), record["id"])
+            for record in content["data"]
+        ]
+        if content["next_cursor"] is None:
+            break
+        params = {"limit": 2, "count": "none", "cursor": content["next_cursor"]}
+    assert len(keys) == total
+    assert keys == sorted(keys)
+
+
 def test_update_button(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -207,3 +438,870 @@ def test_delete_button_not_enough_permissions(
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     content = response.json()
     assert content["detail"] == "Insufficient permissions"
+
+
+def test_increment_button(client: TestClient, db: Session) -> None:
+    """
+    Test that pressing a button bumps its counter and logs the use,
+    without touching its `updated_at`.
+    """
+    button = create_random_button(db)
+    updated_at = button.updated_at
+    for expected in (1, 2):
+        response = client.get(f"{settings.API_V1_STR}/buttons/{button.id}/increment")
+        assert response.status_code == status.HTTP_200_OK
+        content = response.json()
+        assert content["id"] == str(button.id)
+        assert content["usage_count"] == expected
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert len(uses) == 2
+    db.refresh(button)
+    assert button.usage_count == 2
+    assert button.updated_at == updated_at
+
+
+def test_increment_button_not_found(client: TestClient) -> None:
+    """
+    Test pressing a button that does not exist.
+    """
+    response = client.get(f"{settings.API_V1_STR}/buttons/{uuid.uuid4()}/increment")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    content = response.json()
+    assert content["detail"] == "Button not found"
+
+
+def test_get_button_usage_series(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that usage is bucketed by local day, with empty days filled in,
+    both before and after the uses are folded into the rollups.
+    """
+    button = create_random_button(db)
+    # New York is UTC-4 in October
+    presses = [
+        ButtonPress(button_id=button.id, timestamp=timestamp)
+        for timestamp in [
+            datetime(2025, 10, 1, 3, 0, tzinfo=timezone.utc),  # Sep 30 in New York
+            datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc),
+            datetime(2025, 10, 1, 23, 30, tzinfo=timezone.utc),
+            datetime(2025, 10, 3, 15, 0, tzinfo=timezone.utc),
+            datetime(2025, 10, 5, 12, 0, tzinfo=timezone.utc),  # After the range
+        ]
+    ]
+    crud.record_button_presses(session=db, presses=presses)
+
+    for fold in [False, True]:
+        if fold:
+            crud.fold_usage_rollups(session=db)
+        response = client.get(
+            f"{settings.API_V1_STR}/buttons/{button.id}/usage/series",
+            headers=superuser_token_headers,
+            params={
+                "from": "2025-10-01T00:00:00",
+                "to": "2025-10-04T00:00:00",
+                "bucket": "day",
+                "tz": "America/New_York",
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        content = response.json()
+        assert content["button_id"] == str(button.id)
+        assert [
+            (datetime.fromisoformat(bucket["start"]), bucket["count"])
+            for bucket in content["data"]
+        ] == [
+            (datetime(2025, 10, 1, 4, tzinfo=timezone.utc), 2),
+            (datetime(2025, 10, 2, 4, tzinfo=timezone.utc), 0),
+            (datetime(2025, 10, 3, 4, tzinfo=timezone.utc), 1),
+        ]
+
+    other = create_random_button(db)
+    crud.record_button_presses(
+        session=db,
+        presses=[
+            ButtonPress(
+                button_id=other.id,
+                timestamp=datetime(2025, 10, 1, 12, 30, tzinfo=timezone.utc),
+            )
+        ],
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/usage/series",
+        headers=superuser_token_headers,
+        params={
+            "ids": [str(other.id), str(button.id)],
+            "from": "2025-10-01T12:00:00Z",
+            "to": "2025-10-01T14:00:00Z",
+            "bucket": "hour",
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    series = response.json()["data"]
+    assert [item["button_id"] for item in series] == [str(other.id), str(button.id)]
+    assert [[bucket["count"] for bucket in item["data"]] for item in series] == [
+        [1, 0],
+        [1, 0],
+    ]
+
+    for params in [
+        {"from": "2025-10-01T00:00:00", "tz": "Mars/Olympus_Mons"},
+        {"from": "2025-10-02T00:00:00", "to": "2025-10-01T00:00:00"},
+        {"from": "2000-01-01T00:00:00", "to": "2025-01-01T00:00:00", "bucket": "hour"},
+    ]:
+        response = client.get(
+            f"{settings.API_V1_STR}/buttons/{button.id}/usage/series",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/{uuid.uuid4()}/usage/series",
+        headers=superuser_token_headers,
+        params={"from": "2025-10-01T00:00:00"},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_export_button_uses(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+) -> None:
+    """
+    Test exporting the uses of a time range as CSV and as NDJSON.
+    """
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user is not None
+    own, other = [
+        crud.create_button(
+            session=db,
+            button_in=ButtonCreate(title=random_lower_string(), type=button_type),
+            created_by=created_by,
+        )
+        for button_type, created_by in [
+            ("PSA", user.id),
+            ("ID", create_random_user(db).id),
+        ]
+    ]
+    crud.record_button_presses(
+        session=db,
+        presses=[
+            ButtonPress(button_id=button.id, timestamp=timestamp, origin="studio-a")
+            for button, timestamp in [
+                (own, datetime(2004, 2, 1, 12, 0, tzinfo=timezone.utc)),
+                (own, datetime(2004, 2, 29, 23, 59, tzinfo=timezone.utc)),
+                (other, datetime(2004, 2, 15, 8, 30, tzinfo=timezone.utc)),
+                (own, datetime(2004, 3, 1, 0, 0, tzinfo=timezone.utc)),  # After
+            ]
+        ],
+    )
+    params = {"from": "2004-02-01T00:00:00Z", "to": "2004-03-01T00:00:00Z"}
+
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/uses/export",
+        headers=superuser_token_headers,
+        params={**params, "format": "csv"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == (
+        'attachment; filename="button-uses-20040201T000000Z-20040301T000000Z.csv"'
+    )
+    header, *lines = response.text.splitlines()
+    assert header == "id,button_id,title,type,timestamp,origin"
+    assert sorted(line.split(",", 1)[1] for line in lines) == sorted(
+        [
+            f"{own.id},{own.title},PSA,2004-02-01T12:00:00Z,studio-a",
+            f"{own.id},{own.title},PSA,2004-02-29T23:59:00Z,studio-a",
+            f"{other.id},{other.title},ID,2004-02-15T08:30:00Z,studio-a",
+        ]
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/uses/export",
+        headers=superuser_token_headers,
+        params={**params, "type": "ID"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    [line] = response.text.splitlines()
+    use = json.loads(line)
+    assert uuid.UUID(use.pop("id"))
+    assert use == {
+        "button_id": str(other.id),
+        "title": other.title,
+        "type": "ID",
+        "timestamp": "2004-02-15T08:30:00Z",
+        "origin": "studio-a",
+    }
+
+    # A user only exports the uses of their own Buttons
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/uses/export",
+        headers=normal_user_token_headers,
+        params=params,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert {json.loads(line)["button_id"] for line in response.text.splitlines()} == {
+        str(own.id)
+    }
+
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/uses/export",
+        headers=superuser_token_headers,
+        params={"from": params["to"], "to": params["from"]},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_increment_button_retired(client: TestClient, db: Session) -> None:
+    """
+    Test that pressing a retired button is rejected without logging a use.
+    """
+    button = create_random_button(db)
+    button.retired_at = "2023-01-01T00:00:00Z"
+    db.add(button)
+    db.commit()
+    response = client.get(f"{settings.API_V1_STR}/buttons/{button.id}/increment")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    content = response.json()
+    assert content["detail"] == "Button is retired and cannot be incremented"
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert not uses
+
+
+def test_increment_button_buffered(client: TestClient, db: Session) -> None:
+    """
+    Test pressing a button with the press buffer in both ack modes.
+    """
+    button = create_random_button(db)
+    with patch.object(settings, "PRESS_INGEST_MODE", "buffered"):
+        with patch.object(settings, "PRESS_BUFFER_ACK", "flush"):
+            response = client.get(
+                f"{settings.API_V1_STR}/buttons/{button.id}/increment"
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["usage_count"] == 1
+
+        with patch.object(settings, "PRESS_BUFFER_ACK", "enqueue"):
+            response = client.get(
+                f"{settings.API_V1_STR}/buttons/{button.id}/increment"
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["usage_count"] == 2
+
+            response = client.get(
+                f"{settings.API_V1_STR}/buttons/{uuid.uuid4()}/increment"
+            )
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+    close_press_buffer()
+
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert len(uses) == 2
+
+
+def test_increment_button_deduplicated(client: TestClient, db: Session) -> None:
+    """
+    Test that repeat presses within a button's de-duplication window are
+    not recorded, whether caught in memory or by the database.
+    """
+    button = create_random_button(db)
+    button.dedup_window_ms = 60_000
+    db.add(button)
+    db.commit()
+    url = f"{settings.API_V1_STR}/buttons/{button.id}/increment"
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 1
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 1
+
+    # As if the repeat landed on another worker
+    recent_presses.clear()
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 1
+
+    # From another client
+    with patch("app.api.routes.buttons.get_client_ip", return_value="10.0.0.2"):
+        response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 2
+
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert len(uses) == 2
+
+
+def test_increment_button_deduplicated_then_retired(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that a repeat press within the de-duplication window of a
+    Button retired meanwhile is refused, rather than answered with the
+    press remembered before.
+    """
+    button = create_random_button(db)
+    button.dedup_window_ms = 60_000
+    db.add(button)
+    db.commit()
+    url = f"{settings.API_V1_STR}/buttons/{button.id}"
+
+    response = client.get(f"{url}/increment")
+    assert response.status_code == status.HTTP_200_OK
+    response = client.put(
+        f"{url}/retire", headers=superuser_token_headers, json={"retire": True}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get(f"{url}/increment").status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_increment_button_state_cached(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that presses of missing and retired buttons are answered from
+    the button cache, and that retiring and unretiring invalidates it.
+    """
+    assert wait_for(lambda: button_states.listening)
+    missing_url = f"{settings.API_V1_STR}/buttons/{uuid.uuid4()}/increment"
+    button = create_random_button(db)
+    url = f"{settings.API_V1_STR}/buttons/{button.id}"
+    response = client.put(
+        f"{url}/retire", headers=superuser_token_headers, json={"retire": True}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    assert client.get(missing_url).status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"{url}/increment").status_code == status.HTTP_403_FORBIDDEN
+    with patch.object(crud, "increment_button_usage", side_effect=AssertionError):
+        assert client.get(missing_url).status_code == status.HTTP_404_NOT_FOUND
+        response = client.get(f"{url}/increment")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = client.put(
+        f"{url}/retire", headers=superuser_token_headers, json={"retire": False}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(f"{url}/increment")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 1
+
+
+def test_increment_button_press_token(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that presses through a signed press URL are recorded, that
+    forged tokens are refused without touching the database, and that
+    rotating the URL invalidates the previous one.
+    """
+    button = create_random_button(db)
+    url = f"{settings.API_V1_STR}/buttons/{button.id}"
+    response = client.get(f"{url}/press-url", headers=superuser_token_headers)
+    assert response.status_code == status.HTTP_200_OK
+    press_url = response.json()
+    assert press_url["version"] == 0
+    assert press_url["url"].endswith(f"{url}/increment?token={press_url['token']}")
+
+    response = client.get(press_url["url"])
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 1
+    with (
+        patch.object(crud, "get_press_key_version", side_effect=AssertionError),
+        patch.object(crud, "increment_button_usage", side_effect=AssertionError),
+    ):
+        response = client.get(f"{url}/increment", params={"token": "0.forged"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert response.json()["detail"] == "Invalid press token"
+        with patch.object(settings, "PRESS_TOKENS_REQUIRED", True):
+            response = client.get(f"{url}/increment")
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = client.post(f"{url}/press-url:rotate", headers=superuser_token_headers)
+    assert response.status_code == status.HTTP_200_OK
+    rotated = response.json()
+    assert rotated["version"] == 1
+    assert client.get(press_url["url"]).status_code == status.HTTP_403_FORBIDDEN
+    with patch.object(settings, "PRESS_TOKENS_REQUIRED", True):
+        assert client.get(rotated["url"]).status_code == status.HTTP_200_OK
+        response = client.post(
+            f"{settings.API_V1_STR}/buttons/increments:batch",
+            headers=superuser_token_headers,
+            json={
+                "presses": [
+                    {
+                        "button_id": str(button.id),
+                        "pressed_at": datetime.now(timezone.utc).isoformat(),
+                        "token": token,
+                    }
+                    for token in (rotated["token"], press_url["token"], None)
+                ]
+            },
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert [result["status"] for result in response.json()["data"]] == [
+        "recorded",
+        "invalid",
+        "invalid",
+    ]
+    db.refresh(button)
+    assert button.usage_count == 3
+
+
+def test_record_button_presses(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test replaying a batch of presses, with a result for each in the
+    order they were sent and their original timestamps kept.
+    """
+    button = create_random_button(db)
+    retired = create_random_button(db)
+    retired.retired_at = datetime.now(timezone.utc)
+    db.add(retired)
+    db.commit()
+    pressed_at = datetime.now(timezone.utc) - timedelta(hours=2)
+    presses = [
+        {"button_id": str(button.id), "pressed_at": pressed_at.isoformat()},
+        {
+            "button_id": str(button.id),
+            "pressed_at": (pressed_at + timedelta(minutes=1)).isoformat(),
+            "idempotency_key": "replay-1",
+        },
+        {
+            "button_id": str(button.id),
+            "pressed_at": (pressed_at + timedelta(minutes=1)).isoformat(),
+            "idempotency_key": "replay-1",
+        },
+        {"button_id": str(retired.id), "pressed_at": pressed_at.isoformat()},
+        {"button_id": str(uuid.uuid4()), "pressed_at": pressed_at.isoformat()},
+        {
+            "button_id": str(button.id),
+            "pressed_at": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat(),
+        },
+    ]
+    url = f"{settings.API_V1_STR}/buttons/increments:batch"
+    response = client.post(
+        url, headers=superuser_token_headers, json={"presses": presses}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    content = response.json()
+    assert [result["status"] for result in content["data"]] == [
+        "recorded",
+        "recorded",
+        "duplicate",
+        "retired",
+        "not_found",
+        "invalid",
+    ]
+    assert content["recorded"] == 2
+
+    # A retry of the whole batch only records the press without a key
+    response = client.post(
+        url, headers=superuser_token_headers, json={"presses": presses[:3]}
+    )
+    assert [result["status"] for result in response.json()["data"]] == [
+        "recorded",
+        "duplicate",
+        "duplicate",
+    ]
+
+    db.refresh(button)
+    assert button.usage_count == 3
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert sorted(use.timestamp.replace(tzinfo=timezone.utc) for use in uses) == [
+        pressed_at,
+        pressed_at,
+        pressed_at + timedelta(minutes=1),
+    ]
+
+
+def test_record_button_presses_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that replaying presses requires authentication, and that only
+    presses of the user's own Buttons are recorded.
+    """
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user is not None
+    own = crud.create_button(
+        session=db,
+        button_in=ButtonCreate(title=random_lower_string(), type="ID"),
+        created_by=user.id,
+    )
+    other = create_random_button(db)
+    pressed_at = datetime.now(timezone.utc).isoformat()
+    batch = {
+        "presses": [
+            {"button_id": str(button.id), "pressed_at": pressed_at}
+            for button in (own, other)
+        ]
+    }
+    url = f"{settings.API_V1_STR}/buttons/increments:batch"
+    response = client.post(url, json=batch)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = client.post(url, headers=normal_user_token_headers, json=batch)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"] == [
+        {"status": "recorded", "detail": None},
+        {"status": "invalid", "detail": "Insufficient permissions"},
+    ]
+    db.refresh(other)
+    assert other.usage_count == 0
+
+
+def test_record_button_presses_deduplicated(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that replayed presses of a button with a de-duplication window
+    are only dropped when within the window of the previous one.
+    """
+    button = create_random_button(db)
+    button.dedup_window_ms = 1000
+    db.add(button)
+    db.commit()
+    pressed_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    offsets = [0, 0.5, 5, 10, 10.2]
+    response = client.post(
+        f"{settings.API_V1_STR}/buttons/increments:batch",
+        headers=superuser_token_headers,
+        json={
+            "presses": [
+                {
+                    "button_id": str(button.id),
+                    "pressed_at": (pressed_at + timedelta(seconds=offset)).isoformat(),
+                    "origin": "deck",
+                }
+                for offset in offsets
+            ]
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [result["status"] for result in response.json()["data"]] == [
+        "recorded",
+        "duplicate",
+        "recorded",
+        "recorded",
+        "duplicate",
+    ]
+    db.refresh(button)
+    assert button.usage_count == 3
+
+
+def test_record_button_presses_backdated(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that replayed presses older than the last live press of a
+    button with a de-duplication window are only dropped when within
+    the window of a recorded press, and that a press dropped from a
+    batch doesn't extend the window, as with single presses.
+    """
+    button = create_random_button(db)
+    button.dedup_window_ms = 1000
+    db.add(button)
+    db.commit()
+    # Replayed presses default to the origin of live ones: the client
+    response = client.get(f"{settings.API_V1_STR}/buttons/{button.id}/increment")
+    assert response.status_code == status.HTTP_200_OK
+    pressed_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+    offsets = [0, 0.6, 1.2]
+    response = client.post(
+        f"{settings.API_V1_STR}/buttons/increments:batch",
+        headers=superuser_token_headers,
+        json={
+            "presses": [
+                {
+                    "button_id": str(button.id),
+                    "pressed_at": (pressed_at + timedelta(seconds=offset)).isoformat(),
+                }
+                for offset in offsets
+            ]
+        },
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [result["status"] for result in response.json()["data"]] == [
+        "recorded",
+        "duplicate",
+        "recorded",
+    ]
+
+    # Within the window of a press recorded by the first batch
+    response = client.post(
+        f"{settings.API_V1_STR}/buttons/increments:batch",
+        headers=superuser_token_headers,
+        json={
+            "presses": [
+                {
+                    "button_id": str(button.id),
+                    "pressed_at": (pressed_at + timedelta(seconds=1.9)).isoformat(),
+                }
+            ]
+        },
+    )
+    assert [result["status"] for result in response.json()["data"]] == [
+        "duplicate"
+    ]
+    db.refresh(button)
+    assert button.usage_count == 3
+
+
+def test_increment_button_idempotency_key(client: TestClient, db: Session) -> None:
+    """
+    Test that a retried press with the same idempotency key, given as a
+    query parameter or a header, returns the Button without recording
+    the press again.
+    """
+    button = create_random_button(db)
+    url = f"{settings.API_V1_STR}/buttons/{button.id}/increment"
+    key = str(uuid.uuid4())
+    for _ in range(2):
+        response = client.get(url, params={"idempotency_key": key})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["usage_count"] == 1
+    response = client.get(url, headers={"Idempotency-Key": key})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 1
+
+    # Answered from the database when another worker saw the key
+    with patch("app.api.routes.buttons.seen_press_keys", set()):
+        response = client.get(url, headers={"Idempotency-Key": key})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["usage_count"] == 1
+
+    response = client.get(url, headers={"Idempotency-Key": str(uuid.uuid4())})
+    assert response.json()["usage_count"] == 2
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert len(uses) == 2
+
+
+def test_increment_button_idempotency_key_reused(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that an idempotency key can't be reused for another Button, on
+    this worker or another one, nor within a batch, and that a retry of
+    a press of a Button since retired is refused.
+    """
+    button = create_random_button(db)
+    other = create_random_button(db)
+    url = f"{settings.API_V1_STR}/buttons/{button.id}"
+    key = str(uuid.uuid4())
+    response = client.get(f"{url}/increment", params={"idempotency_key": key})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get(
+        f"{settings.API_V1_STR}/buttons/{other.id}/increment",
+        params={"idempotency_key": key},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Idempotency key was used for another Button"
+    # Refused by the database when the key wasn't seen by this worker
+    with patch("app.api.routes.buttons.seen_press_keys", set()):
+        response = client.get(
+            f"{settings.API_V1_STR}/buttons/{other.id}/increment",
+            params={"idempotency_key": key},
+        )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Idempotency key was used for another Button"
+    # In a batch, whether claimed before or earlier in the batch
+    batch_key = str(uuid.uuid4())
+    pressed_at = datetime.now(timezone.utc).isoformat()
+    response = client.post(
+        f"{settings.API_V1_STR}/buttons/increments:batch",
+        headers=superuser_token_headers,
+        json={
+            "presses": [
+                {
+                    "button_id": str(button_id),
+                    "pressed_at": pressed_at,
+                    "idempotency_key": press_key,
+                }
+                for button_id, press_key in [
+                    (other.id, key),
+                    (button.id, batch_key),
+                    (other.id, batch_key),
+                ]
+            ]
+        },
+    )
+    assert [result["status"] for result in response.json()["data"]] == [
+        "invalid",
+        "recorded",
+        "invalid",
+    ]
+    db.refresh(other)
+    assert other.usage_count == 0
+
+    response = client.put(
+        f"{url}/retire", headers=superuser_token_headers, json={"retire": True}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(f"{url}/increment", params={"idempotency_key": key})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_database_modes(
+    client: TestClient, superuser_token_headers: dict[str, str], mode: str
+) -> None:
+    """
+    Test that Buttons can be created, pressed and read with either
+    database mode.
+    """
+    with patch.object(settings, "DATABASE_MODE", mode):
+        response = client.post(
+            f"{settings.API_V1_STR}/buttons/",
+            headers=superuser_token_headers,
+            json={"title": f"{mode} button", "type": "ID"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        button_id = response.json()["id"]
+        response = client.get(f"{settings.API_V1_STR}/buttons/{button_id}/increment")
+        assert response.json()["usage_count"] == 1
+        response = client.get(
+            f"{settings.API_V1_STR}/buttons/{button_id}",
+            headers=superuser_token_headers,
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["usage_count"] == 1
+
+
+def test_increment_button_journaled(
+    client: TestClient, db: Session, tmp_path: Path
+) -> None:
+    """
+    Test that presses the database can't take are journaled and
+    acknowledged with a 202, straight away once the circuit opens, and
+    recorded when the journal is replayed.
+    """
+    button = create_random_button(db)
+    url = f"{settings.API_V1_STR}/buttons/{button.id}/increment"
+    journal = PressJournal(
+        tmp_path,
+        segment_bytes=1024 * 1024,
+        fsync_interval=0.001,
+        replay_interval=3600,
+        circuit=PressCircuit(failures=2, reset=60),
+    )
+    unavailable = OperationalError("SELECT", {}, Exception("connection refused"))
+    try:
+        with (
+            patch("app.api.routes.buttons.get_press_journal", return_value=journal),
+            patch.object(
+                crud, "increment_button_usage", side_effect=unavailable
+            ) as increment,
+        ):
+            for _ in range(3):
+                response = client.get(url)
+                assert response.status_code == status.HTTP_202_ACCEPTED
+            assert increment.call_count == 2
+            assert journal.circuit.is_open
+        assert journal.replay() == 3
+    finally:
+        journal.close()
+
+    db.refresh(button)
+    assert button.usage_count == 3
+
+
+def test_increment_button_journaled_with_token(
+    client: TestClient, db: Session, tmp_path: Path
+) -> None:
+    """
+    Test that signed presses are journaled while the database is
+    unavailable, checked against their token's signature alone, rather
+    than failing to look up the Button's press key version.
+    """
+    button = create_random_button(db)
+    url = f"{settings.API_V1_STR}/buttons/{button.id}/increment"
+    token = create_press_token(button.id, button.press_key_version)
+    button_states.invalidate(button.id)
+    journal = PressJournal(
+        tmp_path,
+        segment_bytes=1024 * 1024,
+        fsync_interval=0.001,
+        replay_interval=3600,
+        circuit=PressCircuit(failures=2, reset=60),
+    )
+    unavailable = OperationalError("SELECT", {}, Exception("connection refused"))
+    try:
+        with (
+            patch("app.api.routes.buttons.get_press_journal", return_value=journal),
+            patch.object(
+                crud, "get_press_key_version", side_effect=unavailable
+            ) as get_version,
+            patch.object(crud, "increment_button_usage", side_effect=AssertionError),
+        ):
+            for _ in range(3):
+                response = client.get(url, params={"token": token})
+                assert response.status_code == status.HTTP_202_ACCEPTED
+            response = client.get(url, params={"token": "0.forged"})
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+            assert get_version.call_count == 2
+        assert journal.replay() == 3
+    finally:
+        journal.close()
+
+    db.refresh(button)
+    assert button.usage_count == 3
+
+
+def test_stream_button_events(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    """
+    Test that the events of a user's Buttons are streamed to them, and
+    the events of other users' Buttons aren't.
+    """
+    # The TestClient collects whole responses, so the endpoint is served
+    # over a socket, with the event listener started by `client`
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]})
+    thread.start()
+    try:
+        assert wait_for(lambda: server.started)
+        url = f"http://127.0.0.1:{sock.getsockname()[1]}{settings.API_V1_STR}"
+        buttons = []
+        for headers in (superuser_token_headers, normal_user_token_headers):
+            response = client.post(
+                f"{settings.API_V1_STR}/buttons/",
+                headers=headers,
+                json={"title": "Live", "type": "SFX"},
+            )
+            buttons.append(response.json()["id"])
+        with httpx.stream(
+            "GET", f"{url}/buttons/events", headers=normal_user_token_headers
+        ) as response:
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["content-type"].startswith("text/event-stream")
+            assert wait_for(lambda: button_events.subscribers() == 1)
+            for button_id, headers in zip(
+                buttons, (superuser_token_headers, normal_user_token_headers)
+            ):
+                client.put(
+                    f"{settings.API_V1_STR}/buttons/{button_id}",
+                    headers=headers,
+                    json={"title": "Renamed"},
+                )
+            lines = response.iter_lines()
+            assert next(lines).startswith("id: ")
+            assert next(lines) == "event: update"
+            event = json.loads(next(lines).removeprefix("data: "))
+            assert event["button_id"] == buttons[1]
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
@@ -2,16 +2,19 @@
 Tests for login and password recovery functionality.
 """
 
+from ipaddress import ip_network
 from unittest.mock import patch
 
+from app.api.deps import get_client_ip
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.login_throttle import login_throttle
+from app.core.security import PasswordHashingBusy, verify_password
 from app.crud import create_user
 from app.models import UserCreate
 from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 from app.utils import generate_password_reset_token
-from fastapi import status
+from fastapi import Request, status
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
@@ -43,6 +46,101 @@ def test_get_access_token_incorrect_password(client: TestClient) -> None:
     assert r.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
 
 
+def test_get_access_token_rehashes_password(client: TestClient, db: Session) -> None:
+    """
+    Test that a password hashed at another cost is rehashed on login.
+    """
+    email = random_email()
+    password = random_lower_string()
+    user = create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    with patch(
+        "app.core.security.pwd_context.verify_and_update",
+        lambda x, y: (x == y, f"rehashed {x}"),
+    ):
+        r = client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={"username": email, "password": password},
+        )
+    assert r.status_code == status.HTTP_200_OK
+    db.refresh(user)
+    assert user.hashed_password == f"rehashed {password}"
+
+
+def test_get_access_token_hashing_busy(client: TestClient) -> None:
+    """
+    Test that logins are turned away while the hashing pool is full.
+    """
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    with patch("app.core.security._run_hashing", side_effect=PasswordHashingBusy):
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_get_access_token_throttled(client: TestClient) -> None:
+    """
+    Test that failed logins to an account are throttled, but not
+    successful ones.
+    """
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    # Forget the failures of the tests before
+    login_throttle.clear()
+    with patch.object(settings, "LOGIN_THROTTLE_MAX_PER_ACCOUNT", 2):
+        try:
+            for _ in range(3):
+                r = client.post(
+                    f"{settings.API_V1_STR}/login/access-token", data=login_data
+                )
+                assert r.status_code == status.HTTP_200_OK
+            for _ in range(2):
+                r = client.post(
+                    f"{settings.API_V1_STR}/login/access-token",
+                    data={**login_data, "password": "incorrect"},
+                )
+            assert r.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+            r = client.post(
+                f"{settings.API_V1_STR}/login/access-token", data=login_data
+            )
+            assert r.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+            assert int(r.headers["Retry-After"]) >= 1
+        finally:
+            login_throttle.clear()
+
+
+def test_get_client_ip() -> None:
+    """
+    Test that `X-Forwarded-For` is only trusted from trusted proxies,
+    and only up to the first address that isn't one.
+    """
+
+    def client_ip(peer: str, forwarded: str | None = None) -> str:
+        headers = []
+        if forwarded is not None:
+            headers.append((b"x-forwarded-for", forwarded.encode()))
+        return get_client_ip(
+            Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+        )
+
+    assert client_ip("203.0.113.9", "198.51.100.1") == "203.0.113.9"
+    with patch.object(settings, "TRUSTED_PROXIES", [ip_network("10.0.0.0/8")]):
+        assert client_ip("203.0.113.9", "198.51.100.1") == "203.0.113.9"
+        assert client_ip("10.0.0.1") == "10.0.0.1"
+        assert client_ip("10.0.0.1", "198.51.100.1") == "198.51.100.1"
+        # Whatever the client sent comes before what the proxies added
+        assert client_ip("10.0.0.1", "192.0.2.1, 198.51.100.1, 10.0.0.2") == (
+            "198.51.100.1"
+        )
+        assert client_ip("10.0.0.1", "10.0.0.3, 10.0.0.2") == "10.0.0.3"
+
+
 def test_use_access_token(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -0,0 +1,70 @@
+"""
+Tests for the reports API endpoints.
+"""
+
+from datetime import datetime, timezone
+
+from app import crud
+from app.core.config import settings
+from app.models import ButtonCreate, ButtonPress
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+
+def test_read_psa_report(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+) -> None:
+    """
+    Test reading the PSA report of a month.
+    """
+    # The report of a closed month outlives the Buttons of earlier runs
+    db.exec(
+        text("DELETE FROM psareportsnapshot WHERE tz = :tz"),  # type: ignore[call-overload]
+        params={"tz": "UTC"},
+    )
+    db.commit()
+    button = crud.create_button(
+        session=db,
+        button_in=ButtonCreate(title=random_lower_string(), type="PSA"),
+        created_by=create_random_user(db).id,
+    )
+    crud.record_button_presses(
+        session=db,
+        presses=[
+            ButtonPress(
+                button_id=button.id,
+                timestamp=datetime(2002, 8, 20, 12, tzinfo=timezone.utc),
+            )
+        ],
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/reports/psa",
+        headers=superuser_token_headers,
+        params={"period": "month", "date": "2002-08-31"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    content = response.json()
+    assert content["closed"]
+    assert content["start"] == "2002-08-01T00:00:00Z"
+    assert content["end"] == "2002-09-01T00:00:00Z"
+    assert content["plays"] == 1
+    assert [play["button_id"] for play in content["log"]] == [str(button.id)]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/reports/psa",
+        headers=superuser_token_headers,
+        params={"tz": "Mars/Olympus_Mons"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = client.get(
+        f"{settings.API_V1_STR}/reports/psa", headers=normal_user_token_headers
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -9,6 +9,7 @@ import pytest
 from app import crud
 from app.core.config import settings
 from app.core.security import verify_password
+from app.core.user_cache import user_cache
 from app.models import User, UserCreate
 from app.tests.utils.user import create_random_user, user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
@@ -434,6 +435,43 @@ def test_update_user_as_superuser(
     assert user_db.full_name == "Updated_full_name"
 
 
+def test_update_user_invalidates_cache(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    """
+    Test that a user's changes apply to their next request, although
+    the user is cached.
+    """
+    email = random_email()
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    hits = user_cache.stats().hits
+    for _ in range(2):
+        r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+        assert r.json()["full_name"] is None
+    assert user_cache.stats().hits == hits + 1
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me", headers=headers, json={"full_name": "Me"}
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.json()["full_name"] == "Me"
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Inactive user"}
+
+
 def test_update_user_not_exists_as_superuser(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -0,0 +1,57 @@
+"""
+Tests for the cache of missing and retired Buttons.
+"""
+
+import uuid
+
+from app.core.button_cache import (
+    BUTTON_CHANGED_CHANNEL,
+    button_states,
+    start_button_cache,
+    stop_button_cache,
+)
+from app.core.db import engine
+from app.tests.utils.utils import wait_for
+from sqlalchemy import text
+
+
+def test_stale_state_is_not_cached() -> None:
+    """
+    Test that a state read before an invalidation is not cached.
+    """
+    start_button_cache()
+    try:
+        assert wait_for(lambda: button_states.listening)
+        button_id = uuid.uuid4()
+        generation = button_states.generation()
+        button_states.invalidate(button_id)
+        button_states.set(button_id, "retired", generation)
+        assert button_states.get(button_id) is None
+
+        button_states.set(button_id, "retired", button_states.generation())
+        assert button_states.get(button_id) == "retired"
+    finally:
+        stop_button_cache()
+    assert button_states.get(button_id) is None
+
+
+def test_notify_invalidates() -> None:
+    """
+    Test that a change notified by another connection (as if from
+    another worker) drops the Button from the cache.
+    """
+    start_button_cache()
+    try:
+        assert wait_for(lambda: button_states.listening)
+        button_id = uuid.uuid4()
+        button_states.set(button_id, "missing", button_states.generation())
+        assert button_states.get(button_id) == "missing"
+
+        with engine.begin() as connection:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :button_id)"),
+                {"channel": BUTTON_CHANGED_CHANNEL, "button_id": str(button_id)},
+            )
+        assert wait_for(lambda: button_states.get(button_id) is None)
+    finally:
+        stop_button_cache()
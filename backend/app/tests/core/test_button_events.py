@@ -0,0 +1,165 @@
+"""
+Tests for the live feed of Button events.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app import crud
+from app.core.button_events import (
+    RESYNC,
+    BufferedEvent,
+    ButtonEventHub,
+    button_events,
+    notify_button_event,
+    start_button_events,
+    stop_button_events,
+    stream_button_events,
+)
+from app.models import ButtonEvent, ButtonPress
+from app.tests.utils.button import create_random_button
+from app.tests.utils.utils import wait_for
+from sqlmodel import Session
+
+
+def buffered(event_id: str, button_id: str = "b", type: str = "t") -> BufferedEvent:
+    """
+    Return a buffered press event.
+    """
+    return BufferedEvent(event_id, "press", button_id, type, "u", "{}")
+
+
+def test_hub_fans_out_and_resumes() -> None:
+    """
+    Test that every subscriber gets each event, and that one resuming
+    gets the buffered events after the last it saw.
+    """
+
+    async def run() -> None:
+        hub = ButtonEventHub(buffer_size=4)
+        first, backlog = hub.subscribe()
+        second, _ = hub.subscribe()
+        assert backlog == []
+        for event_id in "abcd":
+            hub.publish(buffered(event_id))
+        await asyncio.sleep(0)
+        for subscription in (first, second):
+            events = [subscription.queue.get_nowait() for _ in "abcd"]
+            assert [event.id for event in events if event] == list("abcd")
+        hub.publish(buffered("e"))
+
+        _, backlog = hub.subscribe("c")
+        assert backlog is not None and [event.id for event in backlog] == ["d", "e"]
+        _, backlog = hub.subscribe("e")
+        assert backlog == []
+        # No longer buffered
+        _, backlog = hub.subscribe("a")
+        assert backlog is None
+
+        hub.unsubscribe(first)
+        assert hub.subscribers() == 4
+
+    asyncio.run(run())
+
+
+def test_hub_resyncs_slow_subscribers() -> None:
+    """
+    Test that a subscriber falling more than the buffer behind, and all
+    subscribers after a reset, are sent a resync.
+    """
+
+    async def run() -> None:
+        hub = ButtonEventHub(buffer_size=2)
+        slow, _ = hub.subscribe()
+        for event_id in "abc":
+            hub.publish(buffered(event_id))
+        await asyncio.sleep(0)
+        assert slow.queue.get_nowait() is RESYNC
+        assert slow.queue.empty()
+
+        hub.reset()
+        await asyncio.sleep(0)
+        assert slow.queue.get_nowait() is RESYNC
+        _, backlog = hub.subscribe("c")
+        assert backlog is None
+
+    asyncio.run(run())
+
+
+def test_idle_streams_are_kept_alive() -> None:
+    """
+    Test that a stream without events for a while is sent a keepalive
+    comment, and goes on streaming.
+    """
+
+    async def run() -> None:
+        stream = stream_button_events(button_ids={"b"})
+        try:
+            assert await anext(stream) == ": keepalive\n\n"
+            assert await anext(stream) == ": keepalive\n\n"
+        finally:
+            await stream.aclose()
+
+    with patch("app.core.button_events.KEEPALIVE_INTERVAL", 0.01):
+        asyncio.run(run())
+
+
+def test_presses_and_updates_are_streamed(db: Session) -> None:
+    """
+    Test that recorded presses and notified events reach a stream,
+    filtered on its Buttons, once committed.
+    """
+    button = create_random_button(db)
+    other = create_random_button(db)
+
+    def write() -> None:
+        crud.record_button_presses(
+            session=db,
+            presses=[
+                ButtonPress(button_id=other.id, origin="deck"),
+                ButtonPress(button_id=button.id, origin="deck"),
+                ButtonPress(button_id=button.id, origin="web"),
+            ],
+        )
+        notify_button_event(
+            db,
+            ButtonEvent(
+                event="retire",
+                button_id=button.id,
+                type=button.type,
+                created_by=button.created_by,
+                at=datetime.now(timezone.utc),
+            ),
+        )
+        db.commit()
+
+    async def run() -> list[str]:
+        stream = stream_button_events(button_ids={str(button.id)})
+        # The subscription is taken on the first step of the stream
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        await asyncio.to_thread(write)
+        frames = [await asyncio.wait_for(read, 5)]
+        frames.append(await asyncio.wait_for(anext(stream), 5))
+        await stream.aclose()
+        return frames
+
+    start_button_events()
+    try:
+        assert wait_for(lambda: button_events.listening)
+        press, retire = asyncio.run(run())
+    finally:
+        stop_button_events()
+    assert button_events.subscribers() == 0
+
+    lines = press.splitlines()
+    assert lines[1] == "event: press"
+    event = json.loads(lines[2].removeprefix("data: "))
+    assert lines[0] == f"id: {event['id']}"
+    assert event["button_id"] == str(button.id)
+    assert event["presses"] == 2
+    assert event["origin"] == "web"
+    assert event["usage_count"] == 2
+    assert retire.splitlines()[1] == "event: retire"
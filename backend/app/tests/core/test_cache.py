@@ -0,0 +1,61 @@
+"""
+Tests for the bounded in-process caches.
+"""
+
+import time
+
+from app.core.cache import BloomFilter, ExpiringBloomFilter, TTLCache
+
+
+def test_ttl_cache_expiry() -> None:
+    """
+    Test that entries are only returned until their TTL runs out.
+    """
+    cache: TTLCache[str, int] = TTLCache(max_entries=10)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2, ttl=60)
+    assert cache.get("short") == 1
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    cache.pop("long")
+    assert cache.get("long") is None
+
+
+def test_ttl_cache_is_bounded() -> None:
+    """
+    Test that the oldest entries are evicted once the cache is full.
+    """
+    cache: TTLCache[int, int] = TTLCache(max_entries=3)
+    for key in range(5):
+        cache.set(key, key, ttl=60)
+    assert len(cache) == 3
+    assert cache.get(0) is None
+    assert cache.get(1) is None
+    assert cache.get(4) == 4
+
+
+def test_bloom_filter() -> None:
+    """
+    Test that a Bloom filter finds every key added to it, and few that
+    weren't.
+    """
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for key in range(1000):
+        bloom.add(f"added-{key}")
+    assert all(f"added-{key}" in bloom for key in range(1000))
+    false_positives = sum(f"other-{key}" in bloom for key in range(10_000))
+    assert false_positives < 300
+
+
+def test_expiring_bloom_filter() -> None:
+    """
+    Test that keys are forgotten after two rotations of the filter.
+    """
+    bloom = ExpiringBloomFilter(capacity=100, ttl=0.05)
+    bloom.add("key")
+    assert "key" in bloom
+    time.sleep(0.06)
+    assert "key" in bloom
+    time.sleep(0.06)
+    assert "key" not in bloom
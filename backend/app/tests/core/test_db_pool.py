@@ -0,0 +1,83 @@
+"""
+Tests for the instrumented connection pools.
+"""
+
+import time
+
+import pytest
+from app.core.config import settings
+from app.core.db_pool import TimedQueuePool, checkout_timeout, pool_stats
+from sqlalchemy import exc, text
+from sqlalchemy.pool import NullPool
+from sqlmodel import create_engine
+
+
+class CountedPool(TimedQueuePool):
+    """
+    Pool with counters of its own, apart from those of app.core.db.
+    """
+
+
+def test_pool_counts_checkouts() -> None:
+    """
+    Test that checkouts, connections in use, timeouts, connects and
+    invalidations are counted, including across a recreated pool.
+    """
+    engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        poolclass=CountedPool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+    )
+    try:
+        with engine.connect() as first, engine.connect() as second:
+            first.execute(text("SELECT 1"))
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+            stats = pool_stats(engine.pool)
+            assert stats is not None
+            assert (stats.size, stats.max_overflow) == (1, 1)
+            assert (stats.checked_out, stats.overflow) == (2, 1)
+            second.invalidate()
+        engine.dispose()
+        with engine.connect():
+            pass
+        stats = pool_stats(engine.pool)
+        assert stats is not None
+        assert stats.checked_out == 0
+        assert stats.max_checked_out == 2
+        assert stats.checkouts == 3
+        assert stats.timeouts == 1
+        assert stats.connects == 3
+        assert stats.invalidations == 1
+        assert stats.max_wait_ms >= stats.mean_wait_ms > 0
+    finally:
+        engine.dispose()
+    unpooled = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), poolclass=NullPool)
+    assert pool_stats(unpooled.pool) is None
+
+
+def test_checkout_timeout() -> None:
+    """
+    Test that `checkout_timeout()` bounds the checkouts made within it,
+    and only those.
+    """
+    engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        poolclass=CountedPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=2,
+    )
+    try:
+        with engine.connect():
+            started = time.monotonic()
+            with checkout_timeout(0.1), pytest.raises(exc.TimeoutError):
+                engine.connect()
+            assert time.monotonic() - started < 1
+            stats = pool_stats(engine.pool)
+            assert stats is not None
+            assert stats.timeout_s == 2
+    finally:
+        engine.dispose()
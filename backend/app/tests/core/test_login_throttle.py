@@ -0,0 +1,140 @@
+"""
+Tests for the throttling of login attempts.
+"""
+
+import asyncio
+from typing import cast
+from unittest.mock import patch
+
+import pytest
+from app import crud
+from app.core.config import settings
+from app.core.db import AsyncSession, ThreadedSession
+from app.core.login_throttle import (
+    LoginThrottle,
+    LoginThrottled,
+    forgive_login,
+    login_limits,
+    over_limit,
+    throttle_key,
+    throttle_login,
+)
+from app.models import LoginAttempt
+from app.tests.utils.utils import random_email
+from sqlmodel import Session, delete
+
+
+def test_attempts_slide_over_windows() -> None:
+    """
+    Test that attempts are refused once a key reaches its limit, and
+    allowed again as the previous window's weight decays.
+    """
+    throttle = LoginThrottle(window=100, max_keys=10)
+    limits = {"account:a": 3, "ip:1": 10}
+    for now in (10, 20, 30):
+        assert throttle.attempt(limits, now) is None
+    # Three in the current window: allowed again once they are in the
+    # previous one and weigh less than three
+    assert throttle.attempt(limits, 40) == pytest.approx(60)
+    # Three in the previous window weigh 1.5 halfway through this one
+    assert throttle.attempt(limits, 150) is None
+    assert throttle.attempt(limits, 150) is None
+    wait = throttle.attempt(limits, 150)
+    assert wait is not None and wait > 0
+    # The other key isn't counted when an attempt is refused
+    assert throttle.attempt({"ip:1": 4}, 150) is None
+    assert throttle.attempt({"ip:1": 4}, 150) is not None
+
+
+def test_forgiven_attempts_dont_count() -> None:
+    """
+    Test that forgiven attempts are taken back.
+    """
+    throttle = LoginThrottle(window=100, max_keys=10)
+    for _ in range(5):
+        assert throttle.attempt({"account:a": 2}, 10) is None
+        throttle.forgive(["account:a"], 10)
+    assert throttle.attempt({"account:a": 2}, 10) is None
+
+
+def test_keys_are_bounded() -> None:
+    """
+    Test that the least recently attempted keys are forgotten first.
+    """
+    throttle = LoginThrottle(window=100, max_keys=2)
+    for key in ("ip:1", "ip:2", "ip:3"):
+        assert throttle.attempt({key: 1}, 10) is None
+    assert throttle.attempt({"ip:1": 1}, 10) is None
+    assert throttle.attempt({"ip:3": 1}, 10) is not None
+
+
+def test_over_limit() -> None:
+    """
+    Test the wait until every key of an attempt is below its limit.
+    """
+    assert over_limit([(3, 0, 2), (5, 4, 0)], elapsed=50, window=100) is None
+    # 4 * 0.5 + 1 reaches 3 until 4 * weight + 1 < 3, at weight 0.5
+    assert over_limit([(3, 4, 1)], elapsed=40, window=100) == pytest.approx(10)
+    assert over_limit([(3, 4, 1), (2, 0, 2)], elapsed=40, window=100) == (
+        pytest.approx(60)
+    )
+
+
+def test_shared_throttle(db: Session) -> None:
+    """
+    Test that attempts are counted in the database, across windows,
+    when the throttle is shared.
+    """
+    account = random_email()
+
+    session = cast(AsyncSession, ThreadedSession(db))
+
+    def attempt() -> list[str]:
+        return asyncio.run(
+            throttle_login(session, account=account, client_ip="10.0.0.1")
+        )
+
+    with (
+        patch.object(settings, "LOGIN_THROTTLE_SHARED", True),
+        patch.object(settings, "LOGIN_THROTTLE_MAX_PER_ACCOUNT", 2),
+        patch("app.core.login_throttle.time.time", return_value=1000.0),
+    ):
+        keys = attempt()
+        assert keys == list(login_limits(account, "10.0.0.1"))
+        asyncio.run(forgive_login(session, keys))
+        attempt()
+        attempt()
+        with pytest.raises(LoginThrottled) as exc:
+            attempt()
+    # Until this window is over
+    assert exc.value.retry_after == 200
+
+    account_key = throttle_key("account", account)
+    attempts = db.get(LoginAttempt, account_key)
+    assert attempts is not None
+    assert (attempts.window_index, attempts.previous, attempts.current) == (3, 0, 2)
+    # A window later, the counts move to the previous window
+    allowed, counts = crud.record_login_attempt(
+        session=db, limits={account_key: 2}, window_index=4, weight=0.25
+    )
+    assert allowed and counts == [(2, 2, 0)]
+    db.exec(delete(LoginAttempt))  # type: ignore[call-overload]
+    db.commit()
+
+
+def test_login_keys_bounded(db: Session) -> None:
+    """
+    Test that accounts and IPs are counted under keys of a fixed size,
+    however long the username sent.
+    """
+    account = "a" * 10_000
+    keys = list(login_limits(account, "10.0.0.1"))
+    assert keys == [throttle_key("account", account), throttle_key("ip", "10.0.0.1")]
+    assert max(len(key) for key in keys) < 50
+    session = cast(AsyncSession, ThreadedSession(db))
+    with patch.object(settings, "LOGIN_THROTTLE_SHARED", True):
+        assert asyncio.run(
+            throttle_login(session, account=account, client_ip="10.0.0.1")
+        ) == keys
+    db.exec(delete(LoginAttempt))  # type: ignore[call-overload]
+    db.commit()
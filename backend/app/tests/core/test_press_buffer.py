@@ -0,0 +1,66 @@
+"""
+Tests for the write-behind press buffer.
+"""
+
+import uuid
+
+from app.core.press_buffer import PressBuffer
+from app.models import ButtonPress, ButtonUse
+from app.tests.utils.button import create_random_button
+from sqlmodel import Session, func, select
+
+
+def test_flush_batches_presses(db: Session) -> None:
+    """
+    Test that queued presses are written as batches, with each Button's
+    counter bumped once per batch.
+    """
+    first = create_random_button(db)
+    second = create_random_button(db)
+    press_buffer = PressBuffer(flush_interval=0.05, max_batch=8)
+    futures = [
+        press_buffer.submit(ButtonPress(button_id=button.id, origin="test"))
+        for button in [first, second] * 5
+    ]
+    results = [future.result(timeout=5) for future in futures]
+    press_buffer.close()
+
+    assert all(recorded for _, recorded in results)
+    for button in (first, second):
+        db.refresh(button)
+        assert button.usage_count == 5
+        uses = db.exec(
+            select(func.count())  # pylint: disable=E1102
+            .select_from(ButtonUse)
+            .where(ButtonUse.button_id == button.id)
+        ).one()
+        assert uses == 5
+        assert press_buffer.pending(button.id) == 0
+
+    stats = press_buffer.stats()
+    assert stats.presses == 10
+    assert stats.max_batch_size <= 8
+    assert stats.batches >= 2
+    assert stats.failed_batches == 0
+
+
+def test_flush_rejects_retired_and_missing(db: Session) -> None:
+    """
+    Test that presses of retired or missing Buttons resolve without
+    being written.
+    """
+    button = create_random_button(db)
+    button.retired_at = "2023-01-01T00:00:00Z"
+    db.add(button)
+    db.commit()
+    press_buffer = PressBuffer(flush_interval=0.01, max_batch=10)
+    retired = press_buffer.submit(ButtonPress(button_id=button.id))
+    missing = press_buffer.submit(ButtonPress(button_id=uuid.uuid4()))
+    press_buffer.close()
+
+    retired_button, retired_recorded = retired.result(timeout=5)
+    assert retired_button is not None
+    assert not retired_recorded
+    assert missing.result(timeout=5) == (None, False)
+    db.refresh(button)
+    assert button.usage_count == 0
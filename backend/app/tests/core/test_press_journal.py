@@ -0,0 +1,142 @@
+"""
+Tests for the local press journal.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app import crud
+from app.core.press_journal import PressCircuit, PressJournal, decode, encode
+from app.models import ButtonPress, ButtonUse
+from app.tests.utils.button import create_random_button
+from sqlmodel import Session, select
+
+
+def make_journal(directory: Path) -> PressJournal:
+    """
+    Create a journal whose replayer is only run by hand.
+    """
+    return PressJournal(
+        directory,
+        segment_bytes=1024 * 1024,
+        fsync_interval=0.001,
+        replay_interval=3600,
+        circuit=PressCircuit(failures=5, reset=10),
+    )
+
+
+def test_append_and_replay(db: Session, tmp_path: Path) -> None:
+    """
+    Test that journaled presses are fsynced to a segment, then replayed
+    with their original timestamps and the segment deleted.
+    """
+    button = create_random_button(db)
+    pressed_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    presses = [
+        ButtonPress(
+            button_id=button.id, timestamp=pressed_at + timedelta(seconds=index)
+        )
+        for index in range(3)
+    ]
+    journal = make_journal(tmp_path)
+    try:
+        journal.append(presses).result(timeout=5)
+        [segment] = list(tmp_path.glob("*.journal"))
+        assert decode(segment.read_bytes()) == (presses, False)
+        assert journal.stats().segments == 1
+
+        assert journal.replay() == 3
+        assert not list(tmp_path.glob("*.journal"))
+        stats = journal.stats()
+        assert (stats.appended, stats.replayed, stats.corrupt) == (3, 3, 0)
+    finally:
+        journal.close()
+
+    db.refresh(button)
+    assert button.usage_count == 3
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    # buttonuse.timestamp is stored without a time zone, in UTC
+    assert sorted(use.timestamp for use in uses) == [
+        press.timestamp.replace(tzinfo=None) for press in presses
+    ]
+
+
+def test_replay_after_live_presses(db: Session, tmp_path: Path) -> None:
+    """
+    Test that journaled presses of a button with a de-duplication window
+    are recorded when replayed after live presses from the same origin.
+    """
+    button = create_random_button(db)
+    button.dedup_window_ms = 1000
+    db.add(button)
+    db.commit()
+    pressed_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    presses = [
+        ButtonPress(
+            button_id=button.id,
+            timestamp=pressed_at + timedelta(seconds=index * 10),
+            origin="deck",
+        )
+        for index in range(3)
+    ]
+    journal = make_journal(tmp_path)
+    try:
+        journal.append(presses).result(timeout=5)
+        _, recorded = crud.increment_button_usage(
+            session=db, button_id=button.id, origin="deck"
+        )
+        assert recorded
+        assert journal.replay() == 3
+    finally:
+        journal.close()
+
+    db.refresh(button)
+    assert button.usage_count == 4
+
+
+def test_crash_recovery(db: Session, tmp_path: Path) -> None:
+    """
+    Test that the segment of a worker that crashed mid-write is
+    replayed up to its torn record, and that replaying it again after a
+    crash during replay doesn't count presses twice.
+    """
+    button = create_random_button(db)
+    presses = [ButtonPress(button_id=button.id) for _ in range(4)]
+    for press in presses:
+        press.idempotency_key = f"journal:{press.id}"
+    records = b"".join(encode(press) for press in presses)
+    torn = encode(ButtonPress(button_id=button.id))[:-5]
+    (tmp_path / f"{time.time_ns():020d}-1.journal").write_bytes(records + torn)
+    # The same presses, as if a replay had crashed before deleting them
+    (tmp_path / f"{time.time_ns():020d}-2.journal").write_bytes(records)
+
+    journal = make_journal(tmp_path)
+    try:
+        assert journal.replay() == 8
+        assert journal.stats().corrupt == 1
+        assert not list(tmp_path.glob("*.journal"))
+    finally:
+        journal.close()
+
+    db.refresh(button)
+    assert button.usage_count == 4
+
+
+def test_circuit() -> None:
+    """
+    Test that the circuit opens after consecutive failures, lets a
+    single press through once reset, and closes when it succeeds.
+    """
+    circuit = PressCircuit(failures=2, reset=0.05)
+    circuit.failed()
+    assert circuit.allow()
+    circuit.failed()
+    assert circuit.is_open
+    assert not circuit.allow()
+    time.sleep(0.06)
+    assert circuit.allow()
+    assert not circuit.allow()
+    circuit.succeeded()
+    assert not circuit.is_open
+    assert circuit.allow()
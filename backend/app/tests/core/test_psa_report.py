@@ -0,0 +1,237 @@
+"""
+Tests for the PSA reports and their snapshots.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Any
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from app import crud
+from app.core.config import settings
+from app.core.psa_report import (
+    PsaReportExpired,
+    get_psa_report,
+    open_periods_start,
+    period_bounds,
+    store_closed_psa_reports,
+)
+from app.models import (
+    Button,
+    ButtonCreate,
+    ButtonPress,
+    ButtonRetirement,
+    PsaReport,
+    PsaRetirement,
+    PsaSourceTotals,
+)
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def test_period_bounds() -> None:
+    """
+    Test that periods start at local midnight on a Monday, or on the
+    first day of a month or quarter.
+    """
+    utc = ZoneInfo("UTC")
+    assert period_bounds("week", date(2026, 10, 17), utc) == (
+        datetime(2026, 10, 12, tzinfo=utc),
+        datetime(2026, 10, 19, tzinfo=utc),
+    )
+    assert period_bounds("month", date(2026, 12, 31), NEW_YORK) == (
+        datetime(2026, 12, 1, tzinfo=NEW_YORK),
+        datetime(2027, 1, 1, tzinfo=NEW_YORK),
+    )
+    assert period_bounds("quarter", date(2026, 11, 5), utc) == (
+        datetime(2026, 10, 1, tzinfo=utc),
+        datetime(2027, 1, 1, tzinfo=utc),
+    )
+    assert period_bounds("quarter", date(2026, 3, 31), utc) == (
+        datetime(2026, 1, 1, tzinfo=utc),
+        datetime(2026, 4, 1, tzinfo=utc),
+    )
+
+
+def create_button(db: Session, button_type: str, **fields: Any) -> Button:
+    """
+    Create a Button that has existed since 2002.
+    """
+    button = crud.create_button(
+        session=db,
+        button_in=ButtonCreate(title=random_lower_string(), type=button_type, **fields),
+        created_by=create_random_user(db).id,
+    )
+    button.created_at = datetime(2002, 1, 1, tzinfo=timezone.utc)
+    db.add(button)
+    db.commit()
+    return button
+
+
+def test_psa_report(db: Session) -> None:
+    """
+    Test that a report lists the plays of the PSA Buttons in the local
+    period, with their totals and retirements, and that the report of a
+    closed period is stored once and returned as stored from then on.
+    """
+    db.exec(
+        text("DELETE FROM psareportsnapshot WHERE tz = :tz"),  # type: ignore[call-overload]
+        params={"tz": "America/New_York"},
+    )
+    db.commit()
+    played = create_button(db, "PSA", source="Ad Council", duration=30)
+    unplayed = create_button(db, "PSA")
+    other = create_button(db, "SFX")
+    db.add_all(
+        [
+            ButtonRetirement(
+                button_id=unplayed.id,
+                created_by=unplayed.created_by,
+                retired_at=datetime(2002, 3, 15, tzinfo=timezone.utc),
+                unretired_at=datetime(2002, 4, 10, tzinfo=timezone.utc),
+            ),
+            # Before the quarter
+            ButtonRetirement(
+                button_id=unplayed.id,
+                created_by=unplayed.created_by,
+                retired_at=datetime(2002, 1, 15, tzinfo=timezone.utc),
+                unretired_at=datetime(2002, 2, 10, tzinfo=timezone.utc),
+            ),
+        ]
+    )
+    db.commit()
+    crud.record_button_presses(
+        session=db,
+        presses=[
+            ButtonPress(button_id=button.id, timestamp=timestamp, origin="studio-a")
+            for button, timestamp in [
+                # March 31 in New York
+                (played, datetime(2002, 4, 1, 3, tzinfo=timezone.utc)),
+                (played, datetime(2002, 5, 10, 12, tzinfo=timezone.utc)),
+                (other, datetime(2002, 5, 10, 12, tzinfo=timezone.utc)),
+            ]
+        ],
+    )
+
+    def report(now: datetime) -> dict[str, Any]:
+        return PsaReport.model_validate_json(
+            get_psa_report(
+                session=db,
+                period="quarter",
+                day=date(2002, 5, 1),
+                tz="America/New_York",
+                now=now,
+            )
+        ).model_dump()
+
+    # The quarter ends on July 1 at 04:00 UTC, and closes a day later
+    content = report(datetime(2002, 7, 1, 12, tzinfo=timezone.utc))
+    assert not content["closed"]
+    assert content["start"] == datetime(2002, 4, 1, tzinfo=NEW_YORK)
+    assert content["end"] == datetime(2002, 7, 1, tzinfo=NEW_YORK)
+    assert (content["plays"], content["airtime"]) == (1, 30)
+    assert [
+        (play["timestamp"], play["button_id"], play["origin"])
+        for play in content["log"]
+    ] == [(datetime(2002, 5, 10, 12, tzinfo=timezone.utc), played.id, "studio-a")]
+    buttons = {button["button_id"]: button for button in content["buttons"]}
+    assert buttons.keys() == {played.id, unplayed.id}
+    assert buttons[played.id]["plays"] == 1
+    assert buttons[played.id]["airtime"] == 30
+    assert buttons[played.id]["retirements"] == []
+    assert buttons[unplayed.id]["plays"] == 0
+    assert buttons[unplayed.id]["retirements"] == [
+        PsaRetirement(
+            retired_at=datetime(2002, 3, 15, tzinfo=timezone.utc),
+            unretired_at=datetime(2002, 4, 10, tzinfo=timezone.utc),
+        ).model_dump()
+    ]
+    assert content["sources"] == [
+        PsaSourceTotals(
+            source="Ad Council", buttons=1, plays=1, airtime=30
+        ).model_dump(),
+        PsaSourceTotals(source=None, buttons=1, plays=0, airtime=0).model_dump(),
+    ]
+
+    closed = report(datetime(2002, 7, 2, 4, tzinfo=timezone.utc))
+    assert closed["closed"]
+    assert closed["plays"] == 1
+    # A press replayed after the quarter closed isn't counted
+    crud.record_button_presses(
+        session=db,
+        presses=[
+            ButtonPress(
+                button_id=played.id, timestamp=datetime(2002, 6, 1, tzinfo=timezone.utc)
+            )
+        ],
+    )
+    assert report(datetime(2003, 1, 1, tzinfo=timezone.utc)) == closed
+    assert report(datetime(2002, 7, 1, 12, tzinfo=timezone.utc))["plays"] == 2
+
+    with pytest.raises(DBAPIError, match="immutable"):
+        db.exec(text("UPDATE psareportsnapshot SET report = '{}'"))  # type: ignore[call-overload]
+    db.rollback()
+    db.exec(
+        text("DELETE FROM psareportsnapshot WHERE tz = :tz"),  # type: ignore[call-overload]
+        params={"tz": "America/New_York"},
+    )
+    db.commit()
+
+
+def test_open_periods_start() -> None:
+    """
+    Test that the periods still open start with the oldest one that
+    ended less than a day ago, or with the current week.
+    """
+    with patch.object(settings, "PSA_REPORT_TZ", "UTC"):
+        assert open_periods_start(
+            datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+        ) == datetime(2026, 7, 1)
+        assert open_periods_start(
+            datetime(2026, 10, 2, 12, tzinfo=timezone.utc)
+        ) == datetime(2026, 9, 28)
+
+
+def test_store_closed_psa_reports(db: Session) -> None:
+    """
+    Test that the reports of closed periods are stored back to the
+    oldest period whose uses are all retained, and that a closed period
+    starting before them gets no report.
+    """
+
+    def delete_snapshots() -> None:
+        db.exec(
+            text("DELETE FROM psareportsnapshot WHERE tz = :tz"),  # type: ignore[call-overload]
+            params={"tz": "Europe/Paris"},
+        )
+        db.commit()
+
+    delete_snapshots()
+    now = datetime(2002, 10, 3, tzinfo=timezone.utc)
+    with (
+        patch.object(settings, "PSA_REPORT_TZ", "Europe/Paris"),
+        patch.object(settings, "BUTTON_USE_RETENTION_MONTHS", 1),
+        patch("app.crud.get_uses_retained_from", return_value=datetime(2002, 5, 1)),
+    ):
+        stored = store_closed_psa_reports(session=db, now=now)
+        assert "quarter from 2002-07-01" in stored
+        assert "quarter from 2002-04-01" not in stored
+        assert "month from 2002-05-01" in stored
+        assert "week from 2002-09-23" in stored
+        assert "week from 2002-04-29" not in stored
+        assert store_closed_psa_reports(session=db, now=now) == []
+        with pytest.raises(PsaReportExpired):
+            get_psa_report(
+                session=db,
+                period="quarter",
+                day=date(2002, 5, 1),
+                tz="Europe/Paris",
+                now=now,
+            )
+    delete_snapshots()
@@ -0,0 +1,84 @@
+"""
+Tests for the password hashing pool and press tokens.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from app.core.security import (
+    PasswordHashingBusy,
+    PasswordHashPool,
+    create_press_token,
+    get_password_hash,
+    read_press_token,
+    verify_and_update_password,
+)
+
+
+def test_hash_pool() -> None:
+    """
+    Test that passwords are hashed and verified in the pool, and that
+    calls beyond its limit are refused at once.
+    """
+
+    async def run() -> None:
+        pool = PasswordHashPool(processes=1, queue=1)
+        try:
+            # Hashed in another process, out of reach of the test patches
+            hashed = await pool.run(get_password_hash, "secret")
+            assert hashed.startswith("$2b$")
+            assert await pool.run(verify_and_update_password, "secret", hashed) == (
+                True,
+                None,
+            )
+
+            calls = [pool.run(get_password_hash, "secret") for _ in range(3)]
+            results = await asyncio.gather(*calls, return_exceptions=True)
+            assert [type(result) for result in results] == [
+                str,
+                str,
+                PasswordHashingBusy,
+            ]
+        finally:
+            pool.close()
+
+    asyncio.run(run())
+
+
+def test_hash_pool_failure() -> None:
+    """
+    Test that errors in the pool are raised to the caller.
+    """
+
+    async def run() -> None:
+        pool = PasswordHashPool(processes=1, queue=0)
+        try:
+            with pytest.raises(ValueError):
+                await pool.run(verify_and_update_password, "secret", "not a hash")
+        finally:
+            pool.close()
+
+    asyncio.run(run())
+
+
+def test_press_tokens() -> None:
+    """
+    Test that a press token only reads back for its Button.
+    """
+    button_id = uuid.uuid4()
+    token = create_press_token(button_id, 3)
+    assert token.startswith("3.")
+    assert read_press_token(button_id, token) == 3
+    assert read_press_token(uuid.uuid4(), token) is None
+    mac = token.partition(".")[2]
+    for forged in (
+        f"4.{mac}",
+        f"3.{mac[:-1]}",
+        "3",
+        "",
+        f"-3.{mac}",
+        f"³.{mac}",
+        "3.é",
+    ):
+        assert read_press_token(button_id, forged) is None
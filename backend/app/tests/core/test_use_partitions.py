@@ -0,0 +1,90 @@
+"""
+Tests for the monthly partitions of buttonuse and their retention.
+"""
+
+from datetime import datetime, timezone
+
+from app import crud
+from app.core.use_partitions import retention_cutoff
+from app.core.usage_rollup import check_usage_rollups, rebuild_usage_rollups
+from app.models import ButtonPress, ButtonUse, ButtonUseHourly
+from app.tests.utils.button import create_random_button
+from sqlalchemy import text
+from sqlmodel import Session, col, select
+
+
+def partition_of(db: Session, use_id: object) -> str:
+    """
+    Return the name of the partition a use is stored in.
+    """
+    return str(
+        db.exec(
+            text("SELECT tableoid::regclass FROM buttonuse WHERE id = :id"),  # type: ignore[call-overload]
+            params={"id": use_id},
+        ).scalar_one()
+    )
+
+
+def test_retention_cutoff() -> None:
+    """
+    Test that the cutoff is the start of the month `months` before the
+    current one.
+    """
+    assert retention_cutoff(datetime(2026, 1, 31, 23, tzinfo=timezone.utc), 1) == (
+        datetime(2025, 12, 1)
+    )
+    assert retention_cutoff(datetime(2026, 10, 17, tzinfo=timezone.utc), 12) == (
+        datetime(2025, 10, 1)
+    )
+
+
+def test_create_and_drop_partitions(db: Session) -> None:
+    """
+    Test that uses land in the partition of their month, or in the
+    default one until it exists, that dropping old partitions keeps
+    their rollups, and that the cascade from `button` reaches every
+    partition.
+    """
+    rebuild_usage_rollups()
+    button = create_random_button(db)
+    presses = [
+        ButtonPress(
+            button_id=button.id, timestamp=datetime(2001, 1, 15, tzinfo=timezone.utc)
+        ),
+        ButtonPress(
+            button_id=button.id, timestamp=datetime(2001, 2, 15, tzinfo=timezone.utc)
+        ),
+    ]
+    crud.record_button_presses(session=db, presses=presses)
+    crud.fold_usage_rollups(session=db)
+    assert partition_of(db, presses[0].id) == "buttonuse_default"
+
+    created = crud.create_use_partitions(
+        session=db, start=datetime(2001, 1, 15, tzinfo=timezone.utc), months=2
+    )
+    assert created == ["buttonuse_p200101", "buttonuse_p200102"]
+    assert [partition_of(db, press.id) for press in presses] == created
+    assert not crud.create_use_partitions(
+        session=db, start=datetime(2001, 1, 1), months=2
+    )
+
+    assert crud.drop_use_partitions(session=db, before=datetime(2001, 2, 1)) == [
+        "buttonuse_p200101"
+    ]
+    uses = db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert [use.id for use in uses] == [presses[1].id]
+    hourly = db.exec(
+        select(ButtonUseHourly)
+        .where(ButtonUseHourly.button_id == button.id)
+        .order_by(col(ButtonUseHourly.bucket_start))
+    ).all()
+    assert [row.bucket_start.month for row in hourly] == [1, 2]
+    # January is out of the retained range
+    assert check_usage_rollups() == []
+
+    db.delete(button)
+    db.commit()
+    assert not db.exec(select(ButtonUse).where(ButtonUse.button_id == button.id)).all()
+    assert crud.drop_use_partitions(session=db, before=datetime(2001, 3, 1)) == [
+        "buttonuse_p200102"
+    ]
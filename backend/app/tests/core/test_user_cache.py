@@ -0,0 +1,81 @@
+"""
+Tests for the cache of authenticated users.
+"""
+
+import time
+import uuid
+
+from app.core.db import engine
+from app.core.user_cache import (
+    USER_CHANGED_CHANNEL,
+    start_user_cache,
+    stop_user_cache,
+    user_cache,
+)
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import wait_for
+from sqlalchemy import text
+from sqlmodel import Session
+
+
+def test_stale_user_is_not_cached(db: Session) -> None:
+    """
+    Test that a user read before an invalidation is not cached, and that
+    a cached user is a copy.
+    """
+    user = create_random_user(db)
+    start_user_cache()
+    try:
+        assert wait_for(lambda: user_cache.listening)
+        generation = user_cache.generation()
+        user_cache.invalidate(user.id)
+        user_cache.set_user(user, generation)
+        assert user_cache.get_user(user.id) is None
+
+        user_cache.set_user(user, user_cache.generation())
+        cached = user_cache.get_user(user.id)
+        assert cached is not None and cached is not user
+        assert cached.email == user.email
+    finally:
+        stop_user_cache()
+    assert user_cache.get_user(user.id) is None
+
+
+def test_tokens_expire() -> None:
+    """
+    Test that a token is cached no longer than it is valid.
+    """
+    start_user_cache()
+    try:
+        assert wait_for(lambda: user_cache.listening)
+        user_id = uuid.uuid4()
+        now = time.time()
+        user_cache.set_token("expired", user_id, now - 1)
+        assert user_cache.get_token("expired") is None
+        user_cache.set_token("expiring", user_id, now + 0.05)
+        assert user_cache.get_token("expiring") is user_id
+        assert wait_for(lambda: user_cache.get_token("expiring") is None, timeout=1)
+    finally:
+        stop_user_cache()
+
+
+def test_notify_invalidates(db: Session) -> None:
+    """
+    Test that a change notified by another connection (as if from
+    another worker) drops the user from the cache.
+    """
+    user = create_random_user(db)
+    start_user_cache()
+    try:
+        assert wait_for(lambda: user_cache.listening)
+        user_cache.set_user(user, user_cache.generation())
+        assert user_cache.get_user(user.id) is not None
+
+        with engine.begin() as connection:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :user_id)"),
+                {"channel": USER_CHANGED_CHANNEL, "user_id": str(user.id)},
+            )
+        assert wait_for(lambda: user_cache.get_user(user.id) is None)
+    finally:
+        stop_user_cache()
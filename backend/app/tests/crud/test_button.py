@@ -0,0 +1,217 @@
+"""
+Tests for CRUD operations on Button model.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app import crud
+from app.core.usage_rollup import check_usage_rollups, rebuild_usage_rollups
+from app.models import (
+    ButtonCounter,
+    ButtonPress,
+    ButtonPressDedup,
+    ButtonPressKey,
+    ButtonUseDaily,
+    ButtonUseDelta,
+    ButtonUseHourly,
+)
+from app.tests.utils.button import create_random_button
+from sqlmodel import Session, col, select
+
+
+def test_striped_counter(db: Session) -> None:
+    """
+    Test that presses of a striped Button spread over its slots, and
+    that its usage count is the sum of them.
+    """
+    button = create_random_button(db)
+    button.counter_slots = 4
+    db.add(button)
+    db.commit()
+    for expected in range(1, 41):
+        pressed, recorded = crud.increment_button_usage(
+            session=db, button_id=button.id, origin="test"
+        )
+        assert recorded
+        assert pressed is not None
+        assert pressed.usage_count == expected
+
+    slots = db.exec(
+        select(ButtonCounter).where(ButtonCounter.button_id == button.id)
+    ).all()
+    assert 1 < len(slots) <= 4
+    assert {slot.slot for slot in slots} <= set(range(4))
+    db.refresh(button)
+    assert button.usage_count == 40
+
+
+def test_batch_bumps_one_slot(db: Session) -> None:
+    """
+    Test that a batch of presses of a striped Button bumps a single
+    slot by the size of the batch.
+    """
+    button = create_random_button(db)
+    button.counter_slots = 8
+    db.add(button)
+    db.commit()
+    presses = [ButtonPress(button_id=button.id, origin="test") for _ in range(5)]
+    results = crud.record_button_presses(session=db, presses=presses)
+    assert results[button.id][0].usage_count == 5
+
+    slots = db.exec(
+        select(ButtonCounter).where(ButtonCounter.button_id == button.id)
+    ).all()
+    assert [slot.usage_count for slot in slots] == [5]
+
+
+def test_fold_button_counters(db: Session) -> None:
+    """
+    Test that folding moves every slot's count into the first slot.
+    """
+    button = create_random_button(db)
+    for slot in range(3):
+        db.add(ButtonCounter(button_id=button.id, slot=slot, usage_count=slot + 1))
+    db.commit()
+
+    assert crud.fold_button_counters(session=db) >= 1
+    db.expire_all()
+    slots = db.exec(
+        select(ButtonCounter).where(ButtonCounter.button_id == button.id)
+    ).all()
+    assert [(slot.slot, slot.usage_count) for slot in slots] == [(0, 6)]
+    db.refresh(button)
+    assert button.usage_count == 6
+
+
+def test_delete_expired_press_keys(db: Session) -> None:
+    """
+    Test that only expired idempotency keys are deleted, in chunks.
+    """
+    button = create_random_button(db)
+    now = datetime.now(timezone.utc)
+    for index, expires_at in enumerate(
+        [now - timedelta(hours=1)] * 3 + [now + timedelta(hours=1)]
+    ):
+        db.add(
+            ButtonPressKey(
+                key=f"{button.id}-{index}",
+                button_id=button.id,
+                press_id=uuid.uuid4(),
+                expires_at=expires_at,
+            )
+        )
+    db.commit()
+
+    assert crud.delete_expired_press_keys(session=db, chunk_size=2) >= 3
+    keys = db.exec(
+        select(ButtonPressKey).where(ButtonPressKey.button_id == button.id)
+    ).all()
+    assert [key.key for key in keys] == [f"{button.id}-3"]
+    assert crud.get_press_key(session=db, key=f"{button.id}-3") is not None
+
+
+def test_delete_expired_press_dedups(db: Session) -> None:
+    """
+    Test that only expired de-duplication windows are deleted.
+    """
+    button = create_random_button(db)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for index, expires_at in enumerate(
+        [now - timedelta(hours=1)] * 3 + [now + timedelta(hours=1)]
+    ):
+        db.add(
+            ButtonPressDedup(
+                button_id=button.id,
+                origin=f"origin-{index}",
+                press_id=uuid.uuid4(),
+                pressed_at=expires_at - timedelta(seconds=1),
+                expires_at=expires_at,
+            )
+        )
+    db.commit()
+
+    assert crud.delete_expired_press_dedups(session=db, chunk_size=2) >= 3
+    windows = db.exec(
+        select(ButtonPressDedup).where(ButtonPressDedup.button_id == button.id)
+    ).all()
+    assert [window.origin for window in windows] == ["origin-3"]
+
+
+def test_fold_usage_rollups(db: Session) -> None:
+    """
+    Test that presses append usage deltas, and that folding moves them
+    into the hourly and daily rollups, adding to what is there.
+    """
+    button = create_random_button(db)
+    day = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    timestamps = [day + timedelta(hours=1), day + timedelta(hours=1, minutes=30)]
+    for timestamp in timestamps + [day + timedelta(hours=5)]:
+        crud.record_button_presses(
+            session=db, presses=[ButtonPress(button_id=button.id, timestamp=timestamp)]
+        )
+    deltas = db.exec(
+        select(ButtonUseDelta).where(ButtonUseDelta.button_id == button.id)
+    ).all()
+    assert len(deltas) == 3
+
+    crud.fold_usage_rollups(session=db)
+    crud.record_button_presses(
+        session=db,
+        presses=[ButtonPress(button_id=button.id, timestamp=timestamps[0])],
+    )
+    crud.fold_usage_rollups(session=db)
+
+    assert not db.exec(
+        select(ButtonUseDelta).where(ButtonUseDelta.button_id == button.id)
+    ).all()
+    hourly = db.exec(
+        select(ButtonUseHourly)
+        .where(ButtonUseHourly.button_id == button.id)
+        .order_by(col(ButtonUseHourly.bucket_start))
+    ).all()
+    assert [(row.bucket_start.hour, row.count) for row in hourly] == [(1, 3), (5, 1)]
+    daily = db.exec(
+        select(ButtonUseDaily).where(ButtonUseDaily.button_id == button.id)
+    ).all()
+    assert [(row.bucket_start, row.count) for row in daily] == [
+        (day.replace(tzinfo=None), 4)
+    ]
+
+
+def test_rebuild_and_check_usage_rollups(db: Session) -> None:
+    """
+    Test that the checker reports rollups that drifted from the raw
+    uses, and that a rebuild brings them back in line.
+    """
+    rebuild_usage_rollups()
+    button = create_random_button(db)
+    crud.record_button_presses(
+        session=db,
+        presses=[
+            ButtonPress(
+                button_id=button.id,
+                timestamp=datetime(2025, 10, 1, 9, 15, tzinfo=timezone.utc),
+            )
+            for _ in range(2)
+        ],
+    )
+    assert check_usage_rollups() == []
+
+    crud.fold_usage_rollups(session=db)
+    hourly = db.exec(
+        select(ButtonUseHourly).where(ButtonUseHourly.button_id == button.id)
+    ).one()
+    hourly.count = 5
+    db.add(hourly)
+    db.commit()
+    mismatches = check_usage_rollups()
+    assert [
+        (mismatch.rollup, mismatch.button_id, mismatch.count, mismatch.raw_count)
+        for mismatch in mismatches
+    ] == [("hourly", button.id, 5, 2)]
+
+    rebuild_usage_rollups()
+    assert check_usage_rollups() == []
+    db.refresh(hourly)
+    assert hourly.count == 2
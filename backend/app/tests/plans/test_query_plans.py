@@ -0,0 +1,423 @@
+"""
+Query-plan regression tests for the Button routes.
+
+Every statement the routes in `app/api/routes/buttons.py` send to the
+database is captured and `EXPLAIN`ed against a `buttonuse` table seeded
+with `QUERY_PLAN_SEED_USES` rows: 200k by default, to keep the suite
+quick; set it to 5000000 to check the plans against a production-sized
+table when changing a statement or an index. A test
+fails if a plan scans `buttonuse` sequentially, or filters any other
+table with a sequential scan, since either means a missing or unusable
+index.
+
+The seeded users and Buttons are deleted afterwards, and their uses,
+retirements and rollups with them, leaving those of the other tests
+alone.
+"""
+
+import os
+import uuid
+from collections.abc import Callable, Generator, Iterator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from app import crud
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.core.usage_rollup import rebuild_usage_rollups
+from app.models import Button
+from app.tests.utils.user import user_authentication_headers
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlmodel import Session, delete
+
+SEED_USES = int(os.environ.get("QUERY_PLAN_SEED_USES", 200_000))
+SEED_BUTTONS = 10_000
+SEED_USERS = 100
+SEED_PASSWORD = "seeded-password"
+SEED_EMAIL_DOMAIN = "query-plans.example.com"
+
+Statement = tuple[str, Any]
+
+
+@pytest.fixture(scope="module")
+def seeded(db: Session) -> Generator[list[uuid.UUID], None, None]:
+    """
+    Seed users, Buttons, retirements and `SEED_USES` uses (one per
+    second up to now, in monthly partitions) with their rollups, refresh
+    the planner statistics, and return the seeded Button IDs.
+    """
+    now = datetime.now(timezone.utc)
+    oldest = now - timedelta(seconds=SEED_USES)
+    crud.create_use_partitions(
+        session=db,
+        start=oldest,
+        months=(now.year - oldest.year) * 12 + now.month - oldest.month + 1,
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO "user" (id, email, is_active, is_superuser, hashed_password)
+            SELECT gen_random_uuid(), 'seed' || i || '@' || :domain, true, false,
+                   :password
+            FROM generate_series(1, :users) AS i
+            """
+        ),
+        {"domain": SEED_EMAIL_DOMAIN, "password": SEED_PASSWORD, "users": SEED_USERS},
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO button (id, title, type, created_by)
+            SELECT gen_random_uuid(), 'seeded ' || i, 'PSA', u.id
+            FROM generate_series(1, :buttons) AS i
+            JOIN (
+                SELECT id, row_number() OVER () AS n FROM "user"
+                WHERE email LIKE '%@' || :domain
+            ) AS u ON u.n = 1 + i % :users
+            """
+        ),
+        {"buttons": SEED_BUTTONS, "domain": SEED_EMAIL_DOMAIN, "users": SEED_USERS},
+    )
+    button_ids = list(
+        db.execute(text("SELECT id FROM button WHERE title LIKE 'seeded %'")).scalars()
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO buttonretirement (id, button_id, created_by, retired_at,
+                                          unretired_at)
+            SELECT gen_random_uuid(), id, created_by, now() - interval '2 days',
+                   now() - interval '1 day'
+            FROM button WHERE title LIKE 'seeded %'
+            """
+        )
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO buttonuse (id, button_id, timestamp, origin)
+            SELECT gen_random_uuid(), b.id, now() - i * interval '1 second', 'seed'
+            FROM generate_series(1, :uses) AS i
+            JOIN (
+                SELECT id, row_number() OVER () AS n FROM button
+                WHERE title LIKE 'seeded %'
+            ) AS b ON b.n = 1 + i % :buttons
+            """
+        ),
+        {"uses": SEED_USES, "buttons": SEED_BUTTONS},
+    )
+    db.execute(
+        text(
+            """
+            INSERT INTO buttoncounter (button_id, slot, usage_count)
+            SELECT button_id, 0, count(*) FROM buttonuse WHERE origin = 'seed'
+            GROUP BY button_id
+            """
+        )
+    )
+    db.commit()
+    rebuild_usage_rollups()
+    # A press of each Button since the last fold of the rollups
+    db.execute(
+        text(
+            """
+            WITH pressed AS (
+                INSERT INTO buttonuse (id, button_id, timestamp, origin)
+                SELECT gen_random_uuid(), id, now() AT TIME ZONE 'UTC', 'seed'
+                FROM button WHERE title LIKE 'seeded %'
+                RETURNING button_id, timestamp
+            )
+            INSERT INTO buttonusedelta (button_id, bucket_start, count)
+            SELECT button_id, date_trunc('hour', timestamp), 1 FROM pressed
+            """
+        )
+    )
+    db.commit()
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(
+            text(
+                "VACUUM ANALYZE button, buttoncounter, buttonuse, buttonretirement, "
+                'buttonusehourly, buttonusedaily, buttonusedelta, "user"'
+            )
+        )
+
+    yield button_ids
+
+    # Cascades to their uses, retirements, counters and rollups
+    db.exec(delete(Button).where(Button.title.like("seeded %")))  # type: ignore
+    db.execute(
+        text("""DELETE FROM "user" WHERE email LIKE '%@' || :domain"""),
+        {"domain": SEED_EMAIL_DOMAIN},
+    )
+    db.commit()
+
+
+@pytest.fixture(scope="module")
+def owner_headers(client: TestClient, db: Session) -> dict[str, str]:
+    """
+    Authentication headers for the user who created the first seeded
+    Button.
+    """
+    email = db.execute(
+        text("""SELECT email FROM "user" WHERE email LIKE '%@' || :domain LIMIT 1"""),
+        {"domain": SEED_EMAIL_DOMAIN},
+    ).scalar_one()
+    return user_authentication_headers(
+        client=client, email=email, password=SEED_PASSWORD
+    )
+
+
+def capture(call: Callable[[], Any]) -> list[Statement]:
+    """
+    Run `call` and return every statement it sent to the database.
+    """
+    statements: list[Statement] = []
+
+    def record(  # pylint: disable=too-many-arguments, unused-argument
+        conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any
+    ) -> None:
+        statements.append((statement, parameters))
+
+    engines = [engine, async_engine.sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", record)
+    return statements
+
+
+def scans(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """
+    Walk a JSON plan and yield every node in it.
+    """
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+def assert_index_driven(statements: list[Statement]) -> None:
+    """
+    EXPLAIN every captured statement that touches a Button table, and
+    fail on a sequential scan of `buttonuse` (or of any of its monthly
+    partitions holding more than a page of uses) or a filtered
+    sequential scan of anything else.
+    """
+    checked = 0
+    with engine.connect() as connection:
+        # The partitions of buttonuse, and those holding at most a page
+        # of uses (the months ahead, and the default partition), which
+        # the planner rightly reads whole
+        partitions: dict[str, bool] = dict(
+            connection.execute(  # type: ignore[arg-type]
+                text(
+                    """
+                    SELECT inhrelid::regclass::text, pg_relation_size(inhrelid) <= 8192
+                    FROM pg_inherits
+                    WHERE inhparent = 'buttonuse'::regclass
+                    """
+                )
+            ).all()
+        )
+        for statement, parameters in statements:
+            if "button" not in statement:
+                continue
+            checked += 1
+            if isinstance(parameters, list | tuple):
+                # executemany(), e.g. an ORM bulk delete: one plan fits all
+                parameters = parameters[0]
+            plan = connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            ).scalar_one()[0]["Plan"]
+            for node in scans(plan):
+                if node["Node Type"] != "Seq Scan":
+                    continue
+                relation = node["Relation Name"]
+                if partitions.get(relation):
+                    continue
+                assert (
+                    relation != "buttonuse"
+                    and relation not in partitions
+                    and "Filter" not in node
+                ), f"Sequential scan on {relation}:\n{statement}\n{plan}"
+        connection.rollback()
+    assert checked, "No Button statements were captured"
+
+
+def test_read_button_plans(
+    client: TestClient, seeded: list[uuid.UUID], owner_headers: dict[str, str]
+) -> None:
+    """
+    Test that reading Buttons and listing them is index-driven.
+    """
+    button_id = seeded[0]
+    assert_index_driven(
+        capture(
+            lambda: [
+                client.get(
+                    f"{settings.API_V1_STR}/buttons/{button_id}",
+                    headers=owner_headers,
+                ),
+                client.get(f"{settings.API_V1_STR}/buttons/", headers=owner_headers),
+            ]
+        )
+    )
+
+
+def test_usage_plans(
+    client: TestClient,
+    seeded: list[uuid.UUID],
+    superuser_token_headers: dict[str, str],
+) -> None:
+    """
+    Test that the usage count, recent uses and usage series of Buttons
+    are read through the `(button_id, timestamp DESC)` index.
+    """
+    button_id = seeded[0]
+    series = {"from": "2025-01-01T00:00:00Z", "bucket": "week", "tz": "Europe/Paris"}
+    assert_index_driven(
+        capture(
+            lambda: [
+                client.get(
+                    f"{settings.API_V1_STR}/buttons/{button_id}/usage",
+                    headers=superuser_token_headers,
+                ),
+                client.get(
+                    f"{settings.API_V1_STR}/buttons/{button_id}/usage/series",
+                    headers=superuser_token_headers,
+                    params=series,
+                ),
+                client.get(
+                    f"{settings.API_V1_STR}/buttons/usage/series",
+                    headers=superuser_token_headers,
+                    params={**series, "ids": [str(id) for id in seeded[:20]]},
+                ),
+            ]
+        )
+    )
+
+
+def test_export_plans(
+    client: TestClient,
+    seeded: list[uuid.UUID],
+    superuser_token_headers: dict[str, str],
+) -> None:
+    """
+    Test that an export of the last few minutes of uses reads only
+    those, through the BRIN index on `timestamp`.
+    """
+    end = datetime.now(timezone.utc)
+    assert_index_driven(
+        capture(
+            lambda: client.get(
+                f"{settings.API_V1_STR}/buttons/uses/export",
+                headers=superuser_token_headers,
+                params={
+                    "from": (end - timedelta(minutes=10)).isoformat(),
+                    "to": end.isoformat(),
+                    "format": "csv",
+                },
+            )
+        )
+    )
+
+
+def test_increment_plans(
+    client: TestClient,
+    seeded: list[uuid.UUID],
+    superuser_token_headers: dict[str, str],
+) -> None:
+    """
+    Test that recording a press, or a small batch of them, is
+    index-driven, including for Buttons that don't exist. (Large enough
+    batches are rightly planned as a hash join over all Buttons.)
+    """
+    button_id = seeded[0]
+    batch = {
+        "presses": [
+            {
+                "button_id": str(seeded[index]),
+                "pressed_at": "2025-03-31T12:34:56Z",
+                "idempotency_key": f"plan-{index}",
+            }
+            for index in range(5)
+        ]
+    }
+    assert_index_driven(
+        capture(
+            lambda: [
+                client.get(f"{settings.API_V1_STR}/buttons/{button_id}/increment"),
+                client.get(f"{settings.API_V1_STR}/buttons/{uuid.uuid4()}/increment"),
+                client.post(
+                    f"{settings.API_V1_STR}/buttons/increments:batch",
+                    headers=superuser_token_headers,
+                    json=batch,
+                ),
+            ]
+        )
+    )
+
+
+def test_retirement_plans(
+    client: TestClient,
+    seeded: list[uuid.UUID],
+    superuser_token_headers: dict[str, str],
+    owner_headers: dict[str, str],
+) -> None:
+    """
+    Test that retiring, unretiring and listing retirements is
+    index-driven.
+    """
+    button_id = seeded[1]
+    url = f"{settings.API_V1_STR}/buttons/{button_id}"
+    assert_index_driven(
+        capture(
+            lambda: [
+                client.put(
+                    f"{url}/retire",
+                    headers=superuser_token_headers,
+                    json={"retire": True},
+                ),
+                client.put(
+                    f"{url}/retire",
+                    headers=superuser_token_headers,
+                    json={"retire": False},
+                ),
+                client.get(f"{url}/retirements", headers=superuser_token_headers),
+                client.get(
+                    f"{settings.API_V1_STR}/buttons/retirements/",
+                    headers=owner_headers,
+                ),
+            ]
+        )
+    )
+
+
+def test_delete_plans(
+    client: TestClient,
+    seeded: list[uuid.UUID],
+    superuser_token_headers: dict[str, str],
+) -> None:
+    """
+    Test that deleting a Button with usage history, and the cascade to
+    its uses, is index-driven.
+    """
+    button_id = seeded[2]
+    statements = capture(
+        lambda: client.delete(
+            f"{settings.API_V1_STR}/buttons/{button_id}?force=true",
+            headers=superuser_token_headers,
+        )
+    )
+    # The cascade runs inside Postgres, so EXPLAIN its query explicitly
+    statements.append(
+        (
+            "DELETE FROM ONLY buttonuse WHERE button_id = %(button_id)s",
+            {"button_id": button_id},
+        )
+    )
+    assert_index_driven(statements)
@@ -4,7 +4,8 @@ General utilities for testing
 
 import random
 import string
-from collections.abc import Generator
+import time
+from collections.abc import Callable, Generator
 from contextlib import ExitStack, contextmanager
 from unittest.mock import patch
 
@@ -26,6 +27,19 @@ def random_email() -> str:
     return f"{random_lower_string()}@{random_lower_string()}.com"
 
 
+def wait_for(condition: Callable[[], bool], timeout: float = 5) -> bool:
+    """
+    Poll `condition` until it holds or `timeout` seconds have passed, and
+    return whether it held.
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
 def get_superuser_token_headers(client: TestClient) -> dict[str, str]:
     """
     Return authentication headers for the superuser.
@@ -52,4 +66,12 @@ def patch_password_hashing(*modules: str) -> Generator[None, None, None]:
                 patch(f"{module}.pwd_context.verify", lambda x, y: x == y)
             )
             stack.enter_context(patch(f"{module}.pwd_context.hash", lambda x: x))
+            stack.enter_context(
+                patch(
+                    f"{module}.pwd_context.verify_and_update",
+                    lambda x, y: (x == y, None),
+                )
+            )
+        # The patches wouldn't reach the hashing processes
+        stack.enter_context(patch.object(settings, "PASSWORD_HASH_PROCESSES", 0))
         yield
@@ -0,0 +1,57 @@
+"""
+Script to rebuild or check the hourly and daily usage rollups.
+
+Usage (from `backend/`):
+
+    python -m app.usage_rollups rebuild
+    python -m app.usage_rollups check
+
+`check` exits with status 1 if any bucket doesn't match the raw uses.
+"""
+
+import argparse
+import logging
+import sys
+
+from app.core.usage_rollup import check_usage_rollups, rebuild_usage_rollups
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def check() -> bool:
+    """
+    Log the buckets of the rollups that don't match the raw uses.
+    Returns whether they all match.
+    """
+    mismatches = check_usage_rollups()
+    for mismatch in mismatches:
+        logger.error(
+            "%s rollup of Button %s at %s: %d uses, %d raw uses",
+            mismatch.rollup,
+            mismatch.button_id,
+            mismatch.bucket_start.isoformat(),
+            mismatch.count,
+            mismatch.raw_count,
+        )
+    logger.info("%d mismatched buckets", len(mismatches))
+    return not mismatches
+
+
+def main() -> None:
+    """
+    Entry point of the script.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        logger.info("Rebuilding the usage rollups")
+        rebuild_usage_rollups()
+        logger.info("Usage rollups rebuilt")
+    elif not check():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
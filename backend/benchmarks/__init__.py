@@ -0,0 +1,4 @@
+"""
+Benchmarks for the hot paths of the backend. These talk to the database
+configured in `.env`, so run them against a scratch database only.
+"""
@@ -0,0 +1,177 @@
+"""
+Query plans of the Button listing for every combination of its filters
+and sorts.
+
+Seeds `--buttons` Buttons spread over `--owners` users (a share of them
+retired, and all of them pressed a random number of times), then runs
+the statement `GET /buttons/` builds for each combination of filters,
+under each sort, for the first page and for the page after its cursor.
+Each is run with `EXPLAIN ANALYZE`, and reported with its execution time
+and whether any step scans the whole `button` table. The seeded rows are
+deleted afterwards.
+
+The title search is only served by an index where the pg_trgm extension
+is available.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.button_filters --buttons 100000 --limit 100
+"""
+
+import argparse
+import itertools
+import uuid
+from typing import Any, get_args
+
+from app.api.routes.buttons import ButtonSort, button_filters, button_page
+from app.core.pagination import encode_cursor
+from app.models import User
+from sqlalchemy import Connection, text
+from sqlmodel import Session
+
+from benchmarks.common import bench_engine
+
+TITLE_WORDS = ["hug", "breath", "water", "stretch", "smile", "walk", "call", "read"]
+
+SEED_OWNERS = text(
+    """
+    INSERT INTO "user" (id, email, is_active, is_superuser, hashed_password)
+    SELECT gen_random_uuid(), 'bench-' || n || '@bench.example.com', true, false, ''
+    FROM generate_series(1, :owners) AS n
+    RETURNING id
+    """
+)
+
+SEED_BUTTONS = text(
+    """
+    INSERT INTO button (id, title, type, created_by, created_at, updated_at, retired_at)
+    SELECT
+        gen_random_uuid(),
+        initcap(words[1 + n % cardinality(words)]) || ' ' || md5(n::text),
+        (ARRAY['PSA', 'ID', 'SFX'])[1 + n % 3],
+        owner_ids[1 + n % cardinality(owner_ids)],
+        now() - n * interval '1 minute',
+        now(),
+        CASE WHEN n % 20 = 0 THEN now() END
+    FROM
+        generate_series(1, :buttons) AS n,
+        CAST(:words AS text[]) AS words,
+        CAST(:owner_ids AS uuid[]) AS owner_ids
+    """
+)
+
+SEED_COUNTERS = text(
+    """
+    INSERT INTO buttoncounter (button_id, slot, usage_count)
+    SELECT id, 0, (random() * 1000)::int
+    FROM button
+    WHERE created_by = ANY(:owner_ids)
+    """
+)
+
+
+def scans_button(plan: dict[str, Any]) -> bool:
+    """
+    Whether a plan node, or any below it, reads all of `button`.
+    """
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == "button":
+        return True
+    return any(scans_button(child) for child in plan.get("Plans", []))
+
+
+def explain(connection: Connection, statement: Any) -> tuple[float, int, bool]:
+    """
+    Run a statement under `EXPLAIN ANALYZE`. Returns its execution time
+    in milliseconds, the rows it returned and whether it scanned
+    `button`.
+    """
+    compiled = statement.compile(dialect=connection.dialect)
+    [result] = connection.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}", compiled.params
+    ).scalar_one()
+    plan = result["Plan"]
+    return result["Execution Time"], plan["Actual Rows"], scans_button(plan)
+
+
+def plan_pages(
+    session: Session, criteria: list[Any], sort: ButtonSort, limit: int
+) -> list[tuple[str, float, int, bool]]:
+    """
+    Explain the first page of Buttons matching `criteria` in `sort`
+    order, and the page after it if there is one.
+    """
+    first = button_page(criteria, sort=sort, cursor=None)
+    pages = [("page 1", first)]
+    last = session.exec(first.offset(limit - 1).limit(1)).first()
+    if last is not None:
+        cursor = encode_cursor(sort, getattr(last, sort.lstrip("-")), last.id)
+        pages.append(("page 2", button_page(criteria, sort=sort, cursor=cursor)))
+    return [
+        (name, *explain(session.connection(), page.limit(limit)))
+        for name, page in pages
+    ]
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buttons", type=int, default=100_000)
+    parser.add_argument("--owners", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=100, help="Buttons per page")
+    args = parser.parse_args()
+
+    engine = bench_engine(1)
+    with engine.begin() as connection:
+        owner_ids = [row.id for row in connection.execute(SEED_OWNERS, vars(args))]
+    try:
+        with engine.begin() as connection:
+            params = {"owner_ids": owner_ids, "words": TITLE_WORDS}
+            connection.execute(SEED_BUTTONS, {**params, "buttons": args.buttons})
+            connection.execute(SEED_COUNTERS, params)
+            connection.execute(text("ANALYZE button"))
+            connection.execute(text("ANALYZE buttoncounter"))
+
+        # The search matches an eighth of the titles, the owner a
+        # hundredth of the Buttons, and the retired a twentieth
+        filters: dict[str, Any] = {
+            "type": "SFX",
+            "retired": True,
+            "created_by": owner_ids[0],
+            "title": TITLE_WORDS[0],
+        }
+        superuser = User(id=uuid.uuid4(), email="bench@example.com", is_superuser=True)
+        scanned = 0
+        with Session(engine) as session:
+            for size in range(len(filters) + 1):
+                for names in itertools.combinations(filters, size):
+                    criteria = button_filters(
+                        current_user=superuser,
+                        **{name: filters[name] for name in names},
+                    )
+                    for sort in get_args(ButtonSort):
+                        for page, elapsed, rows, scan in plan_pages(
+                            session, criteria, sort, args.limit
+                        ):
+                            scanned += scan
+                            label = f"{' '.join(names) or '-'} / {sort} / {page}"
+                            print(
+                                f"{label:<48} {elapsed:8.2f}ms {rows:4d} rows  "
+                                f"{'SEQ SCAN' if scan else 'index'}"
+                            )
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                text("DELETE FROM button WHERE created_by = ANY(:owner_ids)"),
+                {"owner_ids": owner_ids},
+            )
+            connection.execute(
+                text('DELETE FROM "user" WHERE id = ANY(:owner_ids)'),
+                {"owner_ids": owner_ids},
+            )
+    print(f"{scanned} plan(s) scanned the whole button table")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+
+import statistics
+import threading
+import time
+from collections.abc import Callable
+
+from app.core.config import settings
+from sqlalchemy import Engine
+from sqlmodel import create_engine
+
+
+def bench_engine(pool_size: int) -> Engine:
+    """
+    Create an engine whose pool is large enough that workers never wait
+    on a connection checkout, so only database time is measured.
+    """
+    return create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), pool_size=pool_size, max_overflow=0
+    )
+
+
+def run_concurrently(
+    task: Callable[[], None], workers: int, iterations: int
+) -> tuple[list[float], float]:
+    """
+    Run `task` `iterations` times on each of `workers` threads, all
+    released at once. Returns per-call latencies (in seconds) and the
+    total wall-clock time.
+    """
+    latencies: list[float] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers + 1)
+
+    def worker() -> None:
+        local: list[float] = []
+        barrier.wait()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            task()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def summarize(label: str, latencies: list[float], elapsed: float) -> str:
+    """
+    Format p50/p99 latency and throughput for a benchmark run.
+    """
+    cuts = statistics.quantiles(latencies, n=100)
+    return (
+        f"{label:<28} p50={cuts[49] * 1000:7.2f}ms  p99={cuts[98] * 1000:7.2f}ms  "
+        f"{len(latencies) / elapsed:8.0f} ops/s"
+    )
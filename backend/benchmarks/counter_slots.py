@@ -0,0 +1,72 @@
+"""
+Press throughput of a single hot Button against its number of counter
+slots.
+
+Every worker presses the same Button through `crud.increment_button_usage`
+(one transaction per press), with the Button's `counter_slots` set to
+each value of `--slots` in turn. With one slot, presses queue on the
+Button's single counter row; with more, they spread over that many rows.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.counter_slots --workers 50 --presses 40 --slots 1 2 4 8 16
+"""
+
+import argparse
+
+from app import crud
+from app.models import Button, ButtonCreate, ButtonUse, User
+from sqlmodel import Session, delete, select
+
+from benchmarks.common import bench_engine, run_concurrently, summarize
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--presses", type=int, default=40, help="per worker")
+    parser.add_argument("--slots", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    engine = bench_engine(args.workers)
+    with Session(engine) as session:
+        owner = session.exec(select(User)).first()
+        assert owner, "Run app/initial_data.py first"
+        button = crud.create_button(
+            session=session,
+            button_in=ButtonCreate(title="bench", type="ID"),
+            created_by=owner.id,
+        )
+        button_id = button.id
+
+    def press() -> None:
+        with Session(engine) as session:
+            crud.increment_button_usage(
+                session=session, button_id=button_id, origin="bench"
+            )
+
+    try:
+        for slots in args.slots:
+            with Session(engine) as session:
+                button = session.get_one(Button, button_id)
+                button.counter_slots = slots
+                session.add(button)
+                session.commit()
+            latencies, elapsed = run_concurrently(press, args.workers, args.presses)
+            print(summarize(f"{slots} slot(s)", latencies, elapsed))
+        with Session(engine) as session:
+            button = session.get_one(Button, button_id)
+            expected = args.workers * args.presses * len(args.slots)
+            assert button.usage_count == expected, (button.usage_count, expected)
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(ButtonUse).where(ButtonUse.button_id == button_id))  # type: ignore
+            session.exec(delete(Button).where(Button.id == button_id))  # type: ignore
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Throughput and memory of one API worker under many concurrent
+connections, with `DATABASE_MODE` set to each of `--modes` in turn.
+
+For every mode, a single uvicorn worker is started on `--port`, and
+`--connections` clients keep requests in flight against it for
+`--duration` seconds: reading a Button (`GET /buttons/{id}`, which also
+loads the current user) and pressing it (`GET /buttons/{id}/increment`).
+The worker's peak resident memory is sampled from `/proc` (Linux only).
+
+The load is generated from this process, so on a small machine the
+client may saturate before the server; compare modes, not absolute
+numbers.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.database_mode --connections 500 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def rss_kib(pid: int) -> int:
+    """
+    Resident memory of a process, in KiB.
+    """
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+    return 0
+
+
+async def wait_until_up(client: httpx.AsyncClient) -> None:
+    """
+    Wait for the server to answer its health check.
+    """
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if (await client.get(f"{API}/utils/health-check/")).is_success:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("Server didn't start")
+        await asyncio.sleep(0.2)
+
+
+async def load(
+    client: httpx.AsyncClient, path: str, connections: int, duration: float, pid: int
+) -> tuple[list[float], int, float, int]:
+    """
+    Keep `connections` requests to `path` in flight for `duration`
+    seconds. Returns latencies, the number of errors, the elapsed time
+    and the worker's peak memory in KiB.
+    """
+    latencies: list[float] = []
+    errors = 0
+    peak = rss_kib(pid)
+    deadline = time.monotonic() + duration
+
+    async def connection() -> None:
+        nonlocal errors
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                ok = response.is_success
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    async def sample() -> None:
+        nonlocal peak
+        while time.monotonic() < deadline:
+            peak = max(peak, rss_kib(pid))
+            await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    await asyncio.gather(sample(), *(connection() for _ in range(connections)))
+    return latencies, errors, time.perf_counter() - start, peak
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> None:
+    """
+    Start a worker in `mode` and load it.
+    """
+    env = {**os.environ, "DATABASE_MODE": mode}
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=args.connections)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60
+        ) as client:
+            await wait_until_up(client)
+            token = (
+                await client.post(
+                    f"{API}/login/access-token",
+                    data={
+                        "username": settings.FIRST_SUPERUSER,
+                        "password": settings.FIRST_SUPERUSER_PASSWORD,
+                    },
+                )
+            ).json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+            button = (
+                await client.post(
+                    f"{API}/buttons/", json={"title": "bench", "type": "ID"}
+                )
+            ).json()
+            idle = rss_kib(server.pid)
+            for name, path in [
+                ("read", f"{API}/buttons/{button['id']}"),
+                ("increment", f"{API}/buttons/{button['id']}/increment"),
+            ]:
+                latencies, errors, elapsed, peak = await load(
+                    client, path, args.connections, args.duration, server.pid
+                )
+                cuts = statistics.quantiles(latencies, n=100)
+                print(
+                    f"{mode:<6} {name:<10} {len(latencies) / elapsed:7.0f} req/s  "
+                    f"p50={cuts[49] * 1000:7.1f}ms  p99={cuts[98] * 1000:7.1f}ms  "
+                    f"errors={errors}  rss idle={idle // 1024}MiB "
+                    f"peak={peak // 1024}MiB"
+                )
+            await client.delete(
+                f"{API}/buttons/{button['id']}", params={"force": "true"}
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    for mode in args.modes:
+        asyncio.run(run_mode(mode, args))
+
+
+if __name__ == "__main__":
+    main()
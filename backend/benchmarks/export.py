@@ -0,0 +1,180 @@
+"""
+Throughput and memory of exporting Button uses, with `DATABASE_MODE`
+set to each of `--modes` in turn.
+
+Seeds `--uses` uses of one Button over the last `--days` days, then for
+every mode starts a single uvicorn worker on `--port` and downloads
+`GET /buttons/uses/export` of the whole range in each of `--formats`.
+The worker's peak resident memory is sampled from `/proc` (Linux only)
+while the export streams; it should stay flat however many rows there
+are. The seeded Button, and its uses, are deleted afterwards.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.export --uses 10000000
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from app import crud
+from app.core.config import settings
+from app.models import ButtonCreate
+from sqlalchemy import Engine, text
+from sqlmodel import Session
+
+from benchmarks.common import bench_engine
+from benchmarks.database_mode import rss_kib, wait_until_up
+
+API = settings.API_V1_STR
+# Exports are filtered on the type, so that they hold the seeded uses only
+BENCH_TYPE = "bench-export"
+
+# Uses are seeded in the order they would have been recorded in
+SEED_USES = text(
+    """
+    INSERT INTO buttonuse (id, button_id, timestamp, origin)
+    SELECT gen_random_uuid(), :button_id, :end - n * (:span / :uses), 'bench'
+    FROM generate_series(:uses, 1, -1) AS n
+    """
+)
+
+
+def seed(
+    engine: Engine, button_id: uuid.UUID, uses: int, start: datetime, end: datetime
+) -> None:
+    """
+    Insert `uses` uses of a Button, evenly spread from `start` to `end`,
+    into monthly partitions.
+    """
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    with Session(engine) as session:
+        crud.create_use_partitions(session=session, start=start, months=months)
+    with engine.begin() as connection:
+        connection.execute(
+            SEED_USES,
+            {"button_id": button_id, "end": end, "span": end - start, "uses": uses},
+        )
+        connection.execute(text("ANALYZE buttonuse"))
+
+
+async def download(
+    client: httpx.AsyncClient, params: dict[str, str], pid: int
+) -> tuple[int, int, float, int]:
+    """
+    Stream an export to nowhere. Returns the lines and bytes received,
+    the elapsed time and the worker's peak memory in KiB.
+    """
+    lines = size = 0
+    peak = rss_kib(pid)
+    start = time.perf_counter()
+    async with client.stream("GET", f"{API}/buttons/uses/export", params=params) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            lines += chunk.count(b"\n")
+            size += len(chunk)
+            peak = max(peak, rss_kib(pid))
+    return lines, size, time.perf_counter() - start, peak
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    """
+    Log in as the first superuser.
+    """
+    response = await client.post(
+        f"{API}/login/access-token",
+        data={
+            "username": settings.FIRST_SUPERUSER,
+            "password": settings.FIRST_SUPERUSER_PASSWORD,
+        },
+    )
+    return str(response.json()["access_token"])
+
+
+async def run_mode(mode: str, args: argparse.Namespace, params: dict[str, str]) -> None:
+    """
+    Start a worker in `mode` and export from it in every format.
+    """
+    env = {**os.environ, "DATABASE_MODE": mode}
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", timeout=None
+        ) as client:
+            await wait_until_up(client)
+            client.headers["Authorization"] = f"Bearer {await login(client)}"
+            idle = rss_kib(server.pid)
+            for export_format in args.formats:
+                lines, size, elapsed, peak = await download(
+                    client, {**params, "format": export_format}, server.pid
+                )
+                print(
+                    f"{mode:<6} {export_format:<7} {lines:>10} lines "
+                    f"{size / 2**20:8.0f}MiB {elapsed:7.1f}s "
+                    f"{lines / elapsed:9.0f} rows/s  "
+                    f"rss idle={idle // 1024}MiB peak={peak // 1024}MiB"
+                )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uses", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--formats", nargs="+", default=["ndjson", "csv"])
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    end = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    start = end - timedelta(days=args.days)
+    engine = bench_engine(1)
+    with Session(engine) as session:
+        superuser = crud.get_user_by_email(
+            session=session, email=settings.FIRST_SUPERUSER
+        )
+        assert superuser is not None
+        button = crud.create_button(
+            session=session,
+            button_in=ButtonCreate(title="bench", type=BENCH_TYPE),
+            created_by=superuser.id,
+        )
+        button_id = button.id
+    try:
+        started = time.perf_counter()
+        seed(engine, button_id, args.uses, start, end)
+        print(f"Seeded {args.uses} uses in {time.perf_counter() - started:.0f}s")
+        params = {
+            "from": f"{start.isoformat()}Z",
+            "to": f"{end.isoformat()}Z",
+            "type": BENCH_TYPE,
+        }
+        for mode in args.modes:
+            asyncio.run(run_mode(mode, args, params))
+    finally:
+        with engine.begin() as connection:
+            connection.execute(
+                text("DELETE FROM button WHERE id = :id"), {"id": button_id}
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
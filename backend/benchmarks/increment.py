@@ -0,0 +1,101 @@
+"""
+Press latency of `GET /buttons/{id}/increment` with many concurrent
+pressers hammering the same Button.
+
+Compares the previous ORM implementation (`SELECT ... FOR UPDATE`, add a
+ButtonUse, commit, refresh) against the single-statement CTE in
+`crud.increment_button_usage`, and against the press buffer acking after
+each flush.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.increment --workers 50 --presses 40
+"""
+
+import argparse
+
+from app import crud
+from app.core.press_buffer import PressBuffer
+from app.models import (
+    Button,
+    ButtonCounter,
+    ButtonCreate,
+    ButtonPress,
+    ButtonUse,
+    User,
+)
+from sqlmodel import Session, delete, select
+
+from benchmarks.common import bench_engine, run_concurrently, summarize
+
+
+def legacy_press(session: Session, button_id: object) -> None:
+    """
+    The increment path as it was before the CTE rewrite, against the
+    counter table.
+    """
+    statement = select(Button).where(Button.id == button_id).with_for_update()
+    button = session.exec(statement).one()
+    session.add(ButtonUse(button_id=button.id, origin="bench"))
+    session.get_one(ButtonCounter, (button.id, 0)).usage_count += 1
+    session.commit()
+    session.refresh(button)
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--presses", type=int, default=40, help="per worker")
+    args = parser.parse_args()
+
+    engine = bench_engine(args.workers)
+    with Session(engine) as session:
+        owner = session.exec(select(User)).first()
+        assert owner, "Run app/initial_data.py first"
+        button = crud.create_button(
+            session=session,
+            button_in=ButtonCreate(title="bench", type="ID"),
+            created_by=owner.id,
+        )
+        button_id = button.id
+        session.add(ButtonCounter(button_id=button_id))
+        session.commit()
+
+    def legacy() -> None:
+        with Session(engine) as session:
+            legacy_press(session, button_id)
+
+    def cte() -> None:
+        with Session(engine) as session:
+            crud.increment_button_usage(
+                session=session, button_id=button_id, origin="bench"
+            )
+
+    press_buffer = PressBuffer(flush_interval=0.005, max_batch=500)
+
+    def buffered() -> None:
+        press_buffer.submit(ButtonPress(button_id=button_id, origin="bench")).result()
+
+    runs = (
+        ("legacy (FOR UPDATE)", legacy),
+        ("single-statement CTE", cte),
+        ("press buffer (ack on flush)", buffered),
+    )
+    try:
+        for label, task in runs:
+            latencies, elapsed = run_concurrently(task, args.workers, args.presses)
+            print(summarize(label, latencies, elapsed))
+        print(press_buffer.stats())
+    finally:
+        press_buffer.close()
+        with Session(engine) as session:
+            session.exec(delete(ButtonUse).where(ButtonUse.button_id == button_id))  # type: ignore
+            session.exec(delete(Button).where(Button.id == button_id))  # type: ignore
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
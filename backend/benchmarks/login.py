@@ -0,0 +1,138 @@
+"""
+Login throughput, and its impact on press latency, with passwords
+hashed in the threadpool or in a pool of processes.
+
+For each of `--processes` (`PASSWORD_HASH_PROCESSES`, 0 hashing in the
+threadpool), a single uvicorn worker is started on `--port`. Presses
+(`GET /buttons/{id}/increment`) are timed from `--pressers` connections
+for `--duration` seconds on their own, then again while `--logins`
+connections log in as fast as they can. Logins turned away with a 503
+when the hashing queue is full are counted separately.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.login --logins 50 --pressers 10 --processes 0 2
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from app.core.config import settings
+
+from benchmarks.database_mode import load, wait_until_up
+from benchmarks.export import login
+
+API = settings.API_V1_STR
+
+
+async def log_in(
+    client: httpx.AsyncClient, connections: int, duration: float
+) -> tuple[int, int, int]:
+    """
+    Keep `connections` logins in flight for `duration` seconds. Returns
+    the number of successful, refused (503) and failed logins.
+    """
+    counts = {"ok": 0, "busy": 0, "failed": 0}
+    deadline = time.monotonic() + duration
+    data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+
+    async def connection() -> None:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.post(f"{API}/login/access-token", data=data)
+                status_code = response.status_code
+            except httpx.HTTPError:
+                status_code = 0
+            if status_code == 200:
+                counts["ok"] += 1
+            elif status_code == 503:
+                counts["busy"] += 1
+            else:
+                counts["failed"] += 1
+
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    return counts["ok"], counts["busy"], counts["failed"]
+
+
+def describe(latencies: list[float]) -> str:
+    """
+    Summarize press latencies.
+    """
+    cuts = statistics.quantiles(latencies, n=100)
+    return f"p50={cuts[49] * 1000:6.1f}ms p99={cuts[98] * 1000:7.1f}ms"
+
+
+async def run(processes: str, args: argparse.Namespace) -> None:
+    """
+    Start a worker hashing in `processes` processes, and load it.
+    """
+    env = {**os.environ, "PASSWORD_HASH_PROCESSES": processes}
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=args.logins + args.pressers)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60
+        ) as client:
+            await wait_until_up(client)
+            headers = {"Authorization": f"Bearer {await login(client)}"}
+            button = (
+                await client.post(
+                    f"{API}/buttons/",
+                    headers=headers,
+                    json={"title": "bench", "type": "ID"},
+                )
+            ).json()
+            path = f"{API}/buttons/{button['id']}/increment"
+            idle, _, _, _ = await load(
+                client, path, args.pressers, args.duration, server.pid
+            )
+            (busy, _, _, _), (ok, refused, failed) = await asyncio.gather(
+                load(client, path, args.pressers, args.duration, server.pid),
+                log_in(client, args.logins, args.duration),
+            )
+            print(
+                f"processes={processes:<2} {ok / args.duration:6.1f} logins/s "
+                f"(503: {refused}, failed: {failed})  presses alone "
+                f"{describe(idle)}  with logins {describe(busy)}"
+            )
+            await client.delete(
+                f"{API}/buttons/{button['id']}",
+                headers=headers,
+                params={"force": "true"},
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=50, help="connections")
+    parser.add_argument("--pressers", type=int, default=10, help="connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--processes", nargs="+", default=["0", "2"])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    for processes in args.processes:
+        asyncio.run(run(processes, args))
+
+
+if __name__ == "__main__":
+    main()
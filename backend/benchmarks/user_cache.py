@@ -0,0 +1,80 @@
+"""
+Latency of authenticated requests with the user cache off and on.
+
+For each of `--modes` and each of `--ttls` (`USER_CACHE_TTL_S`, 0
+disabling the cache), a single uvicorn worker is started on `--port`,
+and `--connections` clients keep `GET /users/me` in flight against it
+for `--duration` seconds. That route does nothing but authenticate, so
+its latency is that of `deps.get_current_user`.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.user_cache --connections 50 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+
+import httpx
+from app.core.config import settings
+
+from benchmarks.database_mode import load, wait_until_up
+from benchmarks.export import login
+
+API = settings.API_V1_STR
+
+
+async def run(mode: str, ttl: str, args: argparse.Namespace) -> None:
+    """
+    Start a worker in `mode` with a user cache TTL of `ttl`, and load it.
+    """
+    env = {**os.environ, "DATABASE_MODE": mode, "USER_CACHE_TTL_S": ttl}
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=args.connections)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60
+        ) as client:
+            await wait_until_up(client)
+            client.headers["Authorization"] = f"Bearer {await login(client)}"
+            latencies, errors, elapsed, _ = await load(
+                client, f"{API}/users/me", args.connections, args.duration, server.pid
+            )
+            cuts = statistics.quantiles(latencies, n=100)
+            print(
+                f"{mode:<6} ttl={ttl:<4} {len(latencies) / elapsed:7.0f} req/s  "
+                f"p50={cuts[49] * 1000:6.2f}ms  p99={cuts[98] * 1000:6.2f}ms  "
+                f"errors={errors}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    """
+    Entry point of the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--ttls", nargs="+", default=["0", "30"])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    for mode in args.modes:
+        for ttl in args.ttls:
+            asyncio.run(run(mode, ttl, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 import type { CancelablePromise } from './core/CancelablePromise';
 import { OpenAPI } from './core/OpenAPI';
 import { request as __request } from './core/request';
-import type { ButtonsListAllButtonsData, ButtonsListAllButtonsResponse, ButtonsCreateButtonData, ButtonsCreateButtonResponse, ButtonsReadButtonData, ButtonsReadButtonResponse, ButtonsUpdateButtonData, ButtonsUpdateButtonResponse, ButtonsDeleteButtonData, ButtonsDeleteButtonResponse, ButtonsIncrementButtonUsageData, ButtonsIncrementButtonUsageResponse, ButtonsGetButtonUsageData, ButtonsGetButtonUsageResponse, ButtonsUpdateRetirementData, ButtonsUpdateRetirementResponse, ButtonsGetRetirementsData, ButtonsGetRetirementsResponse, ButtonsListAllRetirementsData, ButtonsListAllRetirementsResponse, LoginLoginAccessTokenData, LoginLoginAccessTokenResponse, LoginTestTokenResponse, LoginRecoverPasswordData, LoginRecoverPasswordResponse, LoginResetPasswordData, LoginResetPasswordResponse, LoginRecoverPasswordHtmlContentData, LoginRecoverPasswordHtmlContentResponse, PrivateCreateUserData, PrivateCreateUserResponse, UsersReadUsersData, UsersReadUsersResponse, UsersCreateUserData, UsersCreateUserResponse, UsersReadUserMeResponse, UsersDeleteUserMeResponse, UsersUpdateUserMeData, UsersUpdateUserMeResponse, UsersUpdatePasswordMeData, UsersUpdatePasswordMeResponse, UsersRegisterUserData, UsersRegisterUserResponse, UsersReadUserByIdData, UsersReadUserByIdResponse, UsersUpdateUserData, UsersUpdateUserResponse, UsersDeleteUserData, UsersDeleteUserResponse, UtilsTestEmailData, UtilsTestEmailResponse, UtilsHealthCheckResponse } from './types.gen';
+import type { ButtonsListAllButtonsData, ButtonsListAllButtonsResponse, ButtonsCreateButtonData, ButtonsCreateButtonResponse, ButtonsReadButtonData, ButtonsReadButtonResponse, ButtonsReadPressUrlData, ButtonsReadPressUrlResponse, ButtonsRotatePressUrlData, ButtonsRotatePressUrlResponse, ButtonsUpdateButtonData, ButtonsUpdateButtonResponse, ButtonsDeleteButtonData, ButtonsDeleteButtonResponse, ButtonsIncrementButtonUsageData, ButtonsIncrementButtonUsageResponse, ButtonsGetButtonUsageData, ButtonsGetButtonUsageResponse, ButtonsUpdateRetirementData, ButtonsUpdateRetirementResponse, ButtonsGetRetirementsData, ButtonsGetRetirementsResponse, ButtonsListAllRetirementsData, ButtonsListAllRetirementsResponse, LoginLoginAccessTokenData, LoginLoginAccessTokenResponse, LoginTestTokenResponse, LoginRecoverPasswordData, LoginRecoverPasswordResponse, LoginResetPasswordData, LoginResetPasswordResponse, LoginRecoverPasswordHtmlContentData, LoginRecoverPasswordHtmlContentResponse, PrivateCreateUserData, PrivateCreateUserResponse, UsersReadUsersData, UsersReadUsersResponse, UsersCreateUserData, UsersCreateUserResponse, UsersReadUserMeResponse, UsersDeleteUserMeResponse, UsersUpdateUserMeData, UsersUpdateUserMeResponse, UsersUpdatePasswordMeData, UsersUpdatePasswordMeResponse, UsersRegisterUserData, UsersRegisterUserResponse, UsersReadUserByIdData, UsersReadUserByIdResponse, UsersUpdateUserData, UsersUpdateUserResponse, UsersDeleteUserData, UsersDeleteUserResponse, UtilsTestEmailData, UtilsTestEmailResponse, UtilsHealthCheckResponse } from './types.gen';
 
 export class ButtonsService {
     /**
@@ -12,8 +12,16 @@ export class ButtonsService {
      * user making the request, the response may include all Buttons or
      * only those created by the requesting user.
      * @param data The data for the request.
-     * @param data.skip
+     * @param data.type
+     * @param data.retired
+     * @param data.createdBy
+     * @param data.title
+     * @param data.sort
+     * @param data.cursor
      * @param data.limit
+     * @param data.count
+     * @param data.summary
+     * @param data.skip
      * @returns ButtonsPublic Successful Response
      * @throws ApiError
      */
@@ -22,8 +30,16 @@ export class ButtonsService {
             method: 'GET',
             url: '/api/v1/buttons/',
             query: {
-                skip: data.skip,
-                limit: data.limit
+                type: data.type,
+                retired: data.retired,
+                created_by: data.createdBy,
+                title: data.title,
+                sort: data.sort,
+                cursor: data.cursor,
+                limit: data.limit,
+                count: data.count,
+                summary: data.summary,
+                skip: data.skip
             },
             errors: {
                 422: 'Validation Error'
@@ -72,6 +88,51 @@ export class ButtonsService {
         });
     }
     
+    /**
+     * Read Press Url
+     * Get the signed press URL of a Button, e.g. for a Stream Deck
+     * multi-action. Presses carrying a forged token are refused without
+     * touching the database.
+     * @param data The data for the request.
+     * @param data.id
+     * @returns ButtonPressUrl Successful Response
+     * @throws ApiError
+     */
+    public static readPressUrl(data: ButtonsReadPressUrlData): CancelablePromise<ButtonsReadPressUrlResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/v1/buttons/{id}/press-url',
+            path: {
+                id: data.id
+            },
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
+    /**
+     * Rotate Press Url
+     * Replace the signed press URL of a Button. Presses through the
+     * previous one are refused from then on.
+     * @param data The data for the request.
+     * @param data.id
+     * @returns ButtonPressUrl Successful Response
+     * @throws ApiError
+     */
+    public static rotatePressUrl(data: ButtonsRotatePressUrlData): CancelablePromise<ButtonsRotatePressUrlResponse> {
+        return __request(OpenAPI, {
+            method: 'POST',
+            url: '/api/v1/buttons/{id}/press-url:rotate',
+            path: {
+                id: data.id
+            },
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
     /**
      * Update Button
      * Update an existing Button, if the user has permission.
@@ -216,8 +277,10 @@ export class ButtonsService {
      * the user making the request, the response may include all Buttons or
      * only those retired by the requesting user.
      * @param data The data for the request.
-     * @param data.skip
+     * @param data.cursor
      * @param data.limit
+     * @param data.count
+     * @param data.skip
      * @returns ButtonRetirementsPublic Successful Response
      * @throws ApiError
      */
@@ -226,8 +289,10 @@ export class ButtonsService {
             method: 'GET',
             url: '/api/v1/buttons/retirements/',
             query: {
-                skip: data.skip,
-                limit: data.limit
+                cursor: data.cursor,
+                limit: data.limit,
+                count: data.count,
+                skip: data.skip
             },
             errors: {
                 422: 'Validation Error'
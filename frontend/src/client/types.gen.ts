@@ -21,6 +21,20 @@ export type ButtonCreate = {
      */
     duration?: (number | null);
     source?: (string | null);
+    /**
+     * Presses from the same origin within this many milliseconds of the last recorded one are ignored (e.g. 750)
+     */
+    dedup_window_ms?: (number | null);
+    /**
+     * Number of rows the usage count is spread over, so that a heavily pressed Button doesn't serialize its presses (e.g. 8)
+     */
+    counter_slots?: (number | null);
+};
+
+export type ButtonPressUrl = {
+    url: string;
+    token: string;
+    version: number;
 };
 
 export type ButtonPublic = {
@@ -35,6 +49,14 @@ export type ButtonPublic = {
      */
     duration?: (number | null);
     source?: (string | null);
+    /**
+     * Presses from the same origin within this many milliseconds of the last recorded one are ignored (e.g. 750)
+     */
+    dedup_window_ms?: (number | null);
+    /**
+     * Number of rows the usage count is spread over, so that a heavily pressed Button doesn't serialize its presses (e.g. 8)
+     */
+    counter_slots?: (number | null);
     id: string;
     created_by: string;
     usage_count: number;
@@ -54,12 +76,34 @@ export type ButtonRetirement = {
  */
 export type ButtonRetirementsPublic = {
     data: Array<ButtonRetirement>;
-    count: number;
+    count: (number | null);
+    next_cursor?: (string | null);
 };
 
 export type ButtonsPublic = {
     data: Array<ButtonPublic>;
-    count: number;
+    count: (number | null);
+    next_cursor?: (string | null);
+    summary?: (ButtonUsageSummary | null);
+};
+
+/**
+ * Usage over all the Buttons matching the filters of a listing, not
+ * only those on the page.
+ */
+export type ButtonUsageSummary = {
+    total: ButtonUsageTotals;
+    by_type: {
+        [key: string]: ButtonUsageTotals;
+    };
+    active: ButtonUsageTotals;
+    retired: ButtonUsageTotals;
+};
+
+export type ButtonUsageTotals = {
+    buttons: number;
+    presses: number;
+    airtime: number;
 };
 
 export type ButtonUpdate = {
@@ -71,6 +115,14 @@ export type ButtonUpdate = {
      */
     duration?: (number | null);
     source?: (string | null);
+    /**
+     * Presses from the same origin within this many milliseconds of the last recorded one are ignored (e.g. 750)
+     */
+    dedup_window_ms?: (number | null);
+    /**
+     * Number of rows the usage count is spread over, so that a heavily pressed Button doesn't serialize its presses (e.g. 8)
+     */
+    counter_slots?: (number | null);
 };
 
 export type HTTPValidationError = {
@@ -171,8 +223,19 @@ export type ValidationError = {
 };
 
 export type ButtonsListAllButtonsData = {
+    count?: 'exact' | 'estimated' | 'none';
+    createdBy?: (string | null);
+    cursor?: (string | null);
     limit?: number;
+    retired?: (boolean | null);
+    /**
+     * @deprecated
+     */
     skip?: number;
+    sort?: 'created_at' | '-created_at' | 'title' | '-title' | 'usage_count' | '-usage_count';
+    summary?: boolean;
+    title?: (string | null);
+    type?: (string | null);
 };
 
 export type ButtonsListAllButtonsResponse = (ButtonsPublic);
@@ -189,6 +252,18 @@ export type ButtonsReadButtonData = {
 
 export type ButtonsReadButtonResponse = (ButtonPublic);
 
+export type ButtonsReadPressUrlData = {
+    id: string;
+};
+
+export type ButtonsReadPressUrlResponse = (ButtonPressUrl);
+
+export type ButtonsRotatePressUrlData = {
+    id: string;
+};
+
+export type ButtonsRotatePressUrlResponse = (ButtonPressUrl);
+
 export type ButtonsUpdateButtonData = {
     id: string;
     requestBody: ButtonUpdate;
@@ -229,7 +304,12 @@ export type ButtonsGetRetirementsData = {
 export type ButtonsGetRetirementsResponse = (ButtonRetirementsPublic);
 
 export type ButtonsListAllRetirementsData = {
+    count?: 'exact' | 'estimated' | 'none';
+    cursor?: (string | null);
     limit?: number;
+    /**
+     * @deprecated
+     */
     skip?: number;
 };
 
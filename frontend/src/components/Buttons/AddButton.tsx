@@ -44,7 +44,8 @@ const AddButton = () => {
       type: "PSA",
       description: null,
       duration: null,
-      source: null
+      source: null,
+      dedup_window_ms: null,
     },
   })
 
@@ -160,6 +161,27 @@ const AddButton = () => {
                   type="text"
                 />
               </Field>
+              <Field
+                invalid={!!errors.dedup_window_ms}
+                errorText={errors.dedup_window_ms?.message}
+                label="De-duplication window (ms)"
+              >
+                <Input
+                  id="dedup_window_ms"
+                  {...register("dedup_window_ms", {
+                    setValueAs: (value) =>
+                      value === "" || value == null ? null : Number(value),
+                    validate: {
+                      isNonNegative: (value) =>
+                        value == null ||
+                        (Number.isInteger(value) && value >= 0) ||
+                        "De-duplication window must be a whole number of milliseconds.",
+                    },
+                  })}
+                  placeholder="e.g. 750 (leave empty to record every press)"
+                  type="text"
+                />
+              </Field>
             </VStack>
           </DialogBody>
 
@@ -33,6 +33,7 @@ interface EditButtonProps {
 interface ButtonUpdateForm {
   title: string
   description?: string
+  dedup_window_ms?: number | null
 }
 
 const EditButton = ({ button }: EditButtonProps) => {
@@ -165,6 +166,27 @@ const EditButton = ({ button }: EditButtonProps) => {
                   type="text"
                 />
               </Field>
+              <Field
+                invalid={!!errors.dedup_window_ms}
+                errorText={errors.dedup_window_ms?.message}
+                label="De-duplication window (ms)"
+              >
+                <Input
+                  id="dedup_window_ms"
+                  {...register("dedup_window_ms", {
+                    setValueAs: (value) =>
+                      value === "" || value == null ? null : Number(value),
+                    validate: {
+                      isNonNegative: (value) =>
+                        value == null ||
+                        (Number.isInteger(value) && value >= 0) ||
+                        "De-duplication window must be a whole number of milliseconds.",
+                    },
+                  })}
+                  placeholder="e.g. 750 (leave empty to record every press)"
+                  type="text"
+                />
+              </Field>
             </VStack>
           </DialogBody>
 
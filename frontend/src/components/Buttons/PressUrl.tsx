@@ -0,0 +1,112 @@
+import { Button, ButtonGroup, Input, Text } from "@chakra-ui/react"
+import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query"
+import { useState } from "react"
+import { FiCopy, FiLink, FiRefreshCw } from "react-icons/fi"
+
+import { type ApiError, type ButtonPressUrl, ButtonsService } from "@/client"
+import {
+  DialogActionTrigger,
+  DialogBody,
+  DialogCloseTrigger,
+  DialogContent,
+  DialogFooter,
+  DialogHeader,
+  DialogRoot,
+  DialogTitle,
+  DialogTrigger,
+} from "@/components/ui/dialog"
+import useCustomToast from "@/hooks/useCustomToast"
+import { handleError } from "@/utils"
+
+const PressUrl = ({ id }: { id: string }) => {
+  const [isOpen, setIsOpen] = useState(false)
+  const queryClient = useQueryClient()
+  const { showSuccessToast, showErrorToast } = useCustomToast()
+  const queryKey = ["buttons", id, "press-url"]
+
+  const { data, isLoading } = useQuery({
+    queryFn: () => ButtonsService.readPressUrl({ id }),
+    queryKey,
+    enabled: isOpen,
+  })
+
+  const mutation = useMutation({
+    mutationFn: () => ButtonsService.rotatePressUrl({ id }),
+    onSuccess: (pressUrl: ButtonPressUrl) => {
+      queryClient.setQueryData(queryKey, pressUrl)
+      showSuccessToast("The press URL was replaced. Update your Stream Deck.")
+    },
+    onError: (err: ApiError) => {
+      handleError(err)
+    },
+  })
+
+  const copy = async () => {
+    if (!data) return
+    try {
+      await navigator.clipboard.writeText(data.url)
+      showSuccessToast("Press URL copied to the clipboard")
+    } catch {
+      showErrorToast("The press URL could not be copied")
+    }
+  }
+
+  return (
+    <DialogRoot
+      size={{ base: "xs", md: "md" }}
+      placement="center"
+      open={isOpen}
+      onOpenChange={({ open }) => setIsOpen(open)}
+    >
+      <DialogTrigger asChild>
+        <Button variant="ghost">
+          <FiLink fontSize="16px" />
+          Press URL
+        </Button>
+      </DialogTrigger>
+      <DialogContent>
+        <DialogHeader>
+          <DialogTitle>Press URL</DialogTitle>
+        </DialogHeader>
+        <DialogBody>
+          <Text mb={4}>
+            Paste this URL into a Stream Deck "Website" or multi-action to
+            record a press. Replacing it stops the current URL from working.
+          </Text>
+          <Input
+            id="press-url"
+            value={isLoading ? "Loading..." : (data?.url ?? "")}
+            readOnly
+            onFocus={(event) => event.target.select()}
+          />
+        </DialogBody>
+        <DialogFooter gap={2}>
+          <ButtonGroup>
+            <Button
+              variant="subtle"
+              colorPalette="red"
+              onClick={() => mutation.mutate()}
+              loading={mutation.isPending}
+              disabled={!data}
+            >
+              <FiRefreshCw fontSize="16px" />
+              Replace
+            </Button>
+            <Button variant="solid" onClick={copy} disabled={!data}>
+              <FiCopy fontSize="16px" />
+              Copy
+            </Button>
+            <DialogActionTrigger asChild>
+              <Button variant="subtle" colorPalette="gray">
+                Close
+              </Button>
+            </DialogActionTrigger>
+          </ButtonGroup>
+        </DialogFooter>
+        <DialogCloseTrigger />
+      </DialogContent>
+    </DialogRoot>
+  )
+}
+
+export default PressUrl
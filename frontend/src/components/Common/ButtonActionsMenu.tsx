@@ -5,6 +5,7 @@ import { MenuContent, MenuRoot, MenuTrigger } from "../ui/menu"
 import type { ButtonPublic } from "@/client"
 import DeleteButton from "../Buttons/DeleteButton"
 import EditButton from "../Buttons/EditButton"
+import PressUrl from "../Buttons/PressUrl"
 
 interface ButtonActionsMenuProps {
   button: ButtonPublic
@@ -20,6 +21,7 @@ export const ButtonActionsMenu = ({ button }: ButtonActionsMenuProps) => {
       </MenuTrigger>
       <MenuContent>
         <EditButton button={button} />
+        <PressUrl id={button.id} />
         <DeleteButton id={button.id} />
       </MenuContent>
     </MenuRoot>